@@ -10,6 +10,18 @@ Usage:
     python benchmark.py --preset quick        # Quick test (short prompt)
     python benchmark.py --preset throughput   # High output for TPS testing
     python benchmark.py --preset code         # Code generation (default)
+    python benchmark.py --profile             # Separate client CPU from wall time
+    python benchmark.py --trace trace.jsonl   # Replay a recorded traffic trace
+    python benchmark.py --workload mix.json   # Weighted mix of request classes
+    python benchmark.py --conversation 8      # 8-turn sessions with growing context
+    python benchmark.py --record cassettes/   # Save raw SSE streams for offline replay
+    python benchmark.py --replay cassettes/   # Re-run the parse pipeline on saved streams
+    python benchmark.py --hedge-delay p95     # Hedged requests vs a non-hedged control run
+    python benchmark.py --slo-ttft 1500 --slo-tpot 50  # Goodput under custom SLOs
+    python benchmark.py --http-version 2      # Multiplex requests over one HTTP/2 connection
+    python benchmark.py --shards pool.json    # Spread load over several keys/endpoints
+    python benchmark.py --compare endpoints.json  # Compare endpoints under identical load
+    python benchmark.py --relay-overhead      # Per-phase latency added by a relay hop
 
 Default: Uses 'code' preset (~500-1000 tokens) for coding workflows.
 """
@@ -19,10 +31,24 @@ import sys
 import json
 import time
 import argparse
+import bisect
 import statistics
+import random
+import re
 import socket
+import ssl
+import queue
 import http.client
-from dataclasses import dataclass, asdict, field
+import io
+import gzip
+import itertools
+import struct
+import cProfile
+import pstats
+import threading
+import tracemalloc
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, asdict, field, replace
 from datetime import datetime
 from typing import Optional
 from pathlib import Path
@@ -83,9 +109,79 @@ Make the implementation robust and well-commented.""",
         "description": "Structured JSON output test (~30 tokens)",
         "prompt": 'Output valid JSON with fields: name="test", value=123, active=true. No explanation.',
     },
+    "tool-call": {
+        "name": "Tool Call Test",
+        "description": "Forced tool call with small arguments (~30 argument tokens)",
+        "prompt": "What is the weather in Paris and in Tokyo right now? Look up both cities.",
+        "tools": [{
+            "name": "get_weather",
+            "description": "Get the current weather for a city.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "location": {"type": "string", "description": "City and country, e.g. Paris, France"},
+                    "unit": {"type": "string", "enum": ["celsius", "fahrenheit"]},
+                },
+                "required": ["location"],
+            },
+        }],
+    },
+    "tool-edit": {
+        "name": "Tool Edit Test",
+        "description": "Forced tool call with large arguments (~500+ argument tokens)",
+        "prompt": """Create a Python module lru_cache.py implementing a thread-safe LRU cache class with
+get, put, clear and size methods, docstrings and type hints. Save it with the write_file tool.""",
+        "tools": [{
+            "name": "write_file",
+            "description": "Write a file to the workspace, replacing any existing content.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string", "description": "Relative file path"},
+                    "content": {"type": "string", "description": "Full file content"},
+                    "summary": {"type": "string", "description": "One-line description of the change"},
+                },
+                "required": ["path", "content"],
+            },
+        }],
+    },
 }
 
 
+DEFAULT_MAX_TOKENS = 256
+
+# Response bytes read per call into each thread's reusable buffer
+READ_BUFFER_SIZE = 65536
+
+# Serialized requests kept per config (distinct prompts beyond this, e.g.
+# from a long trace, are serialized on every send instead)
+PREPARED_CACHE_SIZE = 1024
+
+# Connections that cannot be established quickly fail fast; once connected,
+# streams may legitimately pause for a long time between chunks
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 120
+
+# Default service level objectives for goodput (override with --slo-*)
+DEFAULT_SLO_TTFT = 2.0  # Seconds to first token
+DEFAULT_SLO_TPOT = 0.1  # Seconds per output token after the first
+
+# Filler used to synthesize prompts of a given input size for trace replay
+FILLER_WORDS = (
+    "the quick brown fox jumps over a lazy dog while seven bright engineers "
+    "review pull requests about caching latency throughput and streaming"
+).split()
+
+# Follow-up user turns for conversation mode, cycled after the opening prompt
+CONVERSATION_FOLLOW_UPS = [
+    "Add unit tests for the code above using pytest.",
+    "Refactor the implementation for readability and explain each change.",
+    "Add structured logging and more precise error handling.",
+    "Review everything so far and list remaining edge cases with fixes.",
+    "Summarize the final design and its performance characteristics.",
+]
+
+
 @dataclass
 class APIConfig:
     """Detected API configuration"""
@@ -94,6 +190,16 @@ class APIConfig:
     api_key: str
     model: str
     headers: dict = field(default_factory=dict)
+    http_version: str = '1.1'  # '2' multiplexes requests over shared connections
+    recorder: Optional['CassetteRecorder'] = None  # Save raw streams (--record)
+    pool: Optional['ShardPool'] = None  # Pick a shard config per request (--shards)
+    player: Optional['CassettePlayer'] = None  # Serve streams from cassettes (--replay)
+    proxy: Optional[str] = None  # HTTP CONNECT proxy to tunnel through, "host:port"
+    tools: Optional[list[dict]] = None  # Tool schemas (name, description, parameters); forces a call
+    # Parsed endpoint and serialized requests, filled in lazily by
+    # request_target() and prepare_request(); never copied by replace()
+    _target: Optional[tuple] = field(default=None, init=False, repr=False)
+    _prepared: dict = field(default_factory=dict, init=False, repr=False)
 
 
 @dataclass
@@ -106,6 +212,50 @@ class RequestResult:
     tokens: int
     tps: float  # Tokens per second
     error: Optional[str] = None
+    tpot: float = 0.0  # Time per output token after the first (seconds)
+    # Failure category (see classify_stream / FAILURE_KINDS). For failed
+    # requests response_time is the time to failure and tokens counts the
+    # partial output received before it
+    error_kind: Optional[str] = None
+    cpu_time: float = 0.0  # Client CPU time spent on this request (thread time)
+    parse_time: float = 0.0  # Client CPU time spent counting tokens after the stream
+    start_offset: float = 0.0  # Seconds from run start until the request was sent
+    start_lag: float = 0.0  # Delay between scheduled and actual send time (replay)
+    label: Optional[str] = None  # Workload class of the request, if any
+    turn: int = 0  # 1-based turn index in conversation mode
+    input_tokens: int = 0  # Prompt tokens reported by the API (conversation mode)
+    cached_tokens: int = 0  # Prompt tokens served from the provider's prefix cache
+    reply: Optional[str] = None  # Assistant reply text (conversation mode)
+    hedged: bool = False  # A backup request was sent (hedging mode)
+    hedge_won: bool = False  # The backup request delivered the first token
+    shard: Optional[str] = None  # Credential/endpoint shard that served the request
+    connect_time: float = 0.0  # TCP/TLS (and tunnel) setup; 0 on a reused connection
+    headers_time: float = 0.0  # Time until the response status and headers arrived
+    itl: float = 0.0  # Mean gap between response chunks after the first (seconds)
+    tool_calls: int = 0  # Tool calls streamed in the response (tool presets)
+    tool_ttft: float = 0.0  # Time to the first tool argument fragment
+    tool_args_time: float = 0.0  # Time until the last tool argument fragment arrived
+    tool_tokens: int = 0  # Estimated tokens of tool call arguments
+    tool_args_valid: bool = False  # Every call's arguments parsed as JSON
+
+
+@dataclass
+class TraceRequest:
+    """One request from a replayed traffic trace"""
+    offset: float  # Seconds from trace start
+    prompt: str
+    max_tokens: int = DEFAULT_MAX_TOKENS
+    input_tokens: int = 0
+    label: Optional[str] = None
+
+
+@dataclass
+class WorkloadClass:
+    """One weighted request class of a mixed workload profile"""
+    name: str
+    prompt: str
+    weight: float = 1.0
+    max_tokens: int = DEFAULT_MAX_TOKENS
 
 
 @dataclass
@@ -144,20 +294,72 @@ class BenchmarkReport:
     # Detailed results
     results: list = field(default_factory=list)
 
+    # Client-side overhead (only populated with --profile)
+    client_overhead: dict = field(default_factory=dict)
 
-def detect_api_config() -> Optional[APIConfig]:
-    """Detect current LLM API from environment variables"""
+    # Trace replay statistics (only populated with --trace)
+    replay: dict = field(default_factory=dict)
 
-    # Check Anthropic/Claude API
-    api_key = os.environ.get('ANTHROPIC_API_KEY') or os.environ.get('ANTHROPIC_API_KEY_DEV') or os.environ.get('ANTHROPIC_AUTH_TOKEN')
-    if api_key:
-        base_url = os.environ.get('ANTHROPIC_BASE_URL', 'https://api.anthropic.com')
-        model = os.environ.get('ANTHROPIC_MODEL') or os.environ.get('ANTHROPIC_DEFAULT_SONNET_MODEL', 'claude-sonnet-4-20250514')
+    # Per-class statistics plus blended total (labelled workloads only)
+    breakdown: dict = field(default_factory=dict)
+
+    # Per-turn statistics (only populated with --conversation)
+    turns: dict = field(default_factory=dict)
+
+    # Hedged vs control comparison (only populated with --hedge-delay)
+    hedging: dict = field(default_factory=dict)
+
+    # Requests and tokens per second that met every SLO
+    goodput: dict = field(default_factory=dict)
+
+    # Failure counts and time-to-failure by category
+    failures: dict = field(default_factory=dict)
+
+    # Transport used for the run (HTTP version, connections opened)
+    transport: dict = field(default_factory=dict)
+
+    # Per-shard and aggregate statistics (only populated with --shards)
+    shards: dict = field(default_factory=dict)
+
+    # Relay vs direct per-phase deltas (only populated with --relay-overhead)
+    relay: dict = field(default_factory=dict)
+
+    # Tool call streaming latency (only populated with tool presets)
+    tool_use: dict = field(default_factory=dict)
+
+
+PROVIDER_ALIASES = {
+    'anthropic': 'Anthropic',
+    'claude': 'Anthropic',
+    'openai': 'OpenAI',
+    'azure': 'Azure OpenAI',
+    'azure openai': 'Azure OpenAI',
+    'gemini': 'Google Gemini',
+    'google gemini': 'Google Gemini',
+}
+
+
+def build_api_config(
+    provider: str,
+    api_key: str,
+    base_url: Optional[str] = None,
+    model: Optional[str] = None
+) -> APIConfig:
+    """Build an APIConfig from explicit provider settings
+
+    For Azure OpenAI, base_url is the resource endpoint and model the
+    deployment name; both are required.
+    """
+
+    provider = PROVIDER_ALIASES.get(provider.lower(), provider)
+
+    if provider == 'Anthropic':
+        base_url = base_url or 'https://api.anthropic.com'
         return APIConfig(
             provider='Anthropic',
             endpoint=f"{base_url}/v1/messages",
             api_key=api_key,
-            model=model,
+            model=model or 'claude-sonnet-4-20250514',
             headers={
                 'x-api-key': api_key,
                 'anthropic-version': '2023-06-01',
@@ -165,43 +367,36 @@ def detect_api_config() -> Optional[APIConfig]:
             }
         )
 
-    # Check OpenAI
-    api_key = os.environ.get('OPENAI_API_KEY')
-    if api_key:
-        base_url = os.environ.get('OPENAI_BASE_URL', 'https://api.openai.com/v1')
-        model = os.environ.get('OPENAI_MODEL', 'gpt-4o')
+    if provider == 'OpenAI':
+        base_url = base_url or 'https://api.openai.com/v1'
         return APIConfig(
             provider='OpenAI',
             endpoint=f"{base_url}/chat/completions",
             api_key=api_key,
-            model=model,
+            model=model or 'gpt-4o',
             headers={
                 'Authorization': f'Bearer {api_key}',
                 'content-type': 'application/json'
             }
         )
 
-    # Check Azure OpenAI
-    api_key = os.environ.get('AZURE_OPENAI_API_KEY')
-    endpoint = os.environ.get('AZURE_OPENAI_ENDPOINT')
-    deployment = os.environ.get('AZURE_OPENAI_DEPLOYMENT_NAME')
-    if api_key and endpoint and deployment:
+    if provider == 'Azure OpenAI':
+        if not base_url or not model:
+            raise ValueError("Azure OpenAI needs an endpoint (base_url) and deployment (model)")
         return APIConfig(
             provider='Azure OpenAI',
-            endpoint=f"{endpoint}/openai/deployments/{deployment}/chat/completions?api-version=2024-02-15-preview",
+            endpoint=f"{base_url}/openai/deployments/{model}/chat/completions?api-version=2024-02-15-preview",
             api_key=api_key,
-            model=deployment,
+            model=model,
             headers={
                 'api-key': api_key,
                 'content-type': 'application/json'
             }
         )
 
-    # Check Google Gemini
-    api_key = os.environ.get('GOOGLE_GENERATIVE_AI_API_KEY')
-    if api_key:
-        base_url = os.environ.get('GOOGLE_GENERATIVE_AI_BASE_URL', 'https://generativelanguage.googleapis.com')
-        model = os.environ.get('GOOGLE_GENERATIVE_AI_MODEL', 'gemini-2.0-flash')
+    if provider == 'Google Gemini':
+        base_url = base_url or 'https://generativelanguage.googleapis.com'
+        model = model or 'gemini-2.0-flash'
         return APIConfig(
             provider='Google Gemini',
             endpoint=f"{base_url}/v1beta/models/{model}:generateContent",
@@ -212,6 +407,49 @@ def detect_api_config() -> Optional[APIConfig]:
             }
         )
 
+    raise ValueError(f"unsupported provider '{provider}'")
+
+
+def detect_api_config() -> Optional[APIConfig]:
+    """Detect current LLM API from environment variables"""
+
+    # Check Anthropic/Claude API
+    api_key = os.environ.get('ANTHROPIC_API_KEY') or os.environ.get('ANTHROPIC_API_KEY_DEV') or os.environ.get('ANTHROPIC_AUTH_TOKEN')
+    if api_key:
+        return build_api_config(
+            'Anthropic',
+            api_key,
+            os.environ.get('ANTHROPIC_BASE_URL'),
+            os.environ.get('ANTHROPIC_MODEL') or os.environ.get('ANTHROPIC_DEFAULT_SONNET_MODEL')
+        )
+
+    # Check OpenAI
+    api_key = os.environ.get('OPENAI_API_KEY')
+    if api_key:
+        return build_api_config(
+            'OpenAI',
+            api_key,
+            os.environ.get('OPENAI_BASE_URL'),
+            os.environ.get('OPENAI_MODEL')
+        )
+
+    # Check Azure OpenAI
+    api_key = os.environ.get('AZURE_OPENAI_API_KEY')
+    endpoint = os.environ.get('AZURE_OPENAI_ENDPOINT')
+    deployment = os.environ.get('AZURE_OPENAI_DEPLOYMENT_NAME')
+    if api_key and endpoint and deployment:
+        return build_api_config('Azure OpenAI', api_key, endpoint, deployment)
+
+    # Check Google Gemini
+    api_key = os.environ.get('GOOGLE_GENERATIVE_AI_API_KEY')
+    if api_key:
+        return build_api_config(
+            'Google Gemini',
+            api_key,
+            os.environ.get('GOOGLE_GENERATIVE_AI_BASE_URL'),
+            os.environ.get('GOOGLE_GENERATIVE_AI_MODEL')
+        )
+
     # Check AWS Bedrock
     if os.environ.get('AWS_ACCESS_KEY_ID'):
         return APIConfig(
@@ -225,302 +463,2589 @@ def detect_api_config() -> Optional[APIConfig]:
     return None
 
 
-def build_payload(config: APIConfig, prompt: str) -> dict:
-    """Build API request payload based on provider"""
+@dataclass
+class Shard:
+    """One credential/endpoint in a sharded load pool"""
+    name: str
+    config: APIConfig
+    weight: float = 1.0
+    rpm: float = 0.0  # Request budget per minute (0 = unlimited)
+    requests: int = 0
+    throttled: float = 0.0  # Total seconds spent waiting for budget
+    _next_slot: float = 0.0
+    _current: float = 0.0  # Smooth weighted round-robin state
+
+
+class ShardPool:
+    """Spreads requests across credentials/endpoints with per-shard budgets
+
+    'round-robin' cycles through shards in order; 'weighted' uses smooth
+    weighted round-robin so shares follow the weights without bursts.
+    A shard over its requests-per-minute budget delays the request
+    (before its clock starts) rather than sending it early.
+    """
+
+    def __init__(self, shards: list[Shard], strategy: str = 'round-robin'):
+        if not shards:
+            raise ValueError("shard pool is empty")
+        self.shards = shards
+        self.strategy = strategy
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def _pick(self) -> Shard:
+        if self.strategy == 'weighted':
+            total = sum(s.weight for s in self.shards)
+            for shard in self.shards:
+                shard._current += shard.weight
+            chosen = max(self.shards, key=lambda s: s._current)
+            chosen._current -= total
+            return chosen
+        chosen = self.shards[self._index % len(self.shards)]
+        self._index += 1
+        return chosen
+
+    def acquire(self) -> Shard:
+        with self._lock:
+            shard = self._pick()
+            now = time.monotonic()
+            wait = 0.0
+            if shard.rpm > 0:
+                slot = max(now, shard._next_slot)
+                wait = slot - now
+                shard._next_slot = slot + 60.0 / shard.rpm
+            shard.requests += 1
+            shard.throttled += wait
+        if wait > 0:
+            time.sleep(wait)
+        return shard
+
+
+def load_endpoint_entries(path: Path, key: str) -> tuple[dict, list[tuple[dict, str, APIConfig]]]:
+    """Read endpoint entries from a JSON pool file
+
+    The file is either a list of entries or an object holding them under
+    key. Each entry has 'provider', optional 'base_url'/'model'/'name' and
+    either 'api_key' or 'api_key_env' (preferred, keeps secrets out of
+    files). Returns (top-level options, [(entry, name, config), ...]).
+    """
+    data = json.loads(path.read_text(encoding='utf-8'))
+    options = data if isinstance(data, dict) else {}
+    entries = data.get(key) if isinstance(data, dict) else data
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path} has no '{key}' entries")
+
+    loaded = []
+    for i, entry in enumerate(entries, 1):
+        api_key = entry.get('api_key')
+        if not api_key and entry.get('api_key_env'):
+            api_key = os.environ.get(entry['api_key_env'])
+            if not api_key:
+                raise ValueError(f"environment variable {entry['api_key_env']} is not set")
+        if not api_key:
+            raise ValueError(f"entry {i} needs 'api_key' or 'api_key_env'")
+
+        config = build_api_config(
+            entry.get('provider', 'Anthropic'),
+            api_key,
+            entry.get('base_url'),
+            entry.get('model')
+        )
+        loaded.append((entry, entry.get('name') or f"{key.rstrip('s')}-{i}", config))
+    return options, loaded
+
+
+def load_shard_pool(path: Path, strategy: Optional[str] = None) -> ShardPool:
+    """Load a shard pool from JSON
+
+    {"strategy": "weighted", "shards": [{"name": ..., "provider": ...,
+    "base_url": ..., "api_key_env": ... or "api_key": ..., "model": ...,
+    "weight": 2, "rpm": 50}]}
+    """
+    options, entries = load_endpoint_entries(path, 'shards')
 
+    shards = []
+    for entry, name, config in entries:
+        weight = float(entry.get('weight', 1.0))
+        rpm = float(entry.get('rpm', 0.0))
+        if not weight > 0:
+            raise ValueError(f"shard '{name}': weight must be positive, got {weight:g}")
+        if not rpm >= 0:
+            raise ValueError(f"shard '{name}': rpm must be 0 (unlimited) or more, got {rpm:g}")
+        shards.append(Shard(name=name, config=config, weight=weight, rpm=rpm))
+
+    strategy = strategy or options.get('strategy') or 'round-robin'
+    if strategy not in ('round-robin', 'weighted'):
+        raise ValueError(f"unknown strategy '{strategy}'")
+    return ShardPool(shards, strategy)
+
+
+def build_payload(
+    config: APIConfig,
+    prompt: str,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    messages: Optional[list[dict]] = None,
+    cache_prompt: bool = False
+) -> dict:
+    """Build API request payload based on provider
+
+    messages, when given, is a full user/assistant history that replaces
+    the single-prompt conversation.
+    """
+
+    if messages is None:
+        messages = [{'role': 'user', 'content': prompt}]
+
+    payload = _build_base_payload(config, messages, max_tokens, cache_prompt)
+    if config.tools and payload:
+        payload.update(build_tool_fields(config.provider, config.tools))
+    return payload
+
+
+def build_tool_fields(provider: str, tools: list[dict]) -> dict:
+    """Provider-specific tool definitions, with a tool call required"""
+
+    if provider == 'Anthropic':
+        return {
+            'tools': [
+                {'name': t['name'], 'description': t['description'], 'input_schema': t['parameters']}
+                for t in tools
+            ],
+            'tool_choice': {'type': 'any'},
+        }
+
+    elif provider in ('OpenAI', 'Azure OpenAI'):
+        return {
+            'tools': [{'type': 'function', 'function': t} for t in tools],
+            'tool_choice': 'required',
+        }
+
+    elif provider == 'Google Gemini':
+        return {
+            'tools': [{'functionDeclarations': tools}],
+            'toolConfig': {'functionCallingConfig': {'mode': 'ANY'}},
+        }
+
+    return {}
+
+
+def _build_base_payload(
+    config: APIConfig,
+    messages: list[dict],
+    max_tokens: int,
+    cache_prompt: bool
+) -> dict:
     if config.provider == 'Anthropic':
+        if cache_prompt:
+            # Mark the end of the history as a cache breakpoint so the
+            # whole prefix is eligible for prompt caching on the next turn
+            last = messages[-1]
+            messages = messages[:-1] + [{
+                'role': last['role'],
+                'content': [{
+                    'type': 'text',
+                    'text': last['content'],
+                    'cache_control': {'type': 'ephemeral'}
+                }]
+            }]
         return {
             'model': config.model,
-            'messages': [{'role': 'user', 'content': prompt}],
-            'max_tokens': 256,
+            'messages': messages,
+            'max_tokens': max_tokens,
             'stream': True
         }
 
     elif config.provider == 'OpenAI' or config.provider == 'Azure OpenAI':
         return {
             'model': config.model,
-            'messages': [{'role': 'user', 'content': prompt}],
-            'max_tokens': 256,
+            'messages': messages,
+            'max_tokens': max_tokens,
             'stream': True
         }
 
     elif config.provider == 'Google Gemini':
         return {
-            'contents': [{'parts': [{'text': prompt}]}],
+            'contents': [
+                {
+                    'role': 'model' if m['role'] == 'assistant' else 'user',
+                    'parts': [{'text': m['content']}]
+                }
+                for m in messages
+            ],
             'generationConfig': {
-                'maxOutputTokens': 256
+                'maxOutputTokens': max_tokens
             }
         }
 
     return {}
 
 
-def make_streaming_request(
+@dataclass
+class PreparedRequest:
+    """Serialized body and headers for one request, ready to send"""
+    body: bytes
+    headers: dict
+
+
+def prepare_request(
     config: APIConfig,
     prompt: str,
-    iteration: int
-) -> RequestResult:
-    """Make a streaming API request and measure performance with accurate TTFT"""
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    messages: Optional[list[dict]] = None,
+    cache_prompt: bool = False
+) -> PreparedRequest:
+    """Build and serialize a request, once per (config, prompt, max_tokens)
 
-    payload = build_payload(config, prompt)
-    start_time = time.time()
-    ttft = 0.0
-    response_text = ""
+    Repeated sends of the same prompt reuse the cached body and headers.
+    Conversation turns (messages) differ every time and are not cached.
+    """
 
-    try:
-        # Parse URL
+    key = (prompt, max_tokens, cache_prompt)
+    if messages is None:
+        prepared = config._prepared.get(key)
+        if prepared:
+            return prepared
+
+    body = json.dumps(build_payload(config, prompt, max_tokens, messages, cache_prompt)).encode('utf-8')
+    headers = dict(config.headers)
+    headers['Content-Length'] = str(len(body))
+    prepared = PreparedRequest(body, headers)
+
+    if messages is None and len(config._prepared) < PREPARED_CACHE_SIZE:
+        config._prepared[key] = prepared
+    return prepared
+
+
+def request_target(config: APIConfig) -> tuple[str, str, int, str]:
+    """(scheme, host, port, path) of config.endpoint, parsed once per config"""
+    if config._target is None:
         parsed = urlparse(config.endpoint)
+        scheme = 'https' if parsed.scheme == 'https' else 'http'
         host = parsed.hostname or parsed.netloc or 'api.anthropic.com'
-        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        port = parsed.port or (443 if scheme == 'https' else 80)
         path = parsed.path or '/'
-
-        # Add query string if present
         if parsed.query:
             path = f"{path}?{parsed.query}"
+        config._target = (scheme, host, port, path)
+    return config._target
+
+
+# Failure categories recorded in RequestResult.error_kind
+FAILURE_KINDS = {
+    'connect_timeout': 'Connect timeout',
+    'read_timeout': 'Read timeout',
+    'rate_limited': 'HTTP 429 rate limited',
+    'server_error': 'HTTP 5xx',
+    'http_error': 'Other HTTP error',
+    'overloaded': 'Overloaded (HTTP 529 or in-stream event)',
+    'stream_error': 'Error event inside stream',
+    'truncated': 'Stream ended or was cut off without terminal event',
+    'parse_error': 'Unparseable stream data',
+    'connection_error': 'Connection reset/refused before any data',
+    'cancelled': 'Cancelled (hedge lost)',
+    'client_error': 'Client-side exception',
+}
+
+
+class ConnectTimeout(Exception):
+    """The TCP/TLS connection could not be established in time"""
+
+
+class HedgeLost(Exception):
+    """Another attempt of a hedged request won before this one got a response"""
+
+
+def classify_http_status(status: int, body: str) -> str:
+    """Failure category for a non-200 response"""
+    if status == 429:
+        return 'rate_limited'
+    if status == 529 or 'overloaded' in body.lower():
+        return 'overloaded'
+    if status >= 500:
+        return 'server_error'
+    return 'http_error'
 
-        # Prepare request body
-        body = json.dumps(payload).encode('utf-8')
 
-        # Create connection
-        is_https = parsed.scheme == 'https' or host.endswith('.com')
+class HTTPStream:
+    """One streaming HTTP/1.1 exchange over http.client"""
+
+    def __init__(self, config: APIConfig, request: PreparedRequest, race: Optional['HedgeRace'] = None):
+        scheme, host, port, path = request_target(config)
+        self.aborted = False
+
+        # Create connection, to the proxy if the request is tunnelled
+        connect_host, connect_port = host, port
+        if config.proxy:
+            proxy_host, _, proxy_port = config.proxy.rpartition(':')
+            connect_host, connect_port = proxy_host, int(proxy_port)
+        is_https = scheme == 'https' or host.endswith('.com')
         if is_https:
-            conn = http.client.HTTPSConnection(host, port, timeout=120)
+            self.conn = http.client.HTTPSConnection(connect_host, connect_port, timeout=CONNECT_TIMEOUT)
         else:
-            conn = http.client.HTTPConnection(host, port, timeout=120)
+            self.conn = http.client.HTTPConnection(connect_host, connect_port, timeout=CONNECT_TIMEOUT)
+        if config.proxy:
+            # TLS, if any, is still negotiated end to end with the real host
+            self.conn.set_tunnel(host, port)
 
-        # Build headers
-        headers = dict(config.headers)
-        headers['Content-Length'] = str(len(body))
-        if is_https or not parsed.port:
-            # Standard headers for HTTPS
-            pass
+        # Registered before any I/O, so a hedge decided while this attempt
+        # connects or waits for headers can abort it
+        if race and not race.register(self):
+            raise HedgeLost()
 
-        # Send request
-        conn.request('POST', path, body, headers)
+        # Connect explicitly so connect and read timeouts can be told apart
+        connect_start = time.time()
+        try:
+            self.conn.connect()
+        except socket.timeout as e:
+            raise ConnectTimeout(f"Connect timeout after {CONNECT_TIMEOUT}s") from e
+        CONNECTIONS.add(config)
+        if self.aborted:
+            self.conn.close()
+            raise HedgeLost()
+        self.connect_time = time.time() - connect_start
+        self.conn.sock.settimeout(READ_TIMEOUT)
 
-        # Get response with streaming
-        response = conn.getresponse()
+        # Send request and wait for the response headers
+        self.conn.request('POST', path, request.body, request.headers)
+        self.response = self.conn.getresponse()
+        self.status = self.response.status
+        # Body bytes left in the current chunk (chunked) or in the whole
+        # body (Content-Length); None means it runs until the connection closes
+        self.remaining = self.response.length
+        self.chunked = self.response.chunked
 
-        if response.status != 200:
-            error_text = response.read().decode('utf-8', errors='ignore')
-            conn.close()
-            return RequestResult(
-                iteration=iteration,
-                success=False,
-                response_time=time.time() - start_time,
-                ttft=0,
-                tokens=0,
-                tps=0,
-                error=f"HTTP {response.status}: {error_text[:200]}"
-            )
+    def read(self, size: int) -> bytes:
+        return self.response.read(size)
 
-        # Read streaming response chunk by chunk
-        first_token_received = False
-        chunk_size = 1024
+    def readinto(self, buffer: memoryview) -> int:
+        """Read whatever has arrived (at least one byte) into buffer
 
-        while True:
-            chunk = response.read(chunk_size)
-            if not chunk:
-                break
+        Payload goes straight from the socket buffer into buffer; chunk
+        framing is decoded here rather than by http.client, whose read1()
+        returns a new bytes object per call.
+        """
+        fp = self.response.fp
+        if self.chunked and not self.remaining:
+            self.remaining = self._next_chunk_size(fp)
+            if not self.remaining:
+                return 0
+        if self.remaining is None:
+            return fp.readinto1(buffer)
+        if self.remaining <= 0:
+            return 0
+        n = fp.readinto1(buffer[:self.remaining])
+        if not n:
+            raise http.client.IncompleteRead(b'', self.remaining)
+        self.remaining -= n
+        return n
 
-            # Record time to first token
-            if not first_token_received:
-                ttft = time.time() - start_time
-                first_token_received = True
+    def _next_chunk_size(self, fp) -> int:
+        """Read the framing up to the next chunk; 0 once the last chunk is done"""
+        if self.remaining == 0:
+            fp.readline()  # CRLF closing the previous chunk
+        line = fp.readline()
+        if not line:
+            raise http.client.IncompleteRead(b'')
+        try:
+            size = int(line.split(b';', 1)[0], 16)
+        except ValueError:
+            raise http.client.IncompleteRead(b'') from None
+        if size == 0:
+            self.chunked = False
+            # Skip any trailers up to the blank line ending the body
+            while fp.readline() not in (b'\r\n', b'\n', b''):
+                pass
+        return size
 
-            # Decode and accumulate
-            text = chunk.decode('utf-8', errors='ignore')
-            response_text += text
+    def read_all(self) -> bytes:
+        return self.response.read()
 
-            # Check for end of stream
-            if '[DONE]' in response_text or '</s>' in response_text:
-                break
+    def close(self):
+        self.conn.close()
 
-        conn.close()
+    def abort(self):
+        """Cancel from another thread; shutdown wakes a blocked read"""
+        self.aborted = True
+        if self.conn.sock:
+            try:
+                self.conn.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.conn.close()
 
-        # Calculate metrics
-        response_time = time.time() - start_time
-        tokens = count_tokens(response_text, config.provider)
-        tokens = max(tokens, 1)  # At least 1 token
 
-        return RequestResult(
-            iteration=iteration,
-            success=True,
-            response_time=response_time,
-            ttft=ttft,
-            tokens=tokens,
-            tps=tokens / response_time if response_time > 0 else 0
-        )
+def _import_h2():
+    """Import the optional 'h2' protocol library used for HTTP/2"""
+    try:
+        import h2.config
+        import h2.connection
+        import h2.events
+        import h2.exceptions
+    except ImportError as e:
+        raise RuntimeError(
+            "HTTP/2 transport requires the 'h2' package (pip install h2)"
+        ) from e
+    return h2
 
-    except socket.timeout:
-        return RequestResult(
-            iteration=iteration,
-            success=False,
-            response_time=time.time() - start_time,
-            ttft=0,
-            tokens=0,
-            tps=0,
-            error="Request timeout"
-        )
-    except Exception as e:
-        return RequestResult(
-            iteration=iteration,
-            success=False,
-            response_time=time.time() - start_time,
-            ttft=0,
-            tokens=0,
-            tps=0,
-            error=str(e)
+
+class H2Connection:
+    """One HTTP/2 connection multiplexing many request streams
+
+    Uses TLS with ALPN for https endpoints and prior-knowledge h2c for
+    plain http ones. A reader thread feeds frames into the protocol state
+    machine and routes response data to per-stream queues; all protocol
+    state is guarded by a single lock because h2 is not thread-safe.
+    """
+
+    def __init__(self, scheme: str, host: str, port: int):
+        h2 = _import_h2()
+        self._h2 = h2
+        self.authority = host if port in (80, 443) else f"{host}:{port}"
+        self.scheme = scheme
+        self.origin = (scheme, host, port)
+        # CPU the reader thread has burnt so far; per-request thread_time
+        # never sees it, as frames are decoded off the request threads
+        self.reader_cpu_time = 0.0
+
+        try:
+            sock = socket.create_connection((host, port), timeout=CONNECT_TIMEOUT)
+        except socket.timeout as e:
+            raise ConnectTimeout(f"Connect timeout after {CONNECT_TIMEOUT}s") from e
+        if scheme == 'https':
+            context = ssl.create_default_context()
+            context.set_alpn_protocols(['h2'])
+            sock = context.wrap_socket(sock, server_hostname=host)
+            if sock.selected_alpn_protocol() != 'h2':
+                sock.close()
+                raise ConnectionError(f"{host} did not negotiate HTTP/2 via ALPN")
+        # The reader thread blocks on recv; per-stream timeouts apply instead
+        sock.settimeout(None)
+        self.sock = sock
+
+        self.conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=True, header_encoding='utf-8')
         )
+        self._lock = threading.Lock()
+        self._window_open = threading.Condition(self._lock)
+        self._streams: dict[int, 'H2Stream'] = {}
+        self.closed = False
 
+        with self._lock:
+            self.conn.initiate_connection()
+            self.sock.sendall(self.conn.data_to_send())
 
-def count_tokens(text: str, provider: str) -> int:
-    """Count tokens from streaming response text"""
-    tokens = 0
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
 
-    if provider == 'Anthropic':
-        # Parse SSE lines
-        for line in text.split('\n'):
-            line = line.strip()
-            if line.startswith('data:'):
-                data_str = line[5:].strip()
-                if data_str and data_str != '[DONE]':
-                    try:
-                        data = json.loads(data_str)
-                        if 'delta' in data:
-                            delta = data['delta']
-                            if 'text' in delta:
-                                tokens += count_words(delta['text'])
-                            elif 'type' in delta and delta['type'] == 'content_block_stop':
-                                pass
-                    except:
-                        pass
+    def open(self, path: str, headers: dict, body: bytes, race: Optional['HedgeRace'] = None) -> 'H2Stream':
+        request_headers = [
+            (':method', 'POST'),
+            (':scheme', self.scheme),
+            (':authority', self.authority),
+            (':path', path),
+        ] + [(k.lower(), v) for k, v in headers.items() if k.lower() != 'host']
 
-    elif provider in ('OpenAI', 'Azure OpenAI'):
-        # Parse SSE lines
-        for line in text.split('\n'):
-            line = line.strip()
-            if line.startswith('data:'):
-                data_str = line[5:].strip()
-                if data_str and data_str != '[DONE]':
-                    try:
-                        data = json.loads(data_str)
-                        if 'choices' in data and len(data['choices']) > 0:
-                            delta = data['choices'][0].get('delta', {})
-                            if 'content' in delta:
-                                tokens += count_words(delta['content'])
-                    except:
-                        pass
+        with self._lock:
+            if self.closed:
+                raise ConnectionError("HTTP/2 connection closed")
+            stream_id = self.conn.get_next_available_stream_id()
+            stream = H2Stream(self, stream_id)
+            self._streams[stream_id] = stream
+            self.conn.send_headers(stream_id, request_headers)
+            self.sock.sendall(self.conn.data_to_send())
 
-    else:
-        # Fallback: estimate by words
-        tokens = count_words(text)
+            # Send the body as flow control allows
+            view = memoryview(body)
+            while view:
+                window = min(
+                    self.conn.local_flow_control_window(stream_id),
+                    self.conn.max_outbound_frame_size
+                )
+                if window <= 0:
+                    if not self._window_open.wait(READ_TIMEOUT) or self.closed:
+                        raise socket.timeout("Timed out waiting for HTTP/2 flow control window")
+                    continue
+                self.conn.send_data(stream_id, bytes(view[:window]))
+                view = view[window:]
+            self.conn.end_stream(stream_id)
+            self.sock.sendall(self.conn.data_to_send())
 
-    return tokens
+        if race and not race.register(stream):
+            stream.abort()
+            raise HedgeLost()
+        stream.wait_for_headers()
+        return stream
 
+    def _read_loop(self):
+        events_mod = self._h2.events
+        try:
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    break
+                with self._lock:
+                    events = self.conn.receive_data(data)
+                    for event in events:
+                        stream = self._streams.get(getattr(event, 'stream_id', None) or 0)
+                        if isinstance(event, events_mod.ResponseReceived) and stream:
+                            stream.on_headers(dict(event.headers))
+                        elif isinstance(event, events_mod.DataReceived):
+                            self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                            if stream:
+                                stream.chunks.put(event.data)
+                        elif isinstance(event, events_mod.StreamEnded) and stream:
+                            stream.chunks.put(b'')
+                        elif isinstance(event, events_mod.StreamReset) and stream:
+                            stream.fail(ConnectionResetError(f"HTTP/2 stream reset (code {event.error_code})"))
+                        elif isinstance(event, events_mod.WindowUpdated):
+                            self._window_open.notify_all()
+                        elif isinstance(event, events_mod.ConnectionTerminated):
+                            raise ConnectionError(f"HTTP/2 GOAWAY (code {event.error_code})")
+                    self.sock.sendall(self.conn.data_to_send())
+                self.reader_cpu_time = time.thread_time()
+            error: Exception = ConnectionError("HTTP/2 connection closed by server")
+        except Exception as e:
+            error = e
+        self._shutdown(error)
 
-def count_words(text: str) -> int:
-    """Simple word count (approximate token count)"""
-    # Basic estimation: ~0.75 tokens per word for English
-    words = len(text.split())
-    return max(int(words * 1.3), words)  # Slightly overestimate
+    def _shutdown(self, error: Exception):
+        with self._lock:
+            self.closed = True
+            self._window_open.notify_all()
+            streams = list(self._streams.values())
+        for stream in streams:
+            stream.fail(error)
+        try:
+            self.sock.close()
+        except OSError:
+            pass
 
+    def release(self, stream_id: int, cancel: bool):
+        with self._lock:
+            if self._streams.pop(stream_id, None) is None:
+                return  # Already released
+            if cancel and not self.closed:
+                try:
+                    self.conn.reset_stream(stream_id, error_code=8)  # CANCEL
+                    self.sock.sendall(self.conn.data_to_send())
+                except (self._h2.exceptions.StreamClosedError, OSError):
+                    pass
 
-def run_benchmark(
-    config: APIConfig,
-    iterations: int,
-    prompt: str
-) -> list[RequestResult]:
-    """Run benchmark with specified iterations"""
 
-    results = []
+class ChunkReader:
+    """readinto() for streams that deliver data as whole chunks
 
-    for i in range(iterations):
-        print(f"  Running iteration {i+1}/{iterations}...")
-        result = make_streaming_request(config, prompt, i + 1)
-        results.append(result)
+    Subclasses implement read(); a chunk larger than the caller's buffer
+    is handed out over several calls.
+    """
 
-        # Delay between requests to avoid rate limiting
-        if i < iterations - 1:
-            time.sleep(1.5)
+    _pending = b''
 
-    return results
+    def readinto(self, buffer: memoryview) -> int:
+        chunk = memoryview(self._pending or self.read(len(buffer)))
+        n = min(len(chunk), len(buffer))
+        buffer[:n] = chunk[:n]
+        self._pending = chunk[n:] if n < len(chunk) else b''
+        return n
 
 
-def calculate_percentile(data: list[float], percentile: float) -> float:
-    """Calculate percentile from sorted data"""
-    if not data:
-        return 0.0
-    sorted_data = sorted(data)
-    index = int(len(sorted_data) * percentile / 100)
-    return sorted_data[min(index, len(sorted_data) - 1)]
+class H2Stream(ChunkReader):
+    """One request/response exchange on an H2Connection"""
 
+    def __init__(self, connection: H2Connection, stream_id: int):
+        self.connection = connection
+        self.stream_id = stream_id
+        self.status = 0
+        self.chunks: queue.Queue = queue.Queue()
+        self._headers = threading.Event()
+        self._error: Optional[Exception] = None
+        self._ended = False
 
-def generate_report(
-    config: APIConfig,
-    results: list[RequestResult],
-    prompt: str,
-    iterations: int
-) -> BenchmarkReport:
-    """Generate benchmark report from results"""
+    def on_headers(self, headers: dict):
+        self.status = int(headers.get(':status', 0))
+        self._headers.set()
 
-    successful = [r for r in results if r.success]
-    failed = [r for r in results if not r.success]
+    def fail(self, error: Exception):
+        self._error = error
+        self._headers.set()
+        self.chunks.put(None)
 
-    if not successful:
-        return BenchmarkReport(
-            timestamp=datetime.now().isoformat(),
-            provider=config.provider,
-            endpoint=config.endpoint,
-            model=config.model,
-            prompt=prompt,
-            iterations=iterations,
-            avg_response_time=0,
-            min_response_time=0,
-            max_response_time=0,
-            p50_response_time=0,
-            p95_response_time=0,
-            p99_response_time=0,
-            avg_ttft=0,
-            min_ttft=0,
-            max_ttft=0,
-            avg_tps=0,
-            min_tps=0,
-            max_tps=0,
-            total_tokens=0,
-            success_count=0,
-            failure_count=len(failed),
-            results=[asdict(r) for r in results]
-        )
+    def wait_for_headers(self):
+        if not self._headers.wait(READ_TIMEOUT):
+            raise socket.timeout("Timed out waiting for HTTP/2 response headers")
+        if self._error and not self.status:
+            raise self._error
+
+    def read(self, size: int) -> bytes:
+        # DATA frames keep their framing; size is only a hint here
+        if self._ended:
+            return b''
+        try:
+            chunk = self.chunks.get(timeout=READ_TIMEOUT)
+        except queue.Empty:
+            raise socket.timeout("HTTP/2 read timeout")
+        if chunk is None:
+            raise self._error
+        if not chunk:
+            self._ended = True
+        return chunk
+
+    def read_all(self) -> bytes:
+        parts = []
+        while chunk := self.read(65536):
+            parts.append(chunk)
+        return b''.join(parts)
+
+    def close(self):
+        self.connection.release(self.stream_id, cancel=not self._ended)
+
+    def abort(self):
+        self.fail(ConnectionAbortedError("HTTP/2 stream cancelled"))
+        self.close()
+
+
+class H2Pool:
+    """Shares one HTTP/2 connection per origin across request threads"""
+
+    def __init__(self):
+        self._connections: dict[tuple, H2Connection] = {}
+        self._opened: list[H2Connection] = []
+        self._lock = threading.Lock()
+
+    def open(self, config: APIConfig, request: PreparedRequest, race: Optional['HedgeRace'] = None) -> H2Stream:
+        scheme, host, port, path = request_target(config)
+        key = (scheme, host, port)
+        connect_time = 0.0
+        with self._lock:
+            connection = self._connections.get(key)
+            if connection is None or connection.closed:
+                connect_start = time.time()
+                connection = H2Connection(scheme, host, port)
+                connect_time = time.time() - connect_start
+                self._connections[key] = connection
+                self._opened.append(connection)
+            CONNECTIONS.add(config)
+
+        stream = connection.open(path, request.headers, request.body, race)
+        stream.connect_time = connect_time
+        return stream
+
+    def reader_cpu_time(self, configs: list[APIConfig]) -> float:
+        """Reader thread CPU so far on connections to the given configs' origins"""
+        origins = {request_target(c)[:3] for c in configs}
+        with self._lock:
+            return sum(c.reader_cpu_time for c in self._opened if c.origin in origins)
+
+
+H2_POOL = H2Pool()
+
+
+class ConnectionCounter:
+    """Counts transport connections opened per origin and proxy
+
+    HTTP/1.1 opens one per attempt (hedge backups included), HTTP/2 one per
+    pooled connection; callers diff total() around the run they measure.
+    """
+
+    def __init__(self):
+        self._counts: dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(config: APIConfig) -> tuple:
+        return (*request_target(config)[:3], config.proxy)
+
+    def add(self, config: APIConfig):
+        key = self._key(config)
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def total(self, configs: list[APIConfig]) -> int:
+        keys = {self._key(c) for c in configs}
+        with self._lock:
+            return sum(self._counts.get(k, 0) for k in keys)
+
+
+CONNECTIONS = ConnectionCounter()
+
+
+class PassThroughProxy:
+    """Local HTTP CONNECT proxy that forwards bytes unchanged
+
+    Stands in for a relay when none is available: tunnelled requests pay
+    for one extra local hop (a TCP accept, the CONNECT exchange and a copy
+    of every byte each way) and nothing else.
+    """
+
+    def __init__(self):
+        self.server = socket.create_server(('127.0.0.1', 0))
+        self.address = f"127.0.0.1:{self.server.getsockname()[1]}"
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client: socket.socket):
+        try:
+            request = b''
+            while b'\r\n\r\n' not in request:
+                data = client.recv(4096)
+                if not data:
+                    client.close()
+                    return
+                request += data
+            host, _, port = request.split(b' ', 2)[1].decode('ascii').rpartition(':')
+            try:
+                upstream = socket.create_connection((host, int(port)), timeout=CONNECT_TIMEOUT)
+            except (OSError, ValueError):
+                client.sendall(b'HTTP/1.1 502 Bad Gateway\r\n\r\n')
+                client.close()
+                return
+            upstream.settimeout(None)
+            client.sendall(b'HTTP/1.1 200 Connection established\r\n\r\n')
+        except (OSError, IndexError, UnicodeDecodeError):
+            client.close()
+            return
+        threading.Thread(target=self._pipe, args=(upstream, client), daemon=True).start()
+        self._pipe(client, upstream)
+
+    @staticmethod
+    def _pipe(source: socket.socket, sink: socket.socket):
+        try:
+            while data := source.recv(65536):
+                sink.sendall(data)
+        except OSError:
+            pass
+        finally:
+            # Either side closing ends the tunnel. shutdown() rather than
+            # close() so the peer sees EOF while the other pipe thread is
+            # still blocked in recv() on these sockets
+            for sock in (source, sink):
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                sock.close()
+
+    def close(self):
+        self.server.close()
+
+
+CASSETTE_MAGIC = b'SSECAS1\n'
+CASSETTE_RECORD = struct.Struct('<dI')  # (offset seconds, chunk length)
+
+
+class CassetteRecorder:
+    """Saves raw response byte streams with per-chunk arrival offsets
+
+    Each request attempt becomes one gzip file: a magic line, a JSON header
+    line, then (offset, length) records each followed by the chunk bytes.
+    Attempts are numbered per iteration, so hedged duplicates get their own
+    files. Streams that failed or were aborted part-way are saved too.
+    """
+
+    def __init__(self, directory: Path, config: APIConfig):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.header = {
+            'provider': config.provider,
+            'endpoint': config.endpoint,
+            'model': config.model,
+            'recorded_at': datetime.now().isoformat(),
+        }
+        self.saved = 0
+        self._attempts: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, stream, start_time: float, iteration: int) -> 'RecordingStream':
+        with self._lock:
+            attempt = self._attempts[iteration] = self._attempts.get(iteration, 0) + 1
+        return RecordingStream(stream, self, start_time, iteration, attempt)
+
+    def save(self, iteration: int, attempt: int, status: int, headers_offset: float,
+             chunks: list[tuple[float, bytes]], aborted: bool = False):
+        header = dict(
+            self.header, iteration=iteration, attempt=attempt, status=status,
+            headers_offset=headers_offset, aborted=aborted
+        )
+        path = self.directory / f"cassette-{iteration:05d}-{attempt}.sse.gz"
+        with gzip.open(path, 'wb') as f:
+            f.write(CASSETTE_MAGIC)
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            for offset, chunk in chunks:
+                f.write(CASSETTE_RECORD.pack(offset, len(chunk)))
+                f.write(chunk)
+        with self._lock:
+            self.saved += 1
+
+
+class RecordingStream:
+    """Tees chunks read from a stream into a cassette, saved on the first close"""
+
+    def __init__(self, stream, recorder: CassetteRecorder, start_time: float, iteration: int, attempt: int):
+        self.stream = stream
+        self.status = stream.status
+        self.recorder = recorder
+        self.start_time = start_time
+        self.iteration = iteration
+        self.attempt = attempt
+        self.aborted = False
+        self.saved = False
+        self.headers_offset = time.time() - start_time
+        self.connect_time = getattr(stream, 'connect_time', 0.0)
+        self.chunks: list[tuple[float, bytes]] = []
+
+    def read(self, size: int) -> bytes:
+        chunk = self.stream.read(size)
+        if chunk:
+            self.chunks.append((time.time() - self.start_time, chunk))
+        return chunk
+
+    def readinto(self, buffer: memoryview) -> int:
+        n = self.stream.readinto(buffer)
+        if n:
+            self.chunks.append((time.time() - self.start_time, bytes(buffer[:n])))
+        return n
+
+    def read_all(self) -> bytes:
+        body = self.stream.read_all()
+        self.chunks.append((time.time() - self.start_time, body))
+        return body
+
+    def close(self):
+        self.stream.close()
+        if not self.saved:
+            self.saved = True
+            self.recorder.save(
+                self.iteration, self.attempt, self.status, self.headers_offset, self.chunks, self.aborted
+            )
+
+    def abort(self):
+        self.aborted = True
+        self.stream.abort()
+
+
+def load_cassette(path: Path) -> tuple[dict, list[tuple[float, bytes]]]:
+    """Read a cassette file into (header, [(offset, chunk), ...])"""
+    with gzip.open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(CASSETTE_MAGIC):
+        raise ValueError(f"{path} is not an SSE cassette")
+    header_end = data.index(b'\n', len(CASSETTE_MAGIC))
+    header = json.loads(data[len(CASSETTE_MAGIC):header_end])
+
+    chunks = []
+    view = memoryview(data)
+    pos = header_end + 1
+    while pos < len(data):
+        offset, length = CASSETTE_RECORD.unpack_from(data, pos)
+        pos += CASSETTE_RECORD.size
+        chunks.append((offset, bytes(view[pos:pos + length])))
+        pos += length
+    return header, chunks
+
+
+class CassettePlayer:
+    """Serves recorded streams in place of network requests (--replay)
+
+    Cassettes are handed out round-robin. At 'original' speed every chunk
+    is released at its recorded offset from the request start; at 'max'
+    speed chunks are returned immediately, leaving only client overhead.
+    """
+
+    def __init__(self, paths: list[Path], speed: str = 'original'):
+        # Hedge attempts cancelled by the client say nothing about the server
+        self.cassettes = [c for c in map(load_cassette, paths) if not c[0].get('aborted')]
+        if not self.cassettes:
+            raise ValueError("no cassettes to replay")
+        self.speed = speed
+        self._next = itertools.cycle(range(len(self.cassettes)))
+        self._lock = threading.Lock()
+
+    @property
+    def header(self) -> dict:
+        return self.cassettes[0][0]
+
+    def open(self, start_time: float, race: Optional['HedgeRace'] = None) -> 'CassetteStream':
+        with self._lock:
+            header, chunks = self.cassettes[next(self._next)]
+        stream = CassetteStream(header, chunks, start_time, self.speed == 'original')
+        if race and not race.register(stream):
+            raise HedgeLost()
+        if stream.paced:
+            stream._wait(header.get('headers_offset', 0.0))
+            if stream.aborted.is_set():
+                raise HedgeLost()
+        return stream
+
+
+class CassetteStream(ChunkReader):
+    """Stream-like view over one recorded cassette"""
+
+    def __init__(self, header: dict, chunks: list[tuple[float, bytes]], start_time: float, paced: bool):
+        self.status = header.get('status', 200)
+        self.chunks = iter(chunks)
+        self.start_time = start_time
+        self.paced = paced
+        self.aborted = threading.Event()
+
+    def _wait(self, offset: float):
+        delay = self.start_time + offset - time.time()
+        if delay > 0:
+            self.aborted.wait(delay)
+
+    def read(self, size: int) -> bytes:
+        # Chunks keep their recorded framing; size is only a hint here
+        offset, chunk = next(self.chunks, (0.0, b''))
+        if self.paced and chunk:
+            self._wait(offset)
+        return chunk
+
+    def read_all(self) -> bytes:
+        return b''.join(chunk for _, chunk in self.chunks)
+
+    def close(self):
+        pass
+
+    def abort(self):
+        self.chunks = iter(())
+        self.aborted.set()
+
+
+class HedgeRace:
+    """Decides which of several duplicate requests wins (hedging mode)
+
+    Each attempt runs in its own thread and registers its stream before
+    connecting. The first attempt to receive a chunk claims the race and
+    aborts every other registered stream, including ones still connecting
+    or waiting for headers; attempts that register after the race is
+    decided are refused.
+    """
+
+    def __init__(self):
+        self.first_token = threading.Event()
+        self.winner: Optional[int] = None
+        self._streams: dict[int, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, stream) -> bool:
+        """Track an opened stream; False means the race is already lost"""
+        with self._lock:
+            if self.winner is not None:
+                return False
+            self._streams[threading.get_ident()] = stream
+            return True
+
+    def lost(self) -> bool:
+        """True in an attempt whose race another attempt has won"""
+        with self._lock:
+            return self.winner is not None and self.winner != threading.get_ident()
+
+    def claim(self) -> bool:
+        """Claim the win on first chunk; False means another attempt won"""
+        me = threading.get_ident()
+        with self._lock:
+            if self.winner is None:
+                self.winner = me
+                losers = [st for ident, st in self._streams.items() if ident != me]
+            elif self.winner != me:
+                return False
+            else:
+                return True
+        self.first_token.set()
+        for stream in losers:
+            stream.abort()
+        return True
+
+
+def open_stream(config: APIConfig, request: PreparedRequest, start_time: float, iteration: int,
+                race: Optional[HedgeRace] = None):
+    """Open the response stream for one request on the configured transport
+
+    With race, the stream is registered with it before the request is sent
+    (HedgeLost if the race is already decided).
+    """
+    if config.player:
+        return config.player.open(start_time, race)
+    if config.http_version == '2':
+        stream = H2_POOL.open(config, request, race)
+    else:
+        stream = HTTPStream(config, request, race)
+    if config.recorder:
+        return config.recorder.wrap(stream, start_time, iteration)
+    return stream
+
+
+def make_streaming_request(
+    config: APIConfig,
+    prompt: str,
+    iteration: int,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    messages: Optional[list[dict]] = None,
+    cache_prompt: bool = False,
+    race: Optional[HedgeRace] = None
+) -> RequestResult:
+    """Make a streaming API request and measure performance with accurate TTFT
+
+    With messages (conversation mode) the reply text and prompt usage are
+    also extracted from the stream. With race (hedging mode) the request
+    gives up as soon as a duplicate request receives its first chunk.
+    """
+
+    # Budget waits for a shard happen before the request's clock starts
+    shard = config.pool.acquire() if config.pool else None
+    if shard:
+        config = shard.config
+
+    # Thread CPU time excludes time blocked on the socket, so it isolates
+    # the work done by this client from the time spent waiting on the server
+    cpu_start = time.thread_time()
+    result = _send_streaming_request(config, prompt, iteration, max_tokens, messages, cache_prompt, race)
+    result.cpu_time = time.thread_time() - cpu_start
+    if shard:
+        result.shard = shard.name
+    return result
+
+
+_thread_buffers = threading.local()
+
+
+def _read_buffer() -> memoryview:
+    """This thread's reusable response read buffer"""
+    buffer = getattr(_thread_buffers, 'buffer', None)
+    if buffer is None:
+        buffer = _thread_buffers.buffer = memoryview(bytearray(READ_BUFFER_SIZE))
+    return buffer
+
+
+class StreamReader:
+    """Reads a response stream up to its end marker, timing each chunk
+
+    Whatever has arrived is read into the thread's reusable buffer and
+    appended to body as raw bytes; callers decode the body once, so no
+    per-chunk str is built and characters split across reads survive.
+    State is kept on the reader so a partial body is still available
+    after a read fails.
+    """
+
+    END_MARKERS = (b'[DONE]', b'</s>')
+
+    def __init__(self, start_time: float):
+        self.start_time = start_time
+        self.body = bytearray()
+        self.ttft = 0.0
+        self.chunks = 0
+        self.last_chunk_time = start_time
+        # Body length after each chunk and its arrival time (see time_at)
+        self.chunk_ends: list[int] = []
+        self.chunk_times: list[float] = []
+
+    def read(self, response, race: Optional[HedgeRace] = None) -> bool:
+        """Read to the end of the stream; False if the hedge race was lost"""
+        buffer = _read_buffer()
+        body = self.body
+
+        while True:
+            n = response.readinto(buffer)
+            if not n:
+                return True
+            self.last_chunk_time = time.time()
+            self.chunks += 1
+
+            # Record time to first token
+            if self.chunks == 1:
+                self.ttft = self.last_chunk_time - self.start_time
+                if race and not race.claim():
+                    return False
+
+            # Accumulate, then look for an end marker in the new bytes
+            # (plus enough overlap to catch one split across reads)
+            scan_from = max(len(body) - 5, 0)
+            body += buffer[:n]
+            self.chunk_ends.append(len(body))
+            self.chunk_times.append(self.last_chunk_time)
+            for marker in self.END_MARKERS:
+                if body.find(marker, scan_from) >= 0:
+                    return True
+
+    @property
+    def text(self) -> str:
+        return self.body.decode('utf-8', errors='ignore')
+
+    def time_at(self, offset: int) -> float:
+        """Seconds from request start until body byte offset arrived"""
+        index = bisect.bisect_right(self.chunk_ends, offset)
+        if index >= len(self.chunk_times):
+            return self.last_chunk_time - self.start_time
+        return self.chunk_times[index] - self.start_time
+
+    @property
+    def itl(self) -> float:
+        """Mean gap between chunks after the first"""
+        if self.chunks < 2:
+            return 0.0
+        return (self.last_chunk_time - self.start_time - self.ttft) / (self.chunks - 1)
+
+
+def _send_streaming_request(
+    config: APIConfig,
+    prompt: str,
+    iteration: int,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    messages: Optional[list[dict]] = None,
+    cache_prompt: bool = False,
+    race: Optional[HedgeRace] = None
+) -> RequestResult:
+    """Send one streaming request (see make_streaming_request)"""
+
+    request = prepare_request(config, prompt, max_tokens, messages, cache_prompt)
+    start_time = time.time()
+    reader = StreamReader(start_time)
+    response = None
+
+    try:
+        # Connect, send and wait for the response headers
+        response = open_stream(config, request, start_time, iteration, race)
+        headers_time = time.time() - start_time
+
+        if response.status != 200:
+            error_text = response.read_all().decode('utf-8', errors='ignore')
+            response.close()
+            return _failure_result(
+                iteration, start_time,
+                classify_http_status(response.status, error_text),
+                f"HTTP {response.status}: {error_text[:200]}"
+            )
+
+        if not reader.read(response, race):
+            response.abort()
+            return _failure_result(iteration, start_time, 'cancelled', "Cancelled (hedge lost)")
+        response.close()
+
+        # Calculate metrics
+        response_time = time.time() - start_time
+        ttft = reader.ttft
+        parse_start = time.thread_time()
+        response_text = reader.text
+        tokens = count_tokens(reader.body, config.provider)
+
+        # A 200 response can still fail mid-stream
+        problem = classify_stream(response_text, config.provider)
+        if problem:
+            kind, message = problem
+            return _failure_result(
+                iteration, start_time, kind, message,
+                ttft=ttft, tokens=tokens, response_time=response_time
+            )
+
+        tokens = max(tokens, 1)  # At least 1 token
+        reply, input_tokens, cached_tokens = None, 0, 0
+        if messages is not None:
+            reply = extract_reply(response_text, config.provider)
+            input_tokens, cached_tokens = extract_prompt_usage(response_text, config.provider)
+        parse_time = time.thread_time() - parse_start
+
+        return RequestResult(
+            iteration=iteration,
+            success=True,
+            response_time=response_time,
+            ttft=ttft,
+            tokens=tokens,
+            tps=tokens / response_time if response_time > 0 else 0,
+            tpot=(response_time - ttft) / (tokens - 1) if tokens > 1 else 0,
+            parse_time=parse_time,
+            input_tokens=input_tokens,
+            cached_tokens=cached_tokens,
+            reply=reply,
+            connect_time=getattr(response, 'connect_time', 0.0),
+            headers_time=headers_time,
+            itl=reader.itl,
+            **(tool_call_metrics(reader, config.provider) if config.tools else {})
+        )
+
+    except HedgeLost:
+        return _failure_result(iteration, start_time, 'cancelled', "Cancelled (hedge lost)")
+    except ConnectTimeout as e:
+        if race and race.lost():
+            return _failure_result(iteration, start_time, 'cancelled', "Cancelled (hedge lost)")
+        return _failure_result(iteration, start_time, 'connect_timeout', str(e))
+    except socket.timeout:
+        return _failure_result(
+            iteration, start_time, 'read_timeout', "Request timeout", ttft=reader.ttft,
+            tokens=count_tokens(reader.body, config.provider) if reader.body else 0
+        )
+    except (ConnectionError, http.client.HTTPException, OSError) as e:
+        # An abort from the winning attempt surfaces as a socket error here
+        if race and race.lost():
+            return _failure_result(iteration, start_time, 'cancelled', "Cancelled (hedge lost)")
+        # Cut mid-chunk, or reset after the first byte: the stream was truncated
+        if isinstance(e, http.client.IncompleteRead) or reader.body:
+            return _failure_result(
+                iteration, start_time, 'truncated',
+                f"Stream cut off after {len(reader.body)} bytes: {str(e) or type(e).__name__}",
+                ttft=reader.ttft, tokens=count_tokens(reader.body, config.provider)
+            )
+        return _failure_result(iteration, start_time, 'connection_error', str(e) or type(e).__name__)
+    except Exception as e:
+        if race and race.lost():
+            return _failure_result(iteration, start_time, 'cancelled', "Cancelled (hedge lost)")
+        return _failure_result(iteration, start_time, 'client_error', str(e), ttft=reader.ttft)
+    finally:
+        # Closing is idempotent; this releases the stream on the failure
+        # paths too, and is where a recorder saves a failed or cut-off stream
+        if response is not None:
+            if race and race.lost():
+                response.abort()
+            response.close()
+
+
+def _failure_result(
+    iteration: int,
+    start_time: float,
+    kind: str,
+    error: str,
+    ttft: float = 0.0,
+    tokens: int = 0,
+    response_time: Optional[float] = None
+) -> RequestResult:
+    """Result for a failed request, keeping time-to-failure and partial output"""
+    if response_time is None:
+        response_time = time.time() - start_time
+    return RequestResult(
+        iteration=iteration,
+        success=False,
+        response_time=response_time,
+        ttft=ttft,
+        tokens=tokens,
+        tps=0,
+        error=error,
+        error_kind=kind
+    )
+
+
+def classify_stream(text: str, provider: str) -> Optional[tuple[str, str]]:
+    """Detect failures inside a 200 response: (kind, message) or None
+
+    Looks for error events (overloaded or otherwise), data lines that are
+    not valid JSON, and streams that stop without their terminal event
+    (message_stop for Anthropic, [DONE] or a finish_reason for OpenAI).
+    """
+
+    if provider not in ('Anthropic', 'OpenAI', 'Azure OpenAI'):
+        if provider == 'Google Gemini':
+            try:
+                json.loads(text)
+            except json.JSONDecodeError:
+                return 'truncated', "Incomplete JSON response"
+        return None
+
+    terminated = False
+    parse_errors = 0
+
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line.startswith('data:'):
+            continue
+        data_str = line[5:].strip()
+        if not data_str:
+            continue
+        if data_str == '[DONE]':
+            terminated = True
+            continue
+        try:
+            data = json.loads(data_str)
+        except json.JSONDecodeError:
+            parse_errors += 1
+            continue
+        if not isinstance(data, dict):
+            continue
+
+        if data.get('type') == 'error' or 'error' in data:
+            error = data.get('error') or {}
+            error_type = error.get('type', '') if isinstance(error, dict) else str(error)
+            message = error.get('message', error_type) if isinstance(error, dict) else error_type
+            kind = 'overloaded' if 'overloaded' in f"{error_type} {message}".lower() else 'stream_error'
+            return kind, f"Stream error event: {message or error_type}"
+
+        if data.get('type') == 'message_stop':
+            terminated = True
+        choices = data.get('choices') or []
+        if choices and choices[0].get('finish_reason'):
+            terminated = True
+
+    if not terminated:
+        return 'truncated', "Stream ended without a terminal event"
+    if parse_errors:
+        return 'parse_error', f"{parse_errors} unparseable data line(s)"
+    return None
+
+
+# Anthropic data lines that can carry output. The common text delta without
+# escapes is captured as raw text (group 1); any other delta line is
+# captured whole for json (group 2).
+ANTHROPIC_DELTA_LINE = re.compile(
+    rb'^[ \t]*data:[ \t]*(?:'
+    rb'\{"type": ?"content_block_delta", ?"index": ?\d+, ?'
+    rb'"delta": ?\{"type": ?"text_delta", ?"text": ?"([^"\\\n]*)"\}\}\r?$'
+    rb'|(\{.*"delta".*))',
+    re.M
+)
+OPENAI_CHOICES_LINE = re.compile(rb'^[ \t]*data:[ \t]*(\{.*"choices".*)', re.M)
+
+
+def count_tokens(body: bytes, provider: str) -> int:
+    """Count tokens from a streaming response body
+
+    SSE data lines are found by scanning the bytes, and only lines that
+    can carry output are decoded, so the body is never decoded as a whole.
+    """
+    tokens = 0
+
+    if provider == 'Anthropic':
+        for text, line in ANTHROPIC_DELTA_LINE.findall(body):
+            if text:
+                tokens += count_words(text.decode('utf-8', errors='ignore'))
+            elif line:
+                try:
+                    delta = json.loads(line.decode('utf-8', errors='ignore'))['delta']
+                    if 'text' in delta:
+                        tokens += count_words(delta['text'])
+                    elif 'partial_json' in delta:
+                        tokens += count_argument_tokens(delta['partial_json'])
+                except Exception:
+                    pass
+
+    elif provider in ('OpenAI', 'Azure OpenAI'):
+        for line in OPENAI_CHOICES_LINE.findall(body):
+            try:
+                data = json.loads(line.decode('utf-8', errors='ignore'))
+                if data['choices']:
+                    delta = data['choices'][0].get('delta', {})
+                    if delta.get('content'):
+                        tokens += count_words(delta['content'])
+                    for tool_call in delta.get('tool_calls') or []:
+                        arguments = (tool_call.get('function') or {}).get('arguments')
+                        if arguments:
+                            tokens += count_argument_tokens(arguments)
+            except Exception:
+                pass
+
+    else:
+        # Fallback: estimate by words
+        tokens = count_words(body.decode('utf-8', errors='ignore'))
+
+    return tokens
+
+
+def extract_tool_calls(body: bytes, provider: str) -> list[dict]:
+    """Tool calls streamed in an SSE body, in call order
+
+    Each call has its name, the concatenated argument JSON and the byte
+    offsets of the lines carrying its first and last non-empty argument
+    fragment. Gemini responses are not streamed and yield no calls here.
+    """
+
+    calls: dict[int, dict] = {}
+
+    def add_fragment(call: dict, fragment: str, offset: int):
+        if fragment:
+            call['arguments'].append(fragment)
+            if call['first_offset'] is None:
+                call['first_offset'] = offset
+            call['last_offset'] = offset
+
+    offset = 0
+    for line in body.split(b'\n'):
+        start = offset
+        offset += len(line) + 1
+        # Tool events mention tool_use, input_json_delta or tool_calls
+        if not line.startswith(b'data:') or b'tool' not in line and b'input_json' not in line:
+            continue
+        try:
+            data = json.loads(line[5:])
+        except ValueError:
+            continue
+        if not isinstance(data, dict):
+            continue
+
+        if provider == 'Anthropic':
+            block = data.get('content_block') or {}
+            delta = data.get('delta') or {}
+            if data.get('type') == 'content_block_start' and block.get('type') == 'tool_use':
+                calls[data.get('index', 0)] = {
+                    'name': block.get('name'), 'arguments': [], 'first_offset': None, 'last_offset': None
+                }
+            elif delta.get('type') == 'input_json_delta' and data.get('index', 0) in calls:
+                add_fragment(calls[data.get('index', 0)], delta.get('partial_json', ''), start)
+
+        elif provider in ('OpenAI', 'Azure OpenAI'):
+            for choice in data.get('choices') or []:
+                for tool_call in (choice.get('delta') or {}).get('tool_calls') or []:
+                    call = calls.setdefault(tool_call.get('index', 0), {
+                        'name': None, 'arguments': [], 'first_offset': None, 'last_offset': None
+                    })
+                    function = tool_call.get('function') or {}
+                    if function.get('name'):
+                        call['name'] = function['name']
+                    add_fragment(call, function.get('arguments') or '', start)
+
+    result = []
+    for _, call in sorted(calls.items()):
+        call['arguments'] = ''.join(call['arguments'])
+        result.append(call)
+    return result
+
+
+def tool_call_metrics(reader: 'StreamReader', provider: str) -> dict:
+    """RequestResult tool fields for a completed stream"""
+    calls = [c for c in extract_tool_calls(reader.body, provider) if c['first_offset'] is not None]
+    if not calls:
+        return {}
+
+    valid = True
+    for call in calls:
+        try:
+            json.loads(call['arguments'])
+        except ValueError:
+            valid = False
+
+    return {
+        'tool_calls': len(calls),
+        'tool_ttft': reader.time_at(min(c['first_offset'] for c in calls)),
+        'tool_args_time': reader.time_at(max(c['last_offset'] for c in calls)),
+        'tool_tokens': sum(count_argument_tokens(c['arguments']) for c in calls),
+        'tool_args_valid': valid,
+    }
+
+
+def _iter_stream_events(text: str):
+    """Yield decoded JSON objects from SSE data lines or a plain JSON body"""
+    found = False
+    for line in text.split('\n'):
+        line = line.strip()
+        if line.startswith('data:'):
+            data_str = line[5:].strip()
+            if data_str and data_str != '[DONE]':
+                try:
+                    yield json.loads(data_str)
+                    found = True
+                except json.JSONDecodeError:
+                    pass
+
+    if not found:
+        # Non-streaming providers (Gemini generateContent) return one document
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            return
+        yield from data if isinstance(data, list) else [data]
+
+
+def extract_reply(text: str, provider: str) -> str:
+    """Reassemble the assistant reply text from a response body"""
+    parts = []
+
+    for data in _iter_stream_events(text):
+        if not isinstance(data, dict):
+            continue
+        if provider == 'Anthropic':
+            delta = data.get('delta') or {}
+            if 'text' in delta:
+                parts.append(delta['text'])
+        elif provider in ('OpenAI', 'Azure OpenAI'):
+            choices = data.get('choices') or []
+            if choices:
+                content = (choices[0].get('delta') or {}).get('content')
+                if content:
+                    parts.append(content)
+        else:
+            for candidate in data.get('candidates', [])[:1]:
+                for part in candidate.get('content', {}).get('parts', []):
+                    parts.append(part.get('text', ''))
+
+    return ''.join(parts)
+
+
+def extract_prompt_usage(text: str, provider: str) -> tuple[int, int]:
+    """Return (input_tokens, cached_tokens) reported in a response, if any"""
+    input_tokens, cached_tokens = 0, 0
+
+    for data in _iter_stream_events(text):
+        if not isinstance(data, dict):
+            continue
+        if provider == 'Anthropic' and data.get('type') == 'message_start':
+            usage = data.get('message', {}).get('usage', {})
+            cached_tokens = usage.get('cache_read_input_tokens') or 0
+            # input_tokens excludes cache reads and writes; report the full prompt
+            input_tokens = (
+                (usage.get('input_tokens') or 0)
+                + cached_tokens
+                + (usage.get('cache_creation_input_tokens') or 0)
+            )
+        elif data.get('usage'):
+            usage = data['usage']
+            if 'prompt_tokens' in usage:
+                input_tokens = usage['prompt_tokens'] or 0
+                cached_tokens = (usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0
+        elif data.get('usageMetadata'):
+            usage = data['usageMetadata']
+            input_tokens = usage.get('promptTokenCount', 0)
+            cached_tokens = usage.get('cachedContentTokenCount', 0)
+
+    return input_tokens, cached_tokens
+
+
+def count_words(text: str) -> int:
+    """Simple word count (approximate token count)"""
+    # Basic estimation: ~0.75 tokens per word for English
+    words = len(text.split())
+    return max(int(words * 1.3), words)  # Slightly overestimate
+
+
+def count_argument_tokens(text: str) -> int:
+    """Approximate token count of tool call arguments"""
+    # JSON has few spaces, so words undercount; ~4 characters per token
+    return max(len(text) // 4, count_words(text))
+
+
+class ClientProfiler:
+    """Optional cProfile/tracemalloc snapshots of the request hot loop"""
+
+    def __init__(self, snapshots: Optional[list[str]] = None):
+        snapshots = snapshots or []
+        self.use_cprofile = 'cprofile' in snapshots
+        self.use_tracemalloc = 'tracemalloc' in snapshots
+        self.profiled_requests = 0
+        self.stats: Optional[pstats.Stats] = None
+        self.memory_snapshot: Optional[tracemalloc.Snapshot] = None
+        # cProfile can only trace one request at a time; concurrent requests
+        # that find the lock taken run unprofiled (sampling, not blocking)
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.use_tracemalloc:
+            tracemalloc.start(25)
+
+    def stop(self):
+        if self.use_tracemalloc and tracemalloc.is_tracing():
+            self.memory_snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def call(self, func, *args, **kwargs):
+        """Run func, profiling it with cProfile when enabled and idle"""
+        if not self.use_cprofile or not self._lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            profile = cProfile.Profile()
+            result = profile.runcall(func, *args, **kwargs)
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+            self.profiled_requests += 1
+            return result
+        finally:
+            self._lock.release()
+
+    def save(self, output_dir: Path) -> list[Path]:
+        """Write collected snapshots to output_dir, returning written paths"""
+        written = []
+
+        if self.stats is not None:
+            pstats_path = output_dir / "profile.pstats"
+            self.stats.dump_stats(str(pstats_path))
+            text = io.StringIO()
+            self.stats.stream = text
+            self.stats.sort_stats('cumulative').print_stats(40)
+            top_path = output_dir / "profile-top.txt"
+            top_path.write_text(text.getvalue(), encoding='utf-8')
+            written.extend([pstats_path, top_path])
+
+        if self.memory_snapshot is not None:
+            lines = [
+                f"{stat.traceback}: {stat.size / 1024:.1f} KiB in {stat.count} blocks"
+                for stat in self.memory_snapshot.statistics('lineno')[:40]
+            ]
+            mem_path = output_dir / "tracemalloc-top.txt"
+            mem_path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+            written.append(mem_path)
+
+        return written
+
+
+def run_benchmark(
+    config: APIConfig,
+    iterations: int,
+    prompt: str,
+    profiler: Optional[ClientProfiler] = None,
+    workload: Optional[list[WorkloadClass]] = None
+) -> list[RequestResult]:
+    """Run benchmark with specified iterations
+
+    When workload is given, iteration i sends workload[i] instead of prompt.
+    """
+
+    results = []
+
+    for i in range(iterations):
+        request_prompt, max_tokens, label = prompt, DEFAULT_MAX_TOKENS, None
+        if workload:
+            request_prompt, max_tokens, label = workload[i].prompt, workload[i].max_tokens, workload[i].name
+            print(f"  Running iteration {i+1}/{iterations} ({label})...")
+        else:
+            print(f"  Running iteration {i+1}/{iterations}...")
+        if profiler:
+            result = profiler.call(make_streaming_request, config, request_prompt, i + 1, max_tokens)
+        else:
+            result = make_streaming_request(config, request_prompt, i + 1, max_tokens)
+        result.label = label
+        results.append(result)
+
+        # Delay between requests to avoid rate limiting
+        if i < iterations - 1 and not config.player:
+            time.sleep(1.5)
+
+    return results
+
+
+COMPARE_MODES = ('interleaved', 'concurrent')
+
+
+def run_comparison(
+    endpoints: list[tuple[str, APIConfig]],
+    iterations: int,
+    prompt: str,
+    mode: str = 'interleaved',
+    profiler: Optional[ClientProfiler] = None
+) -> dict[str, list[RequestResult]]:
+    """Benchmark several endpoints under identical load in one run
+
+    'interleaved' sends one request per endpoint per round, rotating the
+    starting endpoint every round so none is systematically first;
+    'concurrent' sends each round's requests to all endpoints at once.
+    Either way every endpoint sees the same prompts at the same times.
+    """
+
+    results: dict[str, list[RequestResult]] = {name: [] for name, _ in endpoints}
+
+    def send(name: str, config: APIConfig, iteration: int) -> tuple[str, RequestResult]:
+        if profiler:
+            return name, profiler.call(make_streaming_request, config, prompt, iteration)
+        return name, make_streaming_request(config, prompt, iteration)
+
+    for i in range(iterations):
+        print(f"  Round {i+1}/{iterations} ({mode}, {len(endpoints)} endpoints)...")
+        if mode == 'concurrent':
+            with ThreadPoolExecutor(max_workers=len(endpoints)) as pool:
+                futures = [pool.submit(send, name, config, i + 1) for name, config in endpoints]
+                for future in futures:
+                    name, result = future.result()
+                    results[name].append(result)
+        else:
+            shift = i % len(endpoints)
+            for name, config in endpoints[shift:] + endpoints[:shift]:
+                results[name].append(send(name, config, i + 1)[1])
+
+        # Delay between rounds to avoid rate limiting
+        if i < iterations - 1:
+            time.sleep(1.5)
+
+    return results
+
+
+def make_hedged_request(
+    config: APIConfig,
+    prompt: str,
+    iteration: int,
+    hedge_delay: float,
+    max_tokens: int = DEFAULT_MAX_TOKENS
+) -> RequestResult:
+    """Send a request, plus a backup if no token arrives within hedge_delay
+
+    The first attempt to stream wins and the other is cancelled. Timings
+    of a winning backup are shifted to be relative to the primary's start,
+    which is the latency the caller actually experiences.
+    """
+
+    race = HedgeRace()
+    # Not used as a context manager: leaving one would join a cancelled
+    # attempt still unwinding from its aborted socket
+    pool = ThreadPoolExecutor(max_workers=2)
+    try:
+        primary_start = time.time()
+        primary = pool.submit(
+            make_streaming_request, config, prompt, iteration, max_tokens, None, False, race
+        )
+
+        # Wait for a first token or an early finish (e.g. a fast error)
+        deadline = primary_start + hedge_delay
+        while not race.first_token.is_set() and not primary.done():
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            race.first_token.wait(min(remaining, 0.01))
+
+        if race.first_token.is_set() or primary.done():
+            return primary.result()
+
+        backup_offset = time.time() - primary_start
+        backup = pool.submit(
+            make_streaming_request, config, prompt, iteration, max_tokens, None, False, race
+        )
+
+        # Return as soon as one attempt succeeds; otherwise wait for both
+        results: dict = {}
+        pending = {primary, backup}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[future] = future.result()
+            if any(r.success for r in results.values()):
+                break
+    finally:
+        pool.shutdown(wait=False)
+
+    primary_result, backup_result = results.get(primary), results.get(backup)
+    # The backup's result if it succeeded, or if the primary only lost to it
+    if backup_result and (backup_result.success or not primary_result or primary_result.error_kind == 'cancelled'):
+        result = backup_result
+        result.response_time += backup_offset
+        result.ttft += backup_offset
+        result.tps = result.tokens / result.response_time if result.response_time > 0 else 0
+        result.hedge_won = backup_result.success
+    else:
+        result = primary_result
+    result.hedged = True
+    return result
+
+
+def run_hedged_benchmark(
+    config: APIConfig,
+    iterations: int,
+    prompt: str,
+    hedge_delay: float,
+    profiler: Optional[ClientProfiler] = None
+) -> list[RequestResult]:
+    """Run iterations with request hedging (see make_hedged_request)"""
+
+    results = []
+
+    for i in range(iterations):
+        print(f"  Running hedged iteration {i+1}/{iterations}...")
+        if profiler:
+            result = profiler.call(make_hedged_request, config, prompt, i + 1, hedge_delay)
+        else:
+            result = make_hedged_request(config, prompt, i + 1, hedge_delay)
+        results.append(result)
+
+        # Delay between requests to avoid rate limiting
+        if i < iterations - 1 and not config.player:
+            time.sleep(1.5)
+
+    return results
+
+
+def parse_hedge_delay(spec: str) -> tuple[Optional[float], float]:
+    """Parse '--hedge-delay' into (percentile, seconds); one of them is used"""
+    is_percentile = spec.lower().startswith('p')
+    try:
+        value = float(spec[1:] if is_percentile else spec)
+    except ValueError:
+        raise ValueError(f"expected milliseconds or pNN, got {spec!r}") from None
+    if is_percentile:
+        if not 0 < value <= 100:
+            raise ValueError(f"percentile must be in (0, 100], got {spec!r}")
+        return value, 0.0
+    if value <= 0:
+        raise ValueError(f"delay must be positive, got {spec!r}")
+    return None, value / 1000
+
+
+def resolve_hedge_delay(spec: str, control: list[RequestResult]) -> float:
+    """Turn '--hedge-delay' into seconds, using the control run for 'pNN'"""
+    percentile, delay = parse_hedge_delay(spec)
+    if percentile is None:
+        return delay
+    ttfts = [r.ttft for r in control if r.success and r.ttft > 0]
+    if not ttfts:
+        raise ValueError("control run produced no TTFT samples")
+    return calculate_percentile(ttfts, percentile)
+
+
+def summarize_hedging(
+    control: list[RequestResult],
+    hedged: list[RequestResult],
+    hedge_delay: float,
+    delay_spec: str,
+    prompt: str
+) -> dict:
+    """Compare tail latency and cost of a hedged run against its control"""
+
+    def tail(results: list[RequestResult]) -> dict:
+        successful = [r for r in results if r.success]
+        ttfts = [r.ttft for r in successful if r.ttft > 0]
+        times = [r.response_time for r in successful]
+        return {
+            'requests': len(results),
+            'success_count': len(successful),
+            'p50_ttft': calculate_percentile(ttfts, 50),
+            'p95_ttft': calculate_percentile(ttfts, 95),
+            'p99_ttft': calculate_percentile(ttfts, 99),
+            'p99_response_time': calculate_percentile(times, 99),
+        }
+
+    control_stats, hedged_stats = tail(control), tail(hedged)
+    hedge_count = sum(1 for r in hedged if r.hedged)
+
+    def improvement(key: str) -> float:
+        before = control_stats[key]
+        return (before - hedged_stats[key]) / before * 100 if before > 0 else 0.0
+
+    return {
+        'delay': hedge_delay,
+        'delay_spec': delay_spec,
+        'control': control_stats,
+        'hedged': hedged_stats,
+        'p99_ttft_improvement_pct': improvement('p99_ttft'),
+        'p95_ttft_improvement_pct': improvement('p95_ttft'),
+        'hedge_count': hedge_count,
+        'backup_wins': sum(1 for r in hedged if r.hedge_won),
+        'extra_request_pct': hedge_count / len(hedged) * 100 if hedged else 0.0,
+        # Each hedge resends the whole prompt; output of the cancelled
+        # stream is not visible to the client and is not included
+        'extra_input_tokens': hedge_count * count_words(prompt),
+    }
+
+
+def run_relay_overhead(
+    relay: APIConfig,
+    direct: APIConfig,
+    iterations: int,
+    prompt: str,
+    profiler: Optional[ClientProfiler] = None
+) -> tuple[list[RequestResult], list[RequestResult]]:
+    """Send matched requests alternately through the relay and directly
+
+    Each pair sends the same prompt back to back; the path that goes first
+    alternates so drift in upstream latency cancels out of the deltas.
+    """
+
+    relay_results: list[RequestResult] = []
+    direct_results: list[RequestResult] = []
+
+    def send(config: APIConfig, iteration: int) -> RequestResult:
+        if profiler:
+            return profiler.call(make_streaming_request, config, prompt, iteration)
+        return make_streaming_request(config, prompt, iteration)
+
+    for i in range(iterations):
+        print(f"  Pair {i+1}/{iterations}...")
+        if i % 2:
+            direct_results.append(send(direct, i + 1))
+            relay_results.append(send(relay, i + 1))
+        else:
+            relay_results.append(send(relay, i + 1))
+            direct_results.append(send(direct, i + 1))
+
+        # Delay between pairs to avoid rate limiting
+        if i < iterations - 1:
+            time.sleep(1.5)
+
+    return relay_results, direct_results
+
+
+def bootstrap_ci(
+    values: list[float],
+    confidence: float = 0.95,
+    resamples: int = 2000,
+    seed: int = 0
+) -> tuple[float, float]:
+    """Percentile bootstrap confidence interval for the mean of values"""
+    if len(values) < 2:
+        mean = values[0] if values else 0.0
+        return mean, mean
+    rng = random.Random(seed)
+    n = len(values)
+    means = sorted(sum(rng.choices(values, k=n)) / n for _ in range(resamples))
+    tail = (1 - confidence) / 2
+    return means[int(tail * (resamples - 1))], means[int((1 - tail) * (resamples - 1))]
+
+
+RELAY_PHASES = [
+    ('connect', 'connect_time'),
+    ('headers', 'headers_time'),
+    ('ttft', 'ttft'),
+    ('itl', 'itl'),
+    ('total', 'response_time'),
+]
+
+
+def summarize_relay_overhead(
+    relay_results: list[RequestResult],
+    direct_results: list[RequestResult],
+    relay: APIConfig,
+    direct: APIConfig,
+    stand_in: bool
+) -> dict:
+    """Per-phase relay minus direct deltas over pairs where both succeeded"""
+
+    pairs = [
+        (r, d) for r, d in zip(relay_results, direct_results)
+        if r.success and d.success
+    ]
+    phases = {}
+    for phase, attr in RELAY_PHASES:
+        deltas = [getattr(r, attr) - getattr(d, attr) for r, d in pairs]
+        low, high = bootstrap_ci(deltas)
+        phases[phase] = {
+            'relay_mean': statistics.mean(getattr(r, attr) for r, _ in pairs) if pairs else 0.0,
+            'direct_mean': statistics.mean(getattr(d, attr) for _, d in pairs) if pairs else 0.0,
+            'delta_mean': statistics.mean(deltas) if deltas else 0.0,
+            'delta_p50': calculate_percentile(deltas, 50),
+            'ci_low': low,
+            'ci_high': high,
+            # The interval excludes zero: the hop measurably changes this phase
+            'significant': low > 0 or high < 0,
+        }
+
+    return {
+        'relay_endpoint': f"{relay.endpoint} (via local pass-through proxy)" if stand_in else relay.endpoint,
+        'direct_endpoint': direct.endpoint,
+        'stand_in': stand_in,
+        'pairs': len(relay_results),
+        'complete_pairs': len(pairs),
+        'confidence': 0.95,
+        'phases': phases,
+    }
+
+
+def run_conversations(
+    config: APIConfig,
+    sessions: int,
+    turns: int,
+    prompt: str,
+    cache_prompt: bool = False,
+    profiler: Optional[ClientProfiler] = None
+) -> list[RequestResult]:
+    """Run multi-turn sessions, feeding each reply back as context
+
+    A session stops at its first failed turn, since later turns would no
+    longer see the same history.
+    """
+
+    results = []
+
+    for session in range(sessions):
+        messages: list[dict] = []
+        for turn in range(1, turns + 1):
+            if turn == 1:
+                user_text = prompt
+            else:
+                user_text = CONVERSATION_FOLLOW_UPS[(turn - 2) % len(CONVERSATION_FOLLOW_UPS)]
+            messages.append({'role': 'user', 'content': user_text})
+
+            iteration = len(results) + 1
+            print(f"  Session {session+1}/{sessions}, turn {turn}/{turns}...")
+            if profiler:
+                result = profiler.call(
+                    make_streaming_request, config, prompt, iteration,
+                    DEFAULT_MAX_TOKENS, list(messages), cache_prompt
+                )
+            else:
+                result = make_streaming_request(
+                    config, prompt, iteration, DEFAULT_MAX_TOKENS, list(messages), cache_prompt
+                )
+            result.turn = turn
+            result.label = f"session-{session + 1}"
+            results.append(result)
+
+            if not result.success:
+                print(f"  Session {session+1} aborted at turn {turn}: {result.error}")
+                break
+            # Providers reject empty assistant turns, so keep a placeholder
+            messages.append({'role': 'assistant', 'content': result.reply or '...'})
+
+        # Delay between sessions to avoid rate limiting
+        if session < sessions - 1 and not config.player:
+            time.sleep(1.5)
+
+    return results
+
+
+def summarize_turns(results: list[RequestResult]) -> dict:
+    """Per-turn TTFT/TPS statistics and context-growth trend"""
+
+    by_turn: dict[int, list[RequestResult]] = {}
+    for r in results:
+        if r.turn:
+            by_turn.setdefault(r.turn, []).append(r)
+    if not by_turn:
+        return {}
+
+    per_turn = {}
+    for turn, group in sorted(by_turn.items()):
+        successful = [r for r in group if r.success]
+        ttfts = [r.ttft for r in successful if r.ttft > 0]
+        tps_values = [r.tps for r in successful]
+        inputs = [r.input_tokens for r in successful if r.input_tokens]
+        cached = [r.cached_tokens for r in successful if r.input_tokens]
+        per_turn[turn] = {
+            'requests': len(group),
+            'success_count': len(successful),
+            'avg_ttft': statistics.mean(ttfts) if ttfts else 0,
+            'p50_ttft': calculate_percentile(ttfts, 50),
+            'p95_ttft': calculate_percentile(ttfts, 95),
+            'avg_tps': statistics.mean(tps_values) if tps_values else 0,
+            'avg_input_tokens': statistics.mean(inputs) if inputs else 0,
+            'cache_hit_ratio': sum(cached) / sum(inputs) if inputs and sum(inputs) else 0,
+        }
+
+    # Linear TTFT growth per turn across all successful samples
+    points = [(r.turn, r.ttft) for r in results if r.turn and r.success and r.ttft > 0]
+    ttft_slope = 0.0
+    if len({turn for turn, _ in points}) >= 2:
+        ttft_slope = statistics.linear_regression(
+            [turn for turn, _ in points], [ttft for _, ttft in points]
+        ).slope
+
+    later = [r for r in results if r.turn > 1 and r.success]
+    if not any(r.input_tokens for r in later):
+        cache_status = 'unknown (no usage reported)'
+    elif any(r.cached_tokens for r in later):
+        cache_status = 'working'
+    else:
+        cache_status = 'no cache hits'
+
+    return {
+        'per_turn': per_turn,
+        'ttft_slope': ttft_slope,
+        'prefix_cache': cache_status,
+    }
+
+
+def synthesize_prompt(input_tokens: int) -> str:
+    """Build a prompt of roughly input_tokens tokens from filler words"""
+    instruction = "Summarize the following text in a few sentences:\n"
+    # count_words estimates ~1.3 tokens per word, so invert that here
+    word_count = max(int(input_tokens / 1.3), 1)
+    words = (FILLER_WORDS * (word_count // len(FILLER_WORDS) + 1))[:word_count]
+    return instruction + " ".join(words)
+
+
+def load_workload(path: Path) -> list[WorkloadClass]:
+    """Load a weighted workload profile
+
+    The file is JSON, either {"classes": [...]}, a bare list of classes, or
+    a {"preset": weight} mapping. Each class names a 'preset' from
+    PRESET_PROMPTS or gives its own 'prompt' (or 'input_tokens' to
+    synthesize one), with optional 'name', 'weight' and 'max_tokens'.
+    """
+    data = json.loads(path.read_text(encoding='utf-8'))
+
+    if isinstance(data, dict) and 'classes' in data:
+        entries = data['classes']
+    elif isinstance(data, dict):
+        entries = [{'preset': key, 'weight': weight} for key, weight in data.items()]
+    else:
+        entries = data
+
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("workload profile has no classes")
+
+    classes = []
+    for entry in entries:
+        preset = entry.get('preset')
+        if preset:
+            if preset not in PRESET_PROMPTS:
+                raise ValueError(f"unknown preset '{preset}'")
+            prompt = PRESET_PROMPTS[preset]['prompt']
+        elif entry.get('prompt'):
+            prompt = entry['prompt']
+        elif entry.get('input_tokens'):
+            prompt = synthesize_prompt(int(entry['input_tokens']))
+        else:
+            raise ValueError(f"class needs a 'preset', 'prompt' or 'input_tokens': {entry}")
+
+        weight = float(entry.get('weight', 1.0))
+        if weight < 0:
+            raise ValueError(f"negative weight in class: {entry}")
+
+        classes.append(WorkloadClass(
+            name=entry.get('name') or preset or f"custom-{len(classes) + 1}",
+            prompt=prompt,
+            weight=weight,
+            max_tokens=int(entry.get('max_tokens') or DEFAULT_MAX_TOKENS)
+        ))
+
+    if sum(c.weight for c in classes) <= 0:
+        raise ValueError("workload weights must not all be zero")
+    return classes
+
+
+def draw_workload(classes: list[WorkloadClass], count: int, seed: Optional[int] = None) -> list[WorkloadClass]:
+    """Draw count requests from the weighted class distribution"""
+    rng = random.Random(seed)
+    return rng.choices(classes, weights=[c.weight for c in classes], k=count)
+
+
+def _parse_trace_time(value) -> Optional[float]:
+    """Convert an ISO timestamp string to epoch seconds"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def load_trace(path: Path, default_prompt: str) -> list[TraceRequest]:
+    """Load a replay trace
+
+    Accepts JSONL with one request per line, a JSON list of requests, or the
+    JSON written by parse-claude-logs.py --json. Each request may give an
+    offset in seconds ('offset') or an absolute 'start_time'/'timestamp',
+    plus either a 'prompt' or an 'input_tokens' count and 'max_tokens'
+    (falling back to 'output_tokens').
+    """
+    text = path.read_text(encoding='utf-8')
+
+    entries = None
+    stripped = text.lstrip()
+    if stripped.startswith('[') or stripped.startswith('{'):
+        try:
+            data = json.loads(text)
+            if isinstance(data, list):
+                entries = data
+            elif isinstance(data, dict) and isinstance(data.get('requests'), list):
+                entries = data['requests']
+        except json.JSONDecodeError:
+            pass  # Not a single document, read as JSONL below
+
+    if entries is None:
+        entries = []
+        for line_no, line in enumerate(text.splitlines(), 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_no}: invalid JSON: {e}") from e
+
+    raw = []
+    for entry in entries:
+        if 'offset' in entry:
+            when = float(entry['offset'])
+        else:
+            when = _parse_trace_time(entry.get('start_time') or entry.get('timestamp'))
+            if when is None:
+                continue  # Cannot place a request without a time
+
+        input_tokens = int(entry.get('input_tokens') or 0)
+        if entry.get('prompt'):
+            prompt = entry['prompt']
+        elif input_tokens > 0:
+            prompt = synthesize_prompt(input_tokens)
+        else:
+            prompt = default_prompt
+
+        max_tokens = int(entry.get('max_tokens') or entry.get('output_tokens') or DEFAULT_MAX_TOKENS)
+        raw.append(TraceRequest(
+            offset=when,
+            prompt=prompt,
+            max_tokens=max_tokens,
+            input_tokens=input_tokens,
+            label=entry.get('label') or entry.get('class')
+        ))
+
+    if not raw:
+        return []
+
+    # Absolute timestamps and offsets alike are rebased to start at zero
+    base = min(r.offset for r in raw)
+    for r in raw:
+        r.offset -= base
+    return sorted(raw, key=lambda r: r.offset)
+
+
+def run_trace_replay(
+    config: APIConfig,
+    trace: list[TraceRequest],
+    time_scale: float = 1.0,
+    max_concurrency: int = 32,
+    profiler: Optional[ClientProfiler] = None
+) -> list[RequestResult]:
+    """Replay a trace open-loop, preserving (scaled) inter-arrival times"""
+
+    def send(index: int, request: TraceRequest, scheduled: float) -> RequestResult:
+        sent = time.perf_counter() - run_start
+        if profiler:
+            result = profiler.call(make_streaming_request, config, request.prompt, index, request.max_tokens)
+        else:
+            result = make_streaming_request(config, request.prompt, index, request.max_tokens)
+        result.start_offset = sent
+        result.start_lag = max(sent - scheduled, 0.0)
+        result.label = request.label
+        return result
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        futures = []
+        run_start = time.perf_counter()
+        for i, request in enumerate(trace):
+            scheduled = request.offset * time_scale
+            delay = scheduled - (time.perf_counter() - run_start)
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(send, i + 1, request, scheduled))
+
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results.append(result)
+            status = "OK" if result.success else "FAIL"
+            print(f"  Completed {done}/{len(trace)} (request {result.iteration}, {status})")
+
+    return sorted(results, key=lambda r: r.iteration)
+
+
+def summarize_replay(
+    trace_path: Path,
+    trace: list[TraceRequest],
+    results: list[RequestResult],
+    time_scale: float
+) -> dict:
+    """Summarize how faithfully a trace was replayed"""
+
+    if not trace:
+        return {}
+
+    span = trace[-1].offset * time_scale
+    lags = [r.start_lag for r in results]
+    return {
+        'trace_file': str(trace_path),
+        'requests': len(trace),
+        'time_scale': time_scale,
+        'trace_duration': trace[-1].offset,
+        'replay_duration': span,
+        'offered_rate': len(trace) / span if span > 0 else 0.0,
+        'avg_input_tokens': statistics.mean(r.input_tokens for r in trace),
+        'avg_max_tokens': statistics.mean(r.max_tokens for r in trace),
+        'p50_start_lag': calculate_percentile(lags, 50),
+        'p95_start_lag': calculate_percentile(lags, 95),
+        'max_start_lag': max(lags) if lags else 0.0,
+    }
+
+
+def calculate_percentile(data: list[float], percentile: float) -> float:
+    """Calculate percentile from sorted data"""
+    if not data:
+        return 0.0
+    sorted_data = sorted(data)
+    index = int(len(sorted_data) * percentile / 100)
+    return sorted_data[min(index, len(sorted_data) - 1)]
+
+
+def generate_report(
+    config: APIConfig,
+    results: list[RequestResult],
+    prompt: str,
+    iterations: int
+) -> BenchmarkReport:
+    """Generate benchmark report from results"""
+
+    successful = [r for r in results if r.success]
+    failed = [r for r in results if not r.success]
+
+    if not successful:
+        return BenchmarkReport(
+            timestamp=datetime.now().isoformat(),
+            provider=config.provider,
+            endpoint=config.endpoint,
+            model=config.model,
+            prompt=prompt,
+            iterations=iterations,
+            avg_response_time=0,
+            min_response_time=0,
+            max_response_time=0,
+            p50_response_time=0,
+            p95_response_time=0,
+            p99_response_time=0,
+            avg_ttft=0,
+            min_ttft=0,
+            max_ttft=0,
+            avg_tps=0,
+            min_tps=0,
+            max_tps=0,
+            total_tokens=0,
+            success_count=0,
+            failure_count=len(failed),
+            results=[asdict(r) for r in results]
+        )
+
+    response_times = [r.response_time for r in successful]
+    ttfts = [r.ttft for r in successful if r.ttft > 0]
+    tps_values = [r.tps for r in successful]
+
+    return BenchmarkReport(
+        timestamp=datetime.now().isoformat(),
+        provider=config.provider,
+        endpoint=config.endpoint,
+        model=config.model,
+        prompt=prompt,
+        iterations=iterations,
+        avg_response_time=statistics.mean(response_times),
+        min_response_time=min(response_times),
+        max_response_time=max(response_times),
+        p50_response_time=calculate_percentile(response_times, 50),
+        p95_response_time=calculate_percentile(response_times, 95),
+        p99_response_time=calculate_percentile(response_times, 99),
+        avg_ttft=statistics.mean(ttfts) if ttfts else 0,
+        min_ttft=min(ttfts) if ttfts else 0,
+        max_ttft=max(ttfts) if ttfts else 0,
+        avg_tps=statistics.mean(tps_values),
+        min_tps=min(tps_values),
+        max_tps=max(tps_values),
+        total_tokens=sum(r.tokens for r in successful),
+        success_count=len(successful),
+        failure_count=len(failed),
+        results=[asdict(r) for r in results]
+    )
+
+
+def compute_goodput(
+    results: list[RequestResult],
+    duration: Optional[float] = None,
+    slo_ttft: float = DEFAULT_SLO_TTFT,
+    slo_tpot: float = DEFAULT_SLO_TPOT
+) -> dict:
+    """Throughput counting only requests that meet every SLO
+
+    A request is good when it succeeded, its TTFT is within slo_ttft and
+    its time per output token is within slo_tpot (both in seconds). Rates
+    are over duration, the wall time of an open-loop run; without it they
+    are over the time spent in requests, since sequential runs pause
+    between requests and those pauses are not load the endpoint served.
+    """
+
+    if not results:
+        return {}
+    basis = 'wall'
+    if duration is None:
+        duration = sum(r.response_time for r in results)
+        basis = 'requests'
+
+    failed = [r for r in results if not r.success]
+    successful = [r for r in results if r.success]
+    ttft_misses = [r for r in successful if r.ttft > slo_ttft]
+    tpot_misses = [r for r in successful if r.tpot > slo_tpot]
+    good = [r for r in successful if r.ttft <= slo_ttft and r.tpot <= slo_tpot]
+    total = len(results)
+
+    return {
+        'slo_ttft': slo_ttft,
+        'slo_tpot': slo_tpot,
+        'duration': duration,
+        'duration_basis': basis,
+        'good_requests': len(good),
+        'good_fraction': len(good) / total,
+        'goodput_rps': len(good) / duration if duration > 0 else 0.0,
+        'goodput_tps': sum(r.tokens for r in good) / duration if duration > 0 else 0.0,
+        'throughput_rps': total / duration if duration > 0 else 0.0,
+        'throughput_tps': sum(r.tokens for r in successful) / duration if duration > 0 else 0.0,
+        'ttft_violation_pct': len(ttft_misses) / total * 100,
+        'tpot_violation_pct': len(tpot_misses) / total * 100,
+        'error_pct': len(failed) / total * 100,
+    }
+
+
+def summarize_failures(results: list[RequestResult]) -> dict:
+    """Failure counts, time-to-failure and partial output by category
+
+    Slow failures hurt the tail as much as slow successes, so latency
+    percentiles are also given over all requests, failures included.
+    """
+
+    failed = [r for r in results if not r.success]
+    if not failed:
+        return {}
+
+    by_kind: dict[str, list[RequestResult]] = {}
+    for r in failed:
+        by_kind.setdefault(r.error_kind or 'client_error', []).append(r)
+
+    kinds = {}
+    for kind, group in sorted(by_kind.items(), key=lambda item: -len(item[1])):
+        times = [r.response_time for r in group]
+        kinds[kind] = {
+            'count': len(group),
+            'pct': len(group) / len(results) * 100,
+            'avg_time_to_failure': statistics.mean(times),
+            'p50_time_to_failure': calculate_percentile(times, 50),
+            'p95_time_to_failure': calculate_percentile(times, 95),
+            'avg_partial_tokens': statistics.mean(r.tokens for r in group),
+        }
+
+    failure_times = [r.response_time for r in failed]
+    all_times = [r.response_time for r in results]
+    return {
+        'kinds': kinds,
+        'p50_failure_latency': calculate_percentile(failure_times, 50),
+        'p95_failure_latency': calculate_percentile(failure_times, 95),
+        'p95_all_latency': calculate_percentile(all_times, 95),
+        'p99_all_latency': calculate_percentile(all_times, 99),
+    }
+
+
+def _class_stats(results: list[RequestResult], total: int) -> dict:
+    """Latency/TPS statistics for one workload class"""
+    successful = [r for r in results if r.success]
+    response_times = [r.response_time for r in successful]
+    ttfts = [r.ttft for r in successful if r.ttft > 0]
+    tps_values = [r.tps for r in successful]
+
+    return {
+        'requests': len(results),
+        'share': len(results) / total if total else 0.0,
+        'success_count': len(successful),
+        'failure_count': len(results) - len(successful),
+        'avg_response_time': statistics.mean(response_times) if response_times else 0,
+        'p50_response_time': calculate_percentile(response_times, 50),
+        'p95_response_time': calculate_percentile(response_times, 95),
+        'avg_ttft': statistics.mean(ttfts) if ttfts else 0,
+        'p95_ttft': calculate_percentile(ttfts, 95),
+        'avg_tps': statistics.mean(tps_values) if tps_values else 0,
+        'total_tokens': sum(r.tokens for r in successful),
+    }
+
+
+def summarize_shards(pool: 'ShardPool', results: list[RequestResult], duration: float) -> dict:
+    """Per-shard and aggregate statistics for a sharded run"""
+
+    shards = {}
+    for shard in pool.shards:
+        group = [r for r in results if r.shard == shard.name]
+        stats = _class_stats(group, len(results))
+        stats.update({
+            'endpoint': shard.config.endpoint,
+            'model': shard.config.model,
+            'weight': shard.weight,
+            'rpm_budget': shard.rpm,
+            'achieved_rpm': len(group) / duration * 60 if duration > 0 else 0.0,
+            'throttled': shard.throttled,
+        })
+        shards[shard.name] = stats
+
+    return {
+        'strategy': pool.strategy,
+        'shards': shards,
+        'aggregate': _class_stats(results, len(results)),
+    }
+
+
+def summarize_by_label(results: list[RequestResult]) -> dict:
+    """Per-class breakdown plus blended total for labelled requests"""
+
+    if not any(r.label for r in results):
+        return {}
+
+    groups: dict[str, list[RequestResult]] = {}
+    for r in results:
+        groups.setdefault(r.label or 'unlabelled', []).append(r)
+
+    return {
+        'classes': {
+            label: _class_stats(group, len(results))
+            for label, group in sorted(groups.items())
+        },
+        'blended': _class_stats(results, len(results)),
+    }
+
+
+def summarize_tool_use(results: list[RequestResult], tools: list[dict]) -> dict:
+    """Tool call streaming latency and argument throughput"""
+
+    successful = [r for r in results if r.success]
+    with_calls = [r for r in successful if r.tool_calls]
+    first = [r.tool_ttft for r in with_calls]
+    complete = [r.tool_args_time for r in with_calls]
+    # Arguments stream from the first fragment to the last
+    throughput = [
+        r.tool_tokens / (r.tool_args_time - r.tool_ttft)
+        for r in with_calls if r.tool_args_time > r.tool_ttft
+    ]
+
+    return {
+        'tools': [t['name'] for t in tools],
+        'requests': len(successful),
+        'with_tool_calls': len(with_calls),
+        'tool_calls': sum(r.tool_calls for r in with_calls),
+        'valid_args_pct': (
+            sum(1 for r in with_calls if r.tool_args_valid) / len(with_calls) * 100 if with_calls else 0.0
+        ),
+        'avg_tool_tokens': statistics.mean(r.tool_tokens for r in with_calls) if with_calls else 0.0,
+        'avg_first_tool_token': statistics.mean(first) if first else 0.0,
+        'p50_first_tool_token': calculate_percentile(first, 50),
+        'p95_first_tool_token': calculate_percentile(first, 95),
+        'avg_args_complete': statistics.mean(complete) if complete else 0.0,
+        'p50_args_complete': calculate_percentile(complete, 50),
+        'p95_args_complete': calculate_percentile(complete, 95),
+        'avg_args_tps': statistics.mean(throughput) if throughput else 0.0,
+    }
+
+
+# Client CPU above this share of wall time means the harness, not the
+# server, is likely limiting the measured latency
+CLIENT_BOUND_THRESHOLD_PCT = 10.0
+
+
+def summarize_client_overhead(
+    results: list[RequestResult],
+    report_time: float = 0.0,
+    profiled_requests: int = 0,
+    reader_cpu_time: float = 0.0
+) -> dict:
+    """Summarize client CPU time against wall time across requests
 
-    response_times = [r.response_time for r in successful]
-    ttfts = [r.ttft for r in successful if r.ttft > 0]
-    tps_values = [r.tps for r in successful]
+    reader_cpu_time is what HTTP/2 reader threads burnt during the run; it
+    counts towards the totals but cannot be split per request.
+    """
 
-    return BenchmarkReport(
-        timestamp=datetime.now().isoformat(),
-        provider=config.provider,
-        endpoint=config.endpoint,
-        model=config.model,
-        prompt=prompt,
-        iterations=iterations,
-        avg_response_time=statistics.mean(response_times),
-        min_response_time=min(response_times),
-        max_response_time=max(response_times),
-        p50_response_time=calculate_percentile(response_times, 50),
-        p95_response_time=calculate_percentile(response_times, 95),
-        p99_response_time=calculate_percentile(response_times, 99),
-        avg_ttft=statistics.mean(ttfts) if ttfts else 0,
-        min_ttft=min(ttfts) if ttfts else 0,
-        max_ttft=max(ttfts) if ttfts else 0,
-        avg_tps=statistics.mean(tps_values),
-        min_tps=min(tps_values),
-        max_tps=max(tps_values),
-        total_tokens=sum(r.tokens for r in successful),
-        success_count=len(successful),
-        failure_count=len(failed),
-        results=[asdict(r) for r in results]
-    )
+    if not results:
+        return {}
+
+    wall = sum(r.response_time for r in results)
+    cpu = sum(r.cpu_time for r in results) + reader_cpu_time
+    parse = sum(r.parse_time for r in results)
+    # Token counting runs after the clock stops; everything else the client
+    # burns (connect, TLS, reads, decoding) lands inside the measured latency
+    in_window = [max(r.cpu_time - r.parse_time, 0.0) for r in results]
+    per_request_pct = [
+        w / r.response_time * 100 for w, r in zip(in_window, results)
+        if r.response_time > 0
+    ]
+    in_window_total = sum(in_window) + reader_cpu_time
+    overhead_pct = in_window_total / wall * 100 if wall > 0 else 0.0
+
+    return {
+        'requests': len(results),
+        'total_wall_time': wall,
+        'total_cpu_time': cpu,
+        'reader_cpu_ms': reader_cpu_time * 1000,
+        'avg_cpu_ms': cpu / len(results) * 1000,
+        'avg_in_window_cpu_ms': in_window_total / len(results) * 1000,
+        'avg_parse_ms': parse / len(results) * 1000,
+        'overhead_pct': overhead_pct,
+        'p95_overhead_pct': calculate_percentile(per_request_pct, 95),
+        'max_overhead_pct': max(per_request_pct) if per_request_pct else 0.0,
+        'report_time_ms': report_time * 1000,
+        'profiled_requests': profiled_requests,
+        'client_bound': overhead_pct >= CLIENT_BOUND_THRESHOLD_PCT,
+    }
 
 
 def format_markdown_report(report: BenchmarkReport) -> str:
@@ -536,8 +3061,13 @@ def format_markdown_report(report: BenchmarkReport) -> str:
         f"- **Model**: {report.model}",
         f"- **Prompt**: {report.prompt}",
         f"- **Iterations**: {report.iterations}",
-        "",
     ]
+    if report.transport:
+        lines.append(
+            f"- **Transport**: HTTP/{report.transport['http_version']} "
+            f"({report.transport['connections']} connection(s) for {report.transport['requests']} request(s))"
+        )
+    lines.append("")
 
     if report.failure_count > 0:
         lines.extend([
@@ -548,9 +3078,31 @@ def format_markdown_report(report: BenchmarkReport) -> str:
 
         for r in report.results:
             if not r['success']:
-                lines.append(f"- Iteration {r['iteration']}: {r['error']}")
+                lines.append(f"- Iteration {r['iteration']} [{r.get('error_kind') or 'unknown'}]: {r['error']}")
         lines.append("")
 
+    failures = report.failures
+    if failures:
+        lines.extend([
+            "### Failure Breakdown",
+            "| Category | Count | Share | Avg TTF | P50 TTF | P95 TTF | Avg Partial Tokens |",
+            "|----------|-------|-------|---------|---------|---------|--------------------|",
+        ])
+        for kind, stats in failures['kinds'].items():
+            lines.append(
+                f"| {FAILURE_KINDS.get(kind, kind)} | {stats['count']} | {stats['pct']:.1f}% | "
+                f"{stats['avg_time_to_failure']:.3f}s | {stats['p50_time_to_failure']:.3f}s | "
+                f"{stats['p95_time_to_failure']:.3f}s | {stats['avg_partial_tokens']:.1f} |"
+            )
+        lines.extend([
+            "",
+            f"- **Failure latency** (time to failure): P50 {failures['p50_failure_latency']:.3f}s, "
+            f"P95 {failures['p95_failure_latency']:.3f}s",
+            f"- **All-request latency** (failures included): P95 {failures['p95_all_latency']:.3f}s, "
+            f"P99 {failures['p99_all_latency']:.3f}s",
+            "",
+        ])
+
     lines.extend([
         "## Performance Metrics",
         "",
@@ -580,6 +3132,233 @@ def format_markdown_report(report: BenchmarkReport) -> str:
         "",
         f"**Total Tokens**: {report.total_tokens}",
         "",
+    ])
+
+    goodput = report.goodput
+    if goodput:
+        lines.extend([
+            "### Goodput (SLO-compliant throughput)",
+            f"SLO: TTFT ≤ {goodput['slo_ttft']*1000:.0f}ms, TPOT ≤ {goodput['slo_tpot']*1000:.0f}ms, no error "
+            f"— measured over {goodput['duration']:.1f}s "
+            + ("of time spent in requests" if goodput.get('duration_basis') == 'requests' else "of wall time"),
+            "",
+            "| Metric | Goodput | Raw Throughput |",
+            "|--------|---------|----------------|",
+            f"| Requests/sec | {goodput['goodput_rps']:.3f} | {goodput['throughput_rps']:.3f} |",
+            f"| Tokens/sec | {goodput['goodput_tps']:.2f} | {goodput['throughput_tps']:.2f} |",
+            "",
+            "| SLO | Violations |",
+            "|-----|------------|",
+            f"| TTFT | {goodput['ttft_violation_pct']:.1f}% |",
+            f"| TPOT | {goodput['tpot_violation_pct']:.1f}% |",
+            f"| Error | {goodput['error_pct']:.1f}% |",
+            f"| **Meets all** | {goodput['good_fraction']*100:.1f}% |",
+            "",
+        ])
+
+    shards = report.shards
+    if shards:
+        lines.extend([
+            f"## Shards ({shards['strategy']})",
+            "",
+            "| Shard | Endpoint | Requests | Share | Avg RT | P95 RT | Avg TTFT | Avg TPS | Failed | RPM (budget) | Throttled |",
+            "|-------|----------|----------|-------|--------|--------|----------|---------|--------|--------------|-----------|",
+        ])
+        for name, stats in shards['shards'].items():
+            budget = f"{stats['rpm_budget']:.0f}" if stats['rpm_budget'] else "∞"
+            lines.append(
+                f"| {name} | {stats['endpoint']} | {stats['requests']} | {stats['share']*100:.0f}% | "
+                f"{stats['avg_response_time']:.3f}s | {stats['p95_response_time']:.3f}s | "
+                f"{stats['avg_ttft']:.3f}s | {stats['avg_tps']:.2f} | {stats['failure_count']} | "
+                f"{stats['achieved_rpm']:.1f} ({budget}) | {stats['throttled']:.1f}s |"
+            )
+        agg = shards['aggregate']
+        lines.extend([
+            f"| **Aggregate** | - | {agg['requests']} | 100% | {agg['avg_response_time']:.3f}s | "
+            f"{agg['p95_response_time']:.3f}s | {agg['avg_ttft']:.3f}s | {agg['avg_tps']:.2f} | "
+            f"{agg['failure_count']} | - | - |",
+            "",
+        ])
+
+    breakdown = report.breakdown
+    if breakdown:
+        lines.extend([
+            "## Workload Breakdown",
+            "",
+            "| Class | Requests | Share | Avg RT | P95 RT | Avg TTFT | P95 TTFT | Avg TPS | Failed |",
+            "|-------|----------|-------|--------|--------|----------|----------|---------|--------|",
+        ])
+        rows = list(breakdown['classes'].items()) + [("**Blended**", breakdown['blended'])]
+        for label, stats in rows:
+            lines.append(
+                f"| {label} | {stats['requests']} | {stats['share']*100:.0f}% | "
+                f"{stats['avg_response_time']:.3f}s | {stats['p95_response_time']:.3f}s | "
+                f"{stats['avg_ttft']:.3f}s | {stats['p95_ttft']:.3f}s | "
+                f"{stats['avg_tps']:.2f} | {stats['failure_count']} |"
+            )
+        lines.append("")
+
+    hedging = report.hedging
+    if hedging:
+        control, hedged = hedging['control'], hedging['hedged']
+        lines.extend([
+            "## Request Hedging",
+            "",
+            f"Backup request sent after **{hedging['delay']*1000:.0f}ms** "
+            f"(`--hedge-delay {hedging['delay_spec']}`) without a first token.",
+            "",
+            "| Metric | Control | Hedged | Change |",
+            "|--------|---------|--------|--------|",
+            f"| Requests (OK) | {control['success_count']}/{control['requests']} | "
+            f"{hedged['success_count']}/{hedged['requests']} | - |",
+            f"| P50 TTFT | {control['p50_ttft']:.3f}s | {hedged['p50_ttft']:.3f}s | - |",
+            f"| P95 TTFT | {control['p95_ttft']:.3f}s | {hedged['p95_ttft']:.3f}s | "
+            f"{-hedging['p95_ttft_improvement_pct']:+.1f}% |",
+            f"| P99 TTFT | {control['p99_ttft']:.3f}s | {hedged['p99_ttft']:.3f}s | "
+            f"{-hedging['p99_ttft_improvement_pct']:+.1f}% |",
+            f"| P99 Response Time | {control['p99_response_time']:.3f}s | "
+            f"{hedged['p99_response_time']:.3f}s | - |",
+            "",
+            f"- **Cost**: {hedging['hedge_count']} backup request(s) "
+            f"(+{hedging['extra_request_pct']:.1f}% requests, ~{hedging['extra_input_tokens']} extra input tokens)",
+            f"- **Backup won**: {hedging['backup_wins']} time(s)",
+            "- Output generated server-side for cancelled streams is not visible to the client and is not counted.",
+            "",
+        ])
+
+    tool_use = report.tool_use
+    if tool_use:
+        lines.extend([
+            "## Tool Use",
+            "",
+            f"- **Tools**: {', '.join(tool_use['tools'])} (a tool call is required)",
+            f"- **Requests with tool calls**: {tool_use['with_tool_calls']}/{tool_use['requests']} "
+            f"({tool_use['tool_calls']} call(s), {tool_use['valid_args_pct']:.1f}% with valid JSON arguments)",
+            f"- **Avg argument tokens**: {tool_use['avg_tool_tokens']:.0f} (estimated)",
+            "",
+            "| Metric | Avg | P50 | P95 |",
+            "|--------|-----|-----|-----|",
+            f"| Time to first tool token | {tool_use['avg_first_tool_token']:.3f}s | "
+            f"{tool_use['p50_first_tool_token']:.3f}s | {tool_use['p95_first_tool_token']:.3f}s |",
+            f"| Time to complete arguments | {tool_use['avg_args_complete']:.3f}s | "
+            f"{tool_use['p50_args_complete']:.3f}s | {tool_use['p95_args_complete']:.3f}s |",
+            "",
+            f"- **Argument streaming throughput**: {tool_use['avg_args_tps']:.2f} tokens/s",
+            "",
+        ])
+
+    relay = report.relay
+    if relay:
+        lines.extend([
+            "## Relay Overhead",
+            "",
+            f"- **Relay**: {relay['relay_endpoint']}",
+            f"- **Direct**: {relay['direct_endpoint']}",
+            f"- **Pairs**: {relay['complete_pairs']}/{relay['pairs']} with both requests successful",
+            "",
+            f"| Phase | Relay (avg) | Direct (avg) | Delta (avg) | Delta (P50) | {relay['confidence']*100:.0f}% CI |",
+            "|-------|-------------|--------------|-------------|-------------|--------|",
+        ])
+        for phase, stats in relay['phases'].items():
+            marker = " *" if stats['significant'] else ""
+            lines.append(
+                f"| {phase} | {stats['relay_mean']*1000:.1f}ms | {stats['direct_mean']*1000:.1f}ms | "
+                f"{stats['delta_mean']*1000:+.1f}ms{marker} | {stats['delta_p50']*1000:+.1f}ms | "
+                f"[{stats['ci_low']*1000:+.1f}, {stats['ci_high']*1000:+.1f}]ms |"
+            )
+        lines.extend([
+            "",
+            "- Phases are cumulative from request start, except ITL (mean gap between response chunks).",
+            "- `*` marks deltas whose bootstrap confidence interval excludes zero.",
+            "",
+        ])
+
+    turns = report.turns
+    if turns:
+        lines.extend([
+            "## Conversation Turns",
+            "",
+            "| Turn | Requests | Avg TTFT | P50 TTFT | P95 TTFT | Avg TPS | Avg Input Tokens | Cache Hit |",
+            "|------|----------|----------|----------|----------|---------|------------------|-----------|",
+        ])
+        for turn, stats in turns['per_turn'].items():
+            lines.append(
+                f"| {turn} | {stats['success_count']}/{stats['requests']} | "
+                f"{stats['avg_ttft']:.3f}s | {stats['p50_ttft']:.3f}s | {stats['p95_ttft']:.3f}s | "
+                f"{stats['avg_tps']:.2f} | {stats['avg_input_tokens']:.0f} | "
+                f"{stats['cache_hit_ratio']*100:.0f}% |"
+            )
+        lines.extend([
+            "",
+            f"- **TTFT growth**: {turns['ttft_slope']*1000:+.1f}ms per turn",
+            f"- **Prefix caching**: {turns['prefix_cache']}",
+            "",
+        ])
+
+    replay = report.replay
+    if replay:
+        lines.extend([
+            "## Trace Replay",
+            "",
+            "| Metric | Value |",
+            "|--------|-------|",
+            f"| Trace | {replay['trace_file']} |",
+            f"| Requests | {replay['requests']} |",
+            f"| Time scale | {replay['time_scale']:g}× |",
+            f"| Trace / replay duration | {replay['trace_duration']:.1f}s / {replay['replay_duration']:.1f}s |",
+            f"| Offered rate | {replay['offered_rate']:.2f} req/s |",
+            f"| Avg input / max tokens | {replay['avg_input_tokens']:.0f} / {replay['avg_max_tokens']:.0f} |",
+            f"| Start lag P50 / P95 / Max | {replay['p50_start_lag']*1000:.1f}ms / "
+            f"{replay['p95_start_lag']*1000:.1f}ms / {replay['max_start_lag']*1000:.1f}ms |",
+            "",
+        ])
+        if replay['p95_start_lag'] > 0.1:
+            lines.extend([
+                "**Warning**: requests were sent noticeably late; raise --max-concurrency "
+                "or the arrival pattern was not reproduced faithfully.",
+                "",
+            ])
+
+    overhead = report.client_overhead
+    if overhead:
+        lines.extend([
+            "## Client Overhead",
+            "",
+            "| Metric | Value |",
+            "|--------|-------|",
+            f"| Client CPU (avg/request) | {overhead['avg_cpu_ms']:.2f}ms |",
+            f"| CPU inside measured latency (avg) | {overhead['avg_in_window_cpu_ms']:.2f}ms |",
+            f"| Token counting (avg, after clock stops) | {overhead['avg_parse_ms']:.2f}ms |",
+            f"| Harness share of wall time | {overhead['overhead_pct']:.2f}% |",
+            f"| Harness share P95 / Max | {overhead['p95_overhead_pct']:.2f}% / {overhead['max_overhead_pct']:.2f}% |",
+            f"| Report generation | {overhead['report_time_ms']:.2f}ms |",
+        ])
+        if overhead.get('reader_cpu_ms'):
+            lines.append(f"| HTTP/2 reader thread CPU (total) | {overhead['reader_cpu_ms']:.2f}ms |")
+        lines.append("")
+        if overhead.get('reader_cpu_ms'):
+            lines.append(
+                "HTTP/2 reader thread CPU is included in the averages and the overall share, "
+                "but not in the per-request P95 / Max."
+            )
+        if overhead['client_bound']:
+            lines.append(
+                f"**Warning**: client CPU exceeds {CLIENT_BOUND_THRESHOLD_PCT:.0f}% of wall time; "
+                "the harness is likely the bottleneck, not the server."
+            )
+        else:
+            lines.append(
+                f"The harness adds about {overhead['avg_in_window_cpu_ms']:.2f}ms of CPU per request "
+                f"({overhead['overhead_pct']:.2f}% of measured latency); results reflect the server."
+            )
+        if overhead['profiled_requests']:
+            lines.append(
+                f"cProfile traced {overhead['profiled_requests']} request(s); "
+                "their timings include profiler overhead."
+            )
+        lines.append("")
+
+    lines.extend([
         "## Detailed Results",
         "",
         "| # | Response Time | TTFT | Tokens | TPS | Status |",
@@ -599,6 +3378,145 @@ def format_markdown_report(report: BenchmarkReport) -> str:
     return "\n".join(lines)
 
 
+def format_comparison_report(mode: str, reports: dict[str, BenchmarkReport]) -> str:
+    """Format a combined Markdown report for a multi-endpoint run"""
+
+    first = next(iter(reports.values()))
+    lines = [
+        "# LLM API Endpoint Comparison Report",
+        "",
+        "## Test Information",
+        f"- **Time**: {first.timestamp}",
+        f"- **Mode**: {mode} (all endpoints benchmarked in the same run under identical load)",
+        f"- **Prompt**: {first.prompt}",
+        f"- **Iterations per endpoint**: {first.iterations}",
+        "",
+        "## Comparison",
+        "",
+        "| Endpoint | Model | OK | Avg RT | P50 RT | P95 RT | Avg TTFT | Avg TPS | Goodput (req/s) | Relative |",
+        "|----------|-------|----|--------|--------|--------|----------|---------|-----------------|----------|",
+    ]
+
+    # Rank by median response time; endpoints with no successes go last
+    ranked = sorted(
+        reports.items(),
+        key=lambda item: (item[1].success_count == 0, item[1].p50_response_time)
+    )
+    baseline = next((r.p50_response_time for _, r in ranked if r.success_count), 0)
+    for name, report in ranked:
+        if report.success_count and baseline > 0:
+            ratio = report.p50_response_time / baseline
+            relative = "⚡ baseline" if ratio <= 1.05 else f"{ratio:.2f}× slower"
+        else:
+            relative = "N/A"
+        goodput = report.goodput.get('goodput_rps', 0.0) if report.goodput else 0.0
+        lines.append(
+            f"| {name} | {report.model} | {report.success_count}/{report.success_count + report.failure_count} | "
+            f"{report.avg_response_time:.3f}s | {report.p50_response_time:.3f}s | "
+            f"{report.p95_response_time:.3f}s | {report.avg_ttft:.3f}s | {report.avg_tps:.2f} | "
+            f"{goodput:.3f} | {relative} |"
+        )
+    lines.append("")
+
+    if any(report.tool_use for report in reports.values()):
+        lines.extend([
+            "## Tool Use",
+            "",
+            "| Endpoint | With Calls | Valid Args | P50 First Tool Token | P50 Args Complete | Args TPS |",
+            "|----------|------------|------------|----------------------|-------------------|----------|",
+        ])
+        for name, report in ranked:
+            tool_use = report.tool_use
+            if tool_use:
+                lines.append(
+                    f"| {name} | {tool_use['with_tool_calls']}/{tool_use['requests']} | "
+                    f"{tool_use['valid_args_pct']:.0f}% | {tool_use['p50_first_tool_token']:.3f}s | "
+                    f"{tool_use['p50_args_complete']:.3f}s | {tool_use['avg_args_tps']:.2f} |"
+                )
+        lines.append("")
+
+    for name, report in ranked:
+        # Nest each endpoint's full report under its own heading
+        body = format_markdown_report(report).split("\n", 1)[1]
+        lines.append(f"## Endpoint: {name}")
+        lines.extend("#" + line if line.startswith("#") else line for line in body.split("\n"))
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+def compare_endpoints(args, prompt: str, profiler: Optional[ClientProfiler]) -> int:
+    """--compare: run and report a multi-endpoint comparison"""
+
+    try:
+        options, entries = load_endpoint_entries(Path(args.compare), 'endpoints')
+    except (OSError, ValueError) as e:
+        print(f"\nError: Failed to load endpoints: {e}")
+        return 1
+
+    mode = args.compare_mode or options.get('mode') or 'interleaved'
+    if mode not in COMPARE_MODES:
+        print(f"\nError: Invalid mode '{mode}' in {args.compare} (choose from {', '.join(COMPARE_MODES)})")
+        return 1
+    tools = PRESET_PROMPTS[args.preset].get('tools') if args.preset else None
+    endpoints = []
+    for _, name, config in entries:
+        if args.model:
+            config.model = args.model
+        config.http_version = args.http_version
+        config.tools = tools
+        endpoints.append((name, config))
+
+    if not args.quiet:
+        print(f"\nComparing {len(endpoints)} endpoint(s) ({mode}, {args.iterations} rounds):")
+        for name, config in endpoints:
+            print(f"  {name:16} {config.endpoint} ({config.model})")
+
+    if profiler:
+        profiler.start()
+    reader_cpu_start = {name: H2_POOL.reader_cpu_time([config]) for name, config in endpoints}
+    results = run_comparison(endpoints, args.iterations, prompt, mode, profiler)
+    if profiler:
+        profiler.stop()
+
+    reports = {}
+    for name, config in endpoints:
+        report = generate_report(config, results[name], prompt, args.iterations)
+        report.goodput = compute_goodput(results[name], None, args.slo_ttft / 1000, args.slo_tpot / 1000)
+        report.failures = summarize_failures(results[name])
+        if tools:
+            report.tool_use = summarize_tool_use(results[name], tools)
+        if profiler:
+            report.client_overhead = summarize_client_overhead(
+                results[name], profiled_requests=profiler.profiled_requests,
+                reader_cpu_time=H2_POOL.reader_cpu_time([config]) - reader_cpu_start[name]
+            )
+        reports[name] = report
+
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    output_dir = Path(args.output_dir) / f"llm-benchmark-compare-{timestamp}"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    report_path = output_dir / "comparison-report.md"
+    report_path.write_text(format_comparison_report(mode, reports), encoding='utf-8')
+    json_path = output_dir / "comparison-data.json"
+    json_path.write_text(json.dumps({
+        'timestamp': datetime.now().isoformat(),
+        'mode': mode,
+        'iterations': args.iterations,
+        'endpoints': {name: asdict(report) for name, report in reports.items()},
+    }, indent=2), encoding='utf-8')
+    if profiler:
+        profiler.save(output_dir)
+
+    print("\nEndpoint comparison (P50 response time / avg TTFT / avg TPS):")
+    for name, report in sorted(reports.items(), key=lambda item: item[1].p50_response_time or float('inf')):
+        print(f"  {name:16} {report.p50_response_time:.3f}s / {report.avg_ttft:.3f}s / "
+              f"{report.avg_tps:.2f}  ({report.success_count} ok, {report.failure_count} failed)")
+    print(f"\nReport saved to: {report_path}")
+    return 0
+
+
 def list_presets():
     """List available preset prompts"""
     print("Available presets:")
@@ -619,6 +3537,19 @@ Examples:
   python benchmark.py --preset throughput      # Use throughput preset for TPS testing
   python benchmark.py --preset quick -i 3      # Quick test with 3 iterations
   python benchmark.py -p "Your custom prompt"  # Custom prompt
+  python benchmark.py --profile --profile-snapshot cprofile  # Measure harness overhead
+  python benchmark.py --trace trace.jsonl --time-scale 0.5  # Replay trace at 2× speed
+  python benchmark.py --workload mix.json -i 50  # Weighted mix, per-class breakdown
+  python benchmark.py --conversation 6 -i 3 --cache-prompt  # 3 sessions × 6 turns
+  python benchmark.py --record cassettes/ -i 10  # Record raw streams once
+  python benchmark.py --replay cassettes/ --replay-speed max -i 1000 --profile  # Offline client benchmark
+  python benchmark.py --hedge-delay p90 -i 50  # Hedge after the control run's P90 TTFT
+  python benchmark.py --trace t.jsonl --slo-ttft 1000 --slo-tpot 40  # Goodput under stricter SLOs
+  python benchmark.py --trace t.jsonl --http-version 2  # Same load multiplexed over HTTP/2
+  python benchmark.py --shards pool.json --trace t.jsonl  # Load-balanced fleet, per-shard stats
+  python benchmark.py --compare endpoints.json --compare-mode concurrent  # Side-by-side endpoints
+  python benchmark.py --relay-overhead --direct-url https://api.anthropic.com -i 20  # Cost of the relay hop
+  python benchmark.py --preset tool-edit       # Tool call argument streaming latency
 
 Available presets:
   quick      - Short prompt for fast testing
@@ -627,6 +3558,8 @@ Available presets:
   throughput - High token output for TPS testing
   code       - Code generation test (default, ~500-1000 tokens)
   json       - JSON output test
+  tool-call  - Forced tool call, small arguments
+  tool-edit  - Forced tool call, large arguments (file content)
         """
     )
     parser.add_argument(
@@ -658,6 +3591,132 @@ Available presets:
         default='reports',
         help='Output directory for reports (default: reports)'
     )
+    parser.add_argument(
+        '--trace',
+        help='Replay a JSONL trace (or parse-claude-logs.py --json output) with original arrival times'
+    )
+    parser.add_argument(
+        '--time-scale',
+        type=float,
+        default=1.0,
+        help='Multiply trace inter-arrival times (0.5 = replay twice as fast, default: 1.0)'
+    )
+    parser.add_argument(
+        '--max-concurrency',
+        type=int,
+        default=32,
+        help='Maximum in-flight requests during trace replay (default: 32)'
+    )
+    parser.add_argument(
+        '--workload',
+        help='JSON workload profile with weights over presets/custom prompts; '
+             'each iteration draws one request from the mix'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        help='Random seed for drawing workload requests (default: random)'
+    )
+    parser.add_argument(
+        '--conversation',
+        type=int,
+        metavar='TURNS',
+        help='Run multi-turn sessions of TURNS turns, feeding each reply back '
+             '(--iterations sets the number of sessions)'
+    )
+    parser.add_argument(
+        '--cache-prompt',
+        action='store_true',
+        help='Mark the conversation prefix as cacheable (Anthropic cache_control)'
+    )
+    parser.add_argument(
+        '--record',
+        metavar='DIR',
+        help='Save raw SSE streams with chunk arrival offsets as cassettes in DIR'
+    )
+    parser.add_argument(
+        '--replay',
+        metavar='PATH',
+        help='Replay cassettes (a directory or one file) instead of calling the API'
+    )
+    parser.add_argument(
+        '--replay-speed',
+        choices=['original', 'max'],
+        default='original',
+        help='Replay cassettes with recorded chunk timing or as fast as possible (default: original)'
+    )
+    parser.add_argument(
+        '--hedge-delay',
+        metavar='MS|pNN',
+        help='Hedging experiment: send a backup request if no token arrives after MS '
+             'milliseconds, or after the NNth percentile TTFT of the control run (e.g. p95)'
+    )
+    parser.add_argument(
+        '--slo-ttft',
+        type=float,
+        default=DEFAULT_SLO_TTFT * 1000,
+        help=f'TTFT objective in ms for goodput (default: {DEFAULT_SLO_TTFT * 1000:.0f})'
+    )
+    parser.add_argument(
+        '--slo-tpot',
+        type=float,
+        default=DEFAULT_SLO_TPOT * 1000,
+        help=f'Time-per-output-token objective in ms for goodput (default: {DEFAULT_SLO_TPOT * 1000:.0f})'
+    )
+    parser.add_argument(
+        '--http-version',
+        choices=['1.1', '2'],
+        default='1.1',
+        help='HTTP/1.1 (one connection per request) or HTTP/2 (multiplexed; '
+             'TLS+ALPN or h2c prior knowledge for http://, needs the h2 package) (default: 1.1)'
+    )
+    parser.add_argument(
+        '--shards',
+        metavar='FILE',
+        help='JSON pool of credentials/endpoints with weights and per-key RPM budgets; '
+             'requests are spread across them'
+    )
+    parser.add_argument(
+        '--shard-strategy',
+        choices=['round-robin', 'weighted'],
+        help='How to spread requests over shards (default: from file, else round-robin)'
+    )
+    parser.add_argument(
+        '--compare',
+        metavar='FILE',
+        help='JSON list of endpoints to benchmark in the same run under identical load'
+    )
+    parser.add_argument(
+        '--compare-mode',
+        choices=COMPARE_MODES,
+        help='Rotate through endpoints each round or hit them all at once (default: from file, else interleaved)'
+    )
+    parser.add_argument(
+        '--relay-overhead',
+        action='store_true',
+        help='Pair each request through the configured endpoint with a direct one and report per-phase deltas'
+    )
+    parser.add_argument(
+        '--direct-url',
+        help='Base URL to reach the provider directly (default: the configured endpoint, '
+             'with the relay replaced by a local pass-through proxy)'
+    )
+    parser.add_argument(
+        '--direct-key-env',
+        metavar='VAR',
+        help='Environment variable holding the API key for direct requests (default: same key)'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Report client CPU time vs wall time to expose harness overhead'
+    )
+    parser.add_argument(
+        '--profile-snapshot',
+        action='append',
+        choices=['cprofile', 'tracemalloc'],
+        help='Also save cProfile/tracemalloc snapshots of the hot loop (implies --profile, repeatable)'
+    )
     parser.add_argument(
         '--quiet', '-q',
         action='store_true',
@@ -686,10 +3745,92 @@ Available presets:
         print("LLM API Benchmark Tool")
         print("=" * 60)
 
+    if args.conversation is not None and args.conversation < 1:
+        print("\nError: --conversation must be at least 1 turn.")
+        sys.exit(1)
+    if args.cache_prompt and not args.conversation:
+        print("\nError: --cache-prompt needs --conversation.")
+        sys.exit(1)
+
+    if args.compare:
+        unsupported = [name for name, value in (
+            ('--workload', args.workload),
+            ('--trace', args.trace),
+            ('--conversation', args.conversation),
+            ('--hedge-delay', args.hedge_delay),
+            ('--shards', args.shards),
+            ('--record', args.record),
+            ('--replay', args.replay),
+        ) if value]
+        if unsupported:
+            print(f"\nError: --compare cannot be combined with {', '.join(unsupported)}.")
+            sys.exit(1)
+        if args.http_version == '2':
+            try:
+                _import_h2()
+            except RuntimeError as e:
+                print(f"\nError: {e}")
+                sys.exit(1)
+        if args.profile_snapshot:
+            args.profile = True
+        sys.exit(compare_endpoints(args, prompt, ClientProfiler(args.profile_snapshot) if args.profile else None))
+
+    if args.record and args.replay:
+        print("\nError: --record and --replay cannot be combined.")
+        sys.exit(1)
+    if args.shards and args.replay:
+        print("\nError: --shards and --replay cannot be combined.")
+        sys.exit(1)
+    if args.relay_overhead and (args.shards or args.replay):
+        print(f"\nError: --relay-overhead cannot be combined with {'--shards' if args.shards else '--replay'}.")
+        sys.exit(1)
+    if (args.direct_url or args.direct_key_env) and not args.relay_overhead:
+        print("\nError: --direct-url and --direct-key-env require --relay-overhead.")
+        sys.exit(1)
+
     # Detect API configuration
-    if not args.quiet:
-        print("\nDetecting API configuration from environment...")
-    config = detect_api_config()
+    if args.replay:
+        replay_path = Path(args.replay)
+        paths = sorted(replay_path.glob("*.sse.gz")) if replay_path.is_dir() else [replay_path]
+        try:
+            player = CassettePlayer(paths, args.replay_speed)
+        except (OSError, ValueError) as e:
+            print(f"\nError: Failed to load cassettes: {e}")
+            sys.exit(1)
+        header = player.header
+        config = APIConfig(
+            provider=header['provider'],
+            endpoint=f"replay:{header['endpoint']}",
+            api_key='',
+            model=header['model'],
+            player=player
+        )
+        if not args.quiet:
+            print(f"\nReplaying {len(player.cassettes)} cassette(s) at {args.replay_speed} speed...")
+    elif args.shards:
+        try:
+            pool = load_shard_pool(Path(args.shards), args.shard_strategy)
+        except (OSError, ValueError) as e:
+            print(f"\nError: Failed to load shard pool: {e}")
+            sys.exit(1)
+        first = pool.shards[0].config
+        models = {shard.config.model for shard in pool.shards}
+        config = APIConfig(
+            provider=first.provider,
+            endpoint=f"sharded: {len(pool.shards)} shards ({pool.strategy})",
+            api_key='',
+            model=first.model if len(models) == 1 else 'mixed',
+            pool=pool
+        )
+        if not args.quiet:
+            print(f"\nLoaded {len(pool.shards)} shard(s) from {args.shards} ({pool.strategy}):")
+            for shard in pool.shards:
+                budget = f"{shard.rpm:.0f} rpm" if shard.rpm else "unlimited"
+                print(f"  {shard.name:16} {shard.config.endpoint} (weight {shard.weight:g}, {budget})")
+    else:
+        if not args.quiet:
+            print("\nDetecting API configuration from environment...")
+        config = detect_api_config()
 
     if not config:
         print("\nError: No LLM API detected from environment variables.")
@@ -704,20 +3845,214 @@ Available presets:
     # Override model if specified
     if args.model:
         config.model = args.model
+        if config.pool:
+            for shard in config.pool.shards:
+                shard.config.model = args.model
+
+    config.http_version = args.http_version
+    config.tools = PRESET_PROMPTS[args.preset].get('tools') if args.preset else None
+    if config.pool:
+        for shard in config.pool.shards:
+            shard.config.http_version = args.http_version
+            shard.config.tools = config.tools
+    if args.http_version == '2' and not config.player:
+        try:
+            _import_h2()
+        except RuntimeError as e:
+            print(f"\nError: {e}")
+            sys.exit(1)
+
+    if args.record:
+        config.recorder = CassetteRecorder(Path(args.record), config)
+        if config.pool:
+            for shard in config.pool.shards:
+                shard.config.recorder = config.recorder
 
     if not args.quiet:
         print(f"  Detected: {config.provider}")
         print(f"  Endpoint: {config.endpoint}")
         print(f"  Model: {config.model}")
-        print(f"\nRunning benchmark ({args.iterations} iterations)...")
+
+    if args.profile_snapshot:
+        args.profile = True
+    profiler = ClientProfiler(args.profile_snapshot) if args.profile else None
+
+    modes = [name for name, value in (
+        ('--workload', args.workload),
+        ('--trace', args.trace),
+        ('--conversation', args.conversation),
+        ('--hedge-delay', args.hedge_delay),
+        ('--relay-overhead', args.relay_overhead),
+    ) if value]
+    if len(modes) > 1:
+        print(f"\nError: {' and '.join(modes)} cannot be combined.")
+        sys.exit(1)
+    if args.hedge_delay:
+        try:
+            parse_hedge_delay(args.hedge_delay)
+        except ValueError as e:
+            print(f"\nError: Invalid --hedge-delay: {e}")
+            sys.exit(1)
+
+    workload = None
+    if args.workload:
+        try:
+            classes = load_workload(Path(args.workload))
+        except (OSError, ValueError) as e:
+            print(f"\nError: Failed to load workload profile: {e}")
+            sys.exit(1)
+        workload = draw_workload(classes, args.iterations, args.seed)
+        if not args.quiet:
+            total_weight = sum(c.weight for c in classes)
+            print("\nWorkload mix:")
+            for c in classes:
+                print(f"  {c.name:20} {c.weight / total_weight * 100:5.1f}%")
+
+    trace = None
+    if args.trace:
+        if args.time_scale <= 0:
+            print("\nError: --time-scale must be positive.")
+            sys.exit(1)
+        if args.max_concurrency < 1:
+            print("\nError: --max-concurrency must be at least 1.")
+            sys.exit(1)
+        try:
+            trace = load_trace(Path(args.trace), prompt)
+        except (OSError, ValueError) as e:
+            print(f"\nError: Failed to load trace: {e}")
+            sys.exit(1)
+        if not trace:
+            print(f"\nError: No replayable requests in trace: {args.trace}")
+            sys.exit(1)
+        if not args.quiet:
+            print(f"\nReplaying trace {args.trace} ({len(trace)} requests, "
+                  f"{trace[-1].offset * args.time_scale:.1f}s)...")
+
+    proxy = None
+    if args.relay_overhead:
+        if args.direct_url:
+            api_key = config.api_key
+            if args.direct_key_env:
+                api_key = os.environ.get(args.direct_key_env, '')
+                if not api_key:
+                    print(f"\nError: Environment variable {args.direct_key_env} is not set.")
+                    sys.exit(1)
+            try:
+                direct = build_api_config(config.provider, api_key, args.direct_url.rstrip('/'), config.model)
+            except ValueError as e:
+                print(f"\nError: {e}")
+                sys.exit(1)
+            direct.http_version = config.http_version
+            direct.tools = config.tools
+            relay = config
+        else:
+            if config.http_version == '2':
+                print("\nError: The local pass-through proxy needs --http-version 1.1; "
+                      "pass --direct-url to compare a real relay over HTTP/2.")
+                sys.exit(1)
+            proxy = PassThroughProxy()
+            direct = config
+            relay = replace(config, proxy=proxy.address)
+        if not args.quiet:
+            print(f"\nRelay:  {relay.endpoint}" + (f" (via pass-through proxy {proxy.address})" if proxy else ""))
+            print(f"Direct: {direct.endpoint}")
 
     # Run benchmark
-    results = run_benchmark(config, args.iterations, prompt)
+    if config.pool:
+        measured = [shard.config for shard in config.pool.shards]
+    else:
+        measured = [relay if args.relay_overhead else config]
+    if profiler:
+        profiler.start()
+    run_start = time.perf_counter()
+    connections_start = CONNECTIONS.total(measured)
+    reader_cpu_start = H2_POOL.reader_cpu_time(measured)
+    if trace:
+        results = run_trace_replay(config, trace, args.time_scale, args.max_concurrency, profiler)
+        prompt = f"trace replay: {args.trace}"
+        iterations = len(trace)
+    elif args.hedge_delay:
+        if not args.quiet:
+            print(f"\nRunning control benchmark ({args.iterations} iterations, no hedging)...")
+        control = run_benchmark(config, args.iterations, prompt, profiler)
+        try:
+            hedge_delay = resolve_hedge_delay(args.hedge_delay, control)
+        except ValueError as e:
+            print(f"\nError: Invalid --hedge-delay: {e}")
+            sys.exit(1)
+        if not args.quiet:
+            print(f"\nRunning hedged benchmark ({args.iterations} iterations, "
+                  f"backup after {hedge_delay*1000:.0f}ms)...")
+        # The run time and connection count cover the hedged run only
+        run_start = time.perf_counter()
+        connections_start = CONNECTIONS.total(measured)
+        reader_cpu_start = H2_POOL.reader_cpu_time(measured)
+        results = run_hedged_benchmark(config, args.iterations, prompt, hedge_delay, profiler)
+        iterations = args.iterations
+    elif args.relay_overhead:
+        if not args.quiet:
+            print(f"\nRunning {args.iterations} relay/direct request pairs...")
+        results, direct_results = run_relay_overhead(relay, direct, args.iterations, prompt, profiler)
+        iterations = args.iterations
+        if proxy:
+            proxy.close()
+    elif args.conversation:
+        if not args.quiet:
+            print(f"\nRunning {args.iterations} conversation(s) of {args.conversation} turns...")
+        results = run_conversations(
+            config, args.iterations, args.conversation, prompt, args.cache_prompt, profiler
+        )
+        iterations = len(results)
+    else:
+        if not args.quiet:
+            print(f"\nRunning benchmark ({args.iterations} iterations)...")
+        results = run_benchmark(config, args.iterations, prompt, profiler, workload)
+        iterations = args.iterations
+        if workload:
+            prompt = f"workload profile: {args.workload}"
+    run_duration = time.perf_counter() - run_start
+    connections = CONNECTIONS.total(measured) - connections_start
+    reader_cpu_time = H2_POOL.reader_cpu_time(measured) - reader_cpu_start
+    if profiler:
+        profiler.stop()
 
     # Generate report
     if not args.quiet:
         print("\nGenerating report...")
-    report = generate_report(config, results, prompt, args.iterations)
+    report_start = time.perf_counter()
+    report = generate_report(config, results, prompt, iterations)
+    # Only trace replay is open-loop; the other modes pace requests one at a time
+    report.goodput = compute_goodput(
+        results, run_duration if trace else None, args.slo_ttft / 1000, args.slo_tpot / 1000
+    )
+    report.failures = summarize_failures(results)
+    if config.pool:
+        report.shards = summarize_shards(config.pool, results, run_duration)
+    if not config.player:
+        report.transport = {
+            'http_version': config.http_version,
+            'connections': connections,
+            'requests': len(results),
+        }
+    if config.tools:
+        report.tool_use = summarize_tool_use(results, config.tools)
+    if args.relay_overhead:
+        report.relay = summarize_relay_overhead(results, direct_results, relay, direct, proxy is not None)
+    if trace:
+        report.replay = summarize_replay(Path(args.trace), trace, results, args.time_scale)
+    if args.hedge_delay:
+        report.hedging = summarize_hedging(control, results, hedge_delay, args.hedge_delay, prompt)
+    if args.conversation:
+        report.turns = summarize_turns(results)
+    else:
+        report.breakdown = summarize_by_label(results)
+    if profiler:
+        report.client_overhead = summarize_client_overhead(
+            results,
+            report_time=time.perf_counter() - report_start,
+            profiled_requests=profiler.profiled_requests,
+            reader_cpu_time=reader_cpu_time
+        )
 
     # Save report
     timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -731,6 +4066,8 @@ Available presets:
     json_path = output_dir / "benchmark-data.json"
     json_path.write_text(json.dumps(asdict(report), indent=2), encoding='utf-8')
 
+    profile_paths = profiler.save(output_dir) if profiler else []
+
     # Print summary
     if not args.quiet:
         print("\n" + "=" * 60)
@@ -741,18 +4078,45 @@ Available presets:
         print(f"\nResponse Time: {report.avg_response_time:.3f}s (avg)")
         print(f"TTFT: {report.avg_ttft:.3f}s (avg)")
         print(f"TPS: {report.avg_tps:.2f} (avg)")
+        print(f"Goodput: {report.goodput['goodput_rps']:.3f} req/s, "
+              f"{report.goodput['goodput_tps']:.2f} tokens/s "
+              f"({report.goodput['good_fraction']*100:.1f}% of requests meet SLO)")
         print(f"\nSuccess: {report.success_count} | Failed: {report.failure_count}")
     else:
         print(f"\nAll requests failed! Check errors below:")
 
+    if report.client_overhead:
+        print(f"Client overhead: {report.client_overhead['overhead_pct']:.2f}% of wall time"
+              + (" (client-bound!)" if report.client_overhead['client_bound'] else ""))
+
+    if report.tool_use:
+        tool_use = report.tool_use
+        print(f"Tool calls: {tool_use['with_tool_calls']}/{tool_use['requests']} requests, "
+              f"first tool token {tool_use['avg_first_tool_token']:.3f}s, "
+              f"arguments complete {tool_use['avg_args_complete']:.3f}s, "
+              f"{tool_use['avg_args_tps']:.2f} argument tokens/s (avg)")
+
+    if report.relay:
+        deltas = report.relay['phases']
+        print(f"Relay overhead: TTFT {deltas['ttft']['delta_mean']*1000:+.1f}ms "
+              f"[{deltas['ttft']['ci_low']*1000:+.1f}, {deltas['ttft']['ci_high']*1000:+.1f}], "
+              f"connect {deltas['connect']['delta_mean']*1000:+.1f}ms, "
+              f"ITL {deltas['itl']['delta_mean']*1000:+.2f}ms "
+              f"({report.relay['complete_pairs']} pairs)")
+
+    if config.recorder:
+        print(f"Cassettes saved: {config.recorder.saved} in {args.record}")
+
     print(f"\nReport saved to: {report_path}")
+    for path in profile_paths:
+        print(f"Profile saved to: {path}")
 
     # Print errors if any
     if report.failure_count > 0:
         print("\nErrors:")
         for r in results:
             if not r.success:
-                print(f"  Iteration {r.iteration}: {r.error}")
+                print(f"  Iteration {r.iteration} [{r.error_kind}] after {r.response_time:.3f}s: {r.error}")
 
 
 if __name__ == "__main__":
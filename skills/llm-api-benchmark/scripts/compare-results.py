@@ -2,45 +2,1123 @@
 """
 Compare benchmark results across endpoints
 
+Reads Agent mode results (reports/llm-benchmark-subagent/*.json) and
+benchmark.py reports (benchmark-data.json, comparison-data.json) anywhere
+under the results directory, normalized to one versioned run schema.
+
 Usage:
     python compare-results.py
     python compare-results.py --dir ./my-reports
     python compare-results.py --format json
+    python compare-results.py --endpoint relay --since 2026-03-01
+    python compare-results.py --no-index       # Rescan every file
+    python compare-results.py --pooled --window 7d --rank-by p95_ttft
+    python compare-results.py --history --metric ttft --export history.csv
+    python compare-results.py --score --weights ttft=2,tps=1,errors=2 --routing-table routes.json
+    python compare-results.py --watch 10 --pooled   # Re-render as new runs land
 """
 
 import argparse
+import csv
+import hashlib
 import json
 import glob
+import math
+import os
+import re
+import sqlite3
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
 
 
-def load_results(results_dir: Path) -> list[dict]:
-    """Load all benchmark results from directory"""
+# Version of the normalized run schema below (and of the index layout)
+SCHEMA_VERSION = 1
+
+# Loading fewer files than this in-process beats starting a worker pool
+POOL_MIN_FILES = 64
+
+# Files at least this large are scheduled first and one per worker task
+LARGE_FILE_BYTES = 1 << 20
+
+
+def make_run(source_format: str, **fields) -> dict:
+    """A run in the normalized schema; missing metrics are None"""
+    run = {
+        'schema_version': SCHEMA_VERSION,
+        'format': source_format,
+        'endpoint': 'unknown',
+        'name': None,
+        'model': None,
+        'task': None,
+        'timestamp': '',
+        'iterations': None,
+        'avg_time': None,
+        'min_time': None,
+        'max_time': None,
+        'p50_time': None,
+        'p95_time': None,
+        'p99_time': None,
+        'avg_ttft': None,
+        'avg_tps': None,
+        'total_tokens': None,
+        'success_count': None,
+        'failure_count': None,
+        'samples': [],
+    }
+    run.update((key, value) for key, value in fields.items() if value is not None)
+    return run
+
+
+def adapt_subagent(data: dict) -> list[dict]:
+    """Agent mode result (avg_time, details[])"""
+    details = data.get('details') or []
+    return [make_run(
+        'subagent',
+        endpoint=data.get('endpoint'),
+        model=data.get('model'),
+        task=data.get('task'),
+        timestamp=data.get('timestamp'),
+        iterations=data.get('iterations'),
+        avg_time=data.get('avg_time'),
+        min_time=data.get('min_time'),
+        max_time=data.get('max_time'),
+        avg_tps=data.get('avg_tps'),
+        total_tokens=data.get('total_tokens'),
+        success_count=len(details) or None,
+        failure_count=0 if details else None,
+        samples=[
+            {
+                'iteration': d.get('iteration'),
+                'start_time': d.get('start_time'),
+                'response_time': d.get('response_time'),
+                'ttft': None,
+                'tokens': d.get('tokens'),
+                'tps': d.get('tps'),
+                'success': True,
+            }
+            for d in details
+        ],
+    )]
+
+
+def adapt_benchmark(data: dict) -> list[dict]:
+    """benchmark.py report (benchmark-data.json: avg_response_time, results[])"""
+    return [make_run(
+        'benchmark',
+        endpoint=data.get('endpoint'),
+        model=data.get('model'),
+        task=data.get('prompt'),
+        timestamp=data.get('timestamp'),
+        iterations=data.get('iterations'),
+        avg_time=data.get('avg_response_time'),
+        min_time=data.get('min_response_time'),
+        max_time=data.get('max_response_time'),
+        p50_time=data.get('p50_response_time'),
+        p95_time=data.get('p95_response_time'),
+        p99_time=data.get('p99_response_time'),
+        avg_ttft=data.get('avg_ttft'),
+        avg_tps=data.get('avg_tps'),
+        total_tokens=data.get('total_tokens'),
+        success_count=data.get('success_count'),
+        failure_count=data.get('failure_count'),
+        samples=[
+            {
+                'iteration': r.get('iteration'),
+                'start_time': None,
+                'response_time': r.get('response_time'),
+                'ttft': r.get('ttft'),
+                'tokens': r.get('tokens'),
+                'tps': r.get('tps'),
+                'success': bool(r.get('success', True)),
+            }
+            for r in data.get('results') or []
+        ],
+    )]
+
+
+def adapt_comparison(data: dict) -> list[dict]:
+    """benchmark.py --compare output (comparison-data.json: one report per endpoint)"""
+    runs = []
+    for name, report in data['endpoints'].items():
+        for run in adapt_benchmark(report):
+            run['format'] = 'comparison'
+            run['name'] = name
+            run['timestamp'] = run['timestamp'] or data.get('timestamp', '')
+            runs.append(run)
+    return runs
+
+
+ADAPTERS = {
+    'subagent': adapt_subagent,
+    'benchmark': adapt_benchmark,
+    'comparison': adapt_comparison,
+}
+
+
+def detect_format(data) -> Optional[str]:
+    """Which result format a parsed JSON file is in, or None for other JSON"""
+    if not isinstance(data, dict):
+        return None
+    if isinstance(data.get('endpoints'), dict) and 'mode' in data:
+        return 'comparison'
+    if 'avg_response_time' in data:
+        return 'benchmark'
+    if 'endpoint' in data and ('avg_time' in data or 'details' in data):
+        return 'subagent'
+    return None
+
+
+def normalize_results(data) -> list[dict]:
+    """Runs in the normalized schema from one parsed result file"""
+    source_format = detect_format(data)
+    return ADAPTERS[source_format](data) if source_format else []
+
+
+def discover_result_files(results_dir: Path) -> list[tuple[str, str, int, int]]:
+    """(path, path relative to results_dir, mtime_ns, size) of every JSON file below it"""
+    found = []
+    pending = [str(results_dir)]
+    prefix = len(str(results_dir)) + 1
+    while pending:
+        try:
+            entries = list(os.scandir(pending.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            # Symlinked directories are not followed, so a link loop cannot recurse forever
+            if entry.is_dir(follow_symlinks=False):
+                pending.append(entry.path)
+            elif entry.name.endswith('.json') and entry.is_file():
+                stat = entry.stat()
+                found.append((entry.path, entry.path[prefix:], stat.st_mtime_ns, stat.st_size))
+    found.sort()
+    return found
+
+
+def load_result_file(path: str, known_hash: Optional[str] = None, hashed: bool = True) -> tuple:
+    """Read, (optionally) hash and normalize one file; runs in loader processes
+
+    Returns (path, hash, runs, error). runs is None when the content hash
+    equals known_hash, i.e. the file was touched but not changed. Only
+    normalized runs travel back to the parent, never the raw text fields.
+    """
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest() if hashed else ''
+        if digest and digest == known_hash:
+            return path, digest, None, None
+        return path, digest, normalize_results(json.loads(content)), None
+    except Exception as e:
+        return path, '', None, str(e)
+
+
+def load_result_files(files: list[tuple[str, str, int, int]], known_hashes: Optional[dict] = None,
+                      workers: Optional[int] = None):
+    """Yield load_result_file for discovered files, in a process pool for large batches
+
+    Files are hashed only when known_hashes is given (i.e. for the index).
+    """
+    hashed = known_hashes is not None
+    known_hashes = known_hashes or {}
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(files) < POOL_MIN_FILES:
+        for path, relative, _, _ in files:
+            yield load_result_file(path, known_hashes.get(relative), hashed)
+        return
+
+    # Large files first, one per task, so none of them is left for last;
+    # small files in batches to amortize the inter-process round trips
+    large = sorted((f for f in files if f[3] >= LARGE_FILE_BYTES), key=lambda f: f[3], reverse=True)
+    small = [f for f in files if f[3] < LARGE_FILE_BYTES]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch, chunksize in ((large, 1), (small, max(1, len(small) // (workers * 4)))):
+            yield from executor.map(
+                load_result_file,
+                [f[0] for f in batch],
+                [known_hashes.get(f[1]) for f in batch],
+                [hashed] * len(batch),
+                chunksize=chunksize
+            )
+
+
+def load_results(results_dir: Path, workers: Optional[int] = None) -> list[dict]:
+    """Load all benchmark runs below directory, in the normalized schema"""
     results = []
 
     if not results_dir.exists():
         return results
 
-    for file_path in results_dir.glob("*.json"):
-        try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                # Add file metadata
-                data['_source_file'] = file_path.name
-                data['_modified'] = datetime.fromtimestamp(
-                    file_path.stat().st_mtime
-                ).isoformat()
-                results.append(data)
-        except Exception as e:
-            print(f"Warning: Failed to load {file_path}: {e}", file=sys.stderr)
+    files = discover_result_files(results_dir)
+    metadata = {path: (relative, mtime_ns) for path, relative, mtime_ns, _ in files}
+    for path, _, runs, error in load_result_files(files, workers=workers):
+        if error:
+            print(f"Warning: Failed to load {path}: {error}", file=sys.stderr)
             continue
+        relative, mtime_ns = metadata[path]
+        for run in runs:
+            # Add file metadata
+            run['_source_file'] = relative
+            run['_modified'] = datetime.fromtimestamp(mtime_ns / 1e9).isoformat()
+            results.append(run)
 
     return results
 
 
+INDEX_FILENAME = ".results-index.sqlite"
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+    format TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    name TEXT,
+    model TEXT,
+    task TEXT,
+    timestamp TEXT NOT NULL,
+    modified TEXT NOT NULL,
+    iterations INTEGER,
+    avg_time REAL,
+    min_time REAL,
+    max_time REAL,
+    p50_time REAL,
+    p95_time REAL,
+    p99_time REAL,
+    avg_ttft REAL,
+    avg_tps REAL,
+    total_tokens INTEGER,
+    success_count INTEGER,
+    failure_count INTEGER,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    iteration INTEGER,
+    start_time TEXT,
+    response_time REAL,
+    ttft REAL,
+    tokens INTEGER,
+    tps REAL,
+    success INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS runs_by_endpoint ON runs(endpoint, timestamp);
+CREATE INDEX IF NOT EXISTS runs_by_timestamp ON runs(timestamp);
+CREATE INDEX IF NOT EXISTS runs_by_file ON runs(file);
+CREATE INDEX IF NOT EXISTS samples_by_run ON samples(run_id);
+"""
+
+# Normalized run fields stored as columns of the runs table
+RUN_COLUMNS = (
+    'format', 'endpoint', 'name', 'model', 'task', 'timestamp', 'iterations',
+    'avg_time', 'min_time', 'max_time', 'p50_time', 'p95_time', 'p99_time',
+    'avg_ttft', 'avg_tps', 'total_tokens', 'success_count', 'failure_count',
+)
+
+SAMPLE_COLUMNS = ('iteration', 'start_time', 'response_time', 'ttft', 'tokens', 'tps', 'success')
+
+
+class ResultIndex:
+    """Persistent SQLite index of result files, their runs and per-request samples
+
+    Files are re-read only when their mtime or size changed, and re-ingested
+    only when their content hash changed too. Comparisons then run as SQL
+    against the index instead of parsing every file. An index written for
+    another SCHEMA_VERSION is rebuilt from scratch.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.execute("PRAGMA journal_mode = WAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            with self.db:
+                for table in ('samples', 'runs', 'files'):
+                    self.db.execute(f"DROP TABLE IF EXISTS {table}")
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.executescript(INDEX_SCHEMA)
+        self.added_runs: list[int] = []
+        self.removed_runs: list[int] = []
+
+    def close(self):
+        self.db.close()
+
+    def sync(self, results_dir: Path, workers: Optional[int] = None) -> dict:
+        """Bring the index up to date with results_dir; returns ingest counts
+
+        The ids of runs inserted and deleted are kept in added_runs and
+        removed_runs until the next sync.
+        """
+        counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        self.added_runs, self.removed_runs = [], []
+        known = {
+            row['path']: row
+            for row in self.db.execute("SELECT path, mtime_ns, size, hash FROM files")
+        }
+        files = discover_result_files(results_dir)
+        seen = {relative for _, relative, _, _ in files}
+        changed = []
+        for file in files:
+            row = known.get(file[1])
+            if row and row['mtime_ns'] == file[2] and row['size'] == file[3]:
+                counts['unchanged'] += 1
+            else:
+                changed.append(file)
+
+        metadata = {path: (relative, mtime_ns, size) for path, relative, mtime_ns, size in changed}
+        known_hashes = {key: row['hash'] for key, row in known.items()}
+        with self.db:
+            for path, digest, runs, error in load_result_files(changed, known_hashes, workers):
+                key, mtime_ns, size = metadata[path]
+                if error:
+                    print(f"Warning: Failed to load {path}: {error}", file=sys.stderr)
+                    counts['failed'] += 1
+                    continue
+                if runs is None:
+                    # Touched but not changed
+                    self.db.execute(
+                        "UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?", (mtime_ns, size, key)
+                    )
+                    counts['unchanged'] += 1
+                    continue
+
+                self._delete_file(key)
+                self.db.execute(
+                    "INSERT INTO files (path, mtime_ns, size, hash) VALUES (?, ?, ?, ?)",
+                    (key, mtime_ns, size, digest)
+                )
+                modified = datetime.fromtimestamp(mtime_ns / 1e9).isoformat()
+                for run in runs:
+                    self.added_runs.append(self._insert_run(key, run, modified))
+                counts['updated' if key in known else 'added'] += 1
+
+            for key in known.keys() - seen:
+                self._delete_file(key)
+                counts['removed'] += 1
+
+        return counts
+
+    def _delete_file(self, key: str):
+        self.removed_runs += [row[0] for row in self.db.execute("SELECT id FROM runs WHERE file = ?", (key,))]
+        self.db.execute("DELETE FROM files WHERE path = ?", (key,))
+
+    def _insert_run(self, file: str, run: dict, modified: str) -> int:
+        summary = {key: value for key, value in run.items() if key != 'samples'}
+        cursor = self.db.execute(
+            f"""INSERT INTO runs (file, modified, data, {', '.join(RUN_COLUMNS)})
+                VALUES (?, ?, ?, {', '.join('?' * len(RUN_COLUMNS))})""",
+            (file, modified, json.dumps(summary), *(run[column] for column in RUN_COLUMNS))
+        )
+        self.db.executemany(
+            f"""INSERT INTO samples (run_id, {', '.join(SAMPLE_COLUMNS)})
+                VALUES (?, {', '.join('?' * len(SAMPLE_COLUMNS))})""",
+            [
+                (cursor.lastrowid, *(sample[column] for column in SAMPLE_COLUMNS))
+                for sample in run['samples']
+            ]
+        )
+        return cursor.lastrowid
+
+    def latest_runs(self, endpoint: Optional[str] = None, since: Optional[str] = None,
+                    until: Optional[str] = None) -> list[dict]:
+        """Most recent matching run per endpoint, as loaded by load_results (without samples)"""
+        where, params = run_filters(endpoint, since, until)
+        rows = self.db.execute(
+            f"""SELECT data, file, modified FROM (
+                    SELECT data, file, modified, ROW_NUMBER() OVER (
+                        PARTITION BY endpoint ORDER BY timestamp DESC, id
+                    ) AS recency
+                    FROM runs {where}
+                ) WHERE recency = 1""",
+            params
+        )
+        results = []
+        for row in rows:
+            data = json.loads(row['data'])
+            data['_source_file'] = row['file']
+            data['_modified'] = row['modified']
+            results.append(data)
+        return results
+
+    def pooled_samples(self, endpoint: Optional[str] = None, since: Optional[str] = None,
+                       until: Optional[str] = None, run_ids: Optional[list[int]] = None) -> list[tuple]:
+        """Samples of all matching runs (or of matching run_ids only) as RunSamples rows"""
+        where, params = run_filters(endpoint, since, until)
+        if run_ids is not None:
+            where += (" AND " if where else "WHERE ") + f"runs.id IN ({', '.join('?' * len(run_ids))})"
+            params += list(run_ids)
+        return self.db.execute(
+            f"""SELECT runs.endpoint, runs.model, runs.id, runs.timestamp,
+                       samples.response_time, samples.ttft, samples.tps, samples.success
+                FROM samples JOIN runs ON runs.id = samples.run_id {where}""",
+            params
+        ).fetchall()
+
+
+def run_filters(endpoint: Optional[str], since: Optional[str], until: Optional[str]) -> tuple[str, list]:
+    """SQL WHERE clause and parameters for the run filters"""
+    clauses, params = [], []
+    if endpoint:
+        clauses.append("instr(endpoint, ?) > 0")
+        params.append(endpoint)
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("timestamp <= ?")
+        params.append(until)
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def filter_results(results: list[dict], endpoint: Optional[str], since: Optional[str],
+                   until: Optional[str]) -> list[dict]:
+    """The run filters applied to results loaded without the index"""
+    return [
+        r for r in results
+        if (not endpoint or endpoint in r.get("endpoint", "unknown"))
+        and (not since or r.get("timestamp", "") >= since)
+        and (not until or r.get("timestamp", "") <= until)
+    ]
+
+
+def parse_timestamp(value: str, end_of_day: bool = False) -> str:
+    """--since/--until as a local ISO timestamp comparable with stored run timestamps
+
+    Runs are stamped with naive local datetime.now().isoformat(), so aware
+    inputs are converted to local time; a bare date with end_of_day covers
+    the whole day.
+    """
+    try:
+        moment = datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError(f"Invalid timestamp '{value}' (expected ISO format, e.g. 2026-03-01 or 2026-03-01T12:00)")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    if end_of_day and re.fullmatch(r"\d{4}-?\d{2}-?\d{2}", value.strip()):
+        moment = datetime.combine(moment.date(), datetime.max.time())
+    return moment.isoformat()
+
+
+def parse_window(window: str) -> str:
+    """ISO timestamp that starts a trailing window such as '90m', '24h' or '7d'"""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhdw])", window.strip())
+    if not match:
+        raise ValueError(f"Invalid window '{window}' (expected e.g. 30m, 24h, 7d)")
+    unit = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}[match.group(2)]
+    start = datetime.now() - timedelta(**{unit: float(match.group(1))})
+    return start.isoformat(timespec='seconds')
+
+
+def run_samples(results: list[dict]) -> list[tuple]:
+    """pool_samples rows from runs loaded without the index"""
+    return [
+        (r.get("endpoint", "unknown"), r.get("model"), run_id, r.get("timestamp", ""),
+         s.get("response_time"), s.get("ttft"), s.get("tps"), s.get("success", True))
+        for run_id, r in enumerate(results)
+        for s in r.get("samples") or []
+    ]
+
+
+def percentile(sorted_data: list[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted data, as in benchmark.py"""
+    if not sorted_data:
+        return None
+    return sorted_data[min(int(len(sorted_data) * pct / 100), len(sorted_data) - 1)]
+
+
+POOLED_PERCENTILES = (50, 95, 99)
+
+# --rank-by metric -> True when higher values rank first
+RANK_METRICS = {
+    **{f"p{p}_time": False for p in POOLED_PERCENTILES},
+    **{f"p{p}_ttft": False for p in POOLED_PERCENTILES},
+    **{f"p{p}_tps": True for p in POOLED_PERCENTILES},
+    "error_rate": False,
+}
+
+
+class RunSamples:
+    """Per-run samples that pooled stats and histories are computed from
+
+    rows are (endpoint, model, run id, run timestamp, response_time, ttft,
+    tps, success), as returned by ResultIndex.pooled_samples. Runs can be
+    added and dropped individually and pooled stats are cached per
+    (endpoint, model), so --watch folds in new runs without recomputing
+    groups they do not touch.
+    """
+
+    def __init__(self, rows: list[tuple] = ()):
+        self.runs = {}
+        self.groups = {}
+        self.cache = {}
+        self.add(rows)
+
+    def add(self, rows: list[tuple]):
+        for endpoint, model, run_id, timestamp, response_time, ttft, tps, success in rows:
+            run = self.runs.get(run_id)
+            if run is None:
+                run = self.runs[run_id] = {
+                    'key': (endpoint, model), 'timestamp': timestamp,
+                    'times': [], 'ttfts': [], 'tps': [], 'failures': 0,
+                }
+                self.groups.setdefault((endpoint, model), set()).add(run_id)
+                self.cache.pop((endpoint, model), None)
+            if not success:
+                run['failures'] += 1
+                continue
+            if response_time is not None:
+                run['times'].append(response_time)
+            if ttft:
+                run['ttfts'].append(ttft)
+            if tps:
+                run['tps'].append(tps)
+
+    def discard(self, run_ids) -> bool:
+        """Drop runs (e.g. from replaced or deleted files); True if any were held"""
+        dropped = False
+        for run_id in run_ids:
+            run = self.runs.pop(run_id, None)
+            if run is None:
+                continue
+            dropped = True
+            group = self.groups[run['key']]
+            group.discard(run_id)
+            if not group:
+                del self.groups[run['key']]
+            self.cache.pop(run['key'], None)
+        return dropped
+
+    def expire(self, since: str) -> bool:
+        """Drop runs older than since (a moving --window); True if any were"""
+        return self.discard([run_id for run_id, run in self.runs.items() if run['timestamp'] < since])
+
+    def pooled(self) -> list[dict]:
+        """Pooled statistics per (endpoint, model) over every sample of every run
+
+        Latency and throughput percentiles use successful samples only; the
+        error rate counts every sample.
+        """
+        for key, run_ids in self.groups.items():
+            if key not in self.cache:
+                self.cache[key] = self._pool(key, [self.runs[run_id] for run_id in run_ids])
+        return [self.cache[key] for key in self.groups]
+
+    @staticmethod
+    def _pool(key: tuple, runs: list[dict]) -> dict:
+        failures = sum(run['failures'] for run in runs)
+        values = {name: sorted(v for run in runs for v in run[name]) for name in ('times', 'ttfts', 'tps')}
+        total = len(values['times']) + failures
+        stats = {
+            'endpoint': key[0],
+            'model': key[1],
+            'runs': len(runs),
+            'samples': total,
+            'ttft_samples': len(values['ttfts']),
+            'failures': failures,
+            'error_rate': failures / total if total else 0.0,
+            'first_run': min(run['timestamp'] for run in runs),
+            'last_run': max(run['timestamp'] for run in runs),
+        }
+        for name, field in (('time', 'times'), ('ttft', 'ttfts'), ('tps', 'tps')):
+            for p in POOLED_PERCENTILES:
+                stats[f"p{p}_{name}"] = percentile(values[field], p)
+        return stats
+
+
+def pool_samples(rows: list[tuple]) -> list[dict]:
+    """Pooled statistics per (endpoint, model) from pooled_samples rows"""
+    return RunSamples(rows).pooled()
+
+
+def rank_pooled(pooled: list[dict], rank_by: str) -> list[dict]:
+    """Order pooled groups best-first by one metric; groups lacking it go last"""
+    descending = RANK_METRICS[rank_by]
+    ranked = [g for g in pooled if g[rank_by] is not None]
+    ranked.sort(key=lambda g: -g[rank_by] if descending else g[rank_by])
+    return ranked + [g for g in pooled if g[rank_by] is None]
+
+
+def generate_pooled_comparison(pooled: list[dict], output_format: str = "table",
+                               rank_by: str = "p95_time", since: Optional[str] = None) -> str:
+    """Comparison report of pooled percentiles, ranked by rank_by"""
+    ranked = rank_pooled(pooled, rank_by)
+
+    if output_format == "json":
+        return json.dumps({
+            "comparison_date": datetime.now().isoformat(),
+            "schema_version": SCHEMA_VERSION,
+            "aggregation": "pooled",
+            "window_start": since,
+            "rank_by": rank_by,
+            "endpoints_tested": len(ranked),
+            "results": ranked
+        }, indent=2)
+
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else "N/A"
+
+    width = 153
+    lines = [
+        "",
+        "=" * width,
+        "                    LLM API ENDPOINT COMPARISON (pooled samples)",
+        "=" * width,
+        "",
+        f"{'Endpoint':<38} {'Model':<24} {'Runs':>5} {'Samples':>8} {'P50':>8} {'P95':>8} {'P99':>8} "
+        f"{'TTFT P50':>9} {'TTFT P95':>9} {'TTFT P99':>9} {'TPS P50':>8} {'Errors':>7}",
+        "-" * width,
+    ]
+
+    if not ranked:
+        lines.append("No samples to display.")
+        return "\n".join(lines)
+
+    for g in ranked:
+        model = g['model'] or "-"
+        if len(model) > 24:
+            model = model[:21] + "..."
+        tps = f"{g['p50_tps']:.1f}" if g['p50_tps'] is not None else "N/A"
+        lines.append(
+            f"{format_endpoint_name(g['endpoint']):<38} {model:<24} {g['runs']:>5} {g['samples']:>8} "
+            f"{seconds(g['p50_time']):>8} {seconds(g['p95_time']):>8} {seconds(g['p99_time']):>8} "
+            f"{seconds(g['p50_ttft']):>9} {seconds(g['p95_ttft']):>9} {seconds(g['p99_ttft']):>9} "
+            f"{tps:>8} {g['error_rate']:>6.1%}"
+        )
+
+    lines.extend([
+        "-" * width,
+        f"Total endpoints tested: {len(ranked)}, ranked by {rank_by}"
+        + (f", runs since {since}" if since else ""),
+        "",
+        "Notes:",
+        "  - Percentiles pool every request of every matching run, not per-run averages",
+        "  - Latency and TPS percentiles use successful requests; 'Errors' counts all",
+        "  - TTFT is only recorded by benchmark.py (HTTP mode) runs",
+        "",
+    ])
+
+    return "\n".join(lines)
+
+
+# --metric -> (sample field, True when higher values are better)
+HISTORY_METRICS = {
+    'time': ('response_time', False),
+    'ttft': ('ttft', False),
+    'tps': ('tps', True),
+    'error_rate': (None, False),
+}
+
+HISTORY_FIELDS = (
+    'endpoint', 'model', 'timestamp', 'samples', 'error_rate', 'p50_time', 'p50_ttft', 'p50_tps',
+    'rolling_p50_time', 'rolling_p95_time', 'rolling_p95_ttft', 'rolling_p50_tps', 'change',
+)
+
+
+def median(values: list[float]) -> float:
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def detect_change_points(values: list[float], penalty: float = 4.0, min_size: int = 3,
+                         min_shift: float = 0.1) -> list[int]:
+    """Indices where the level of values steps, by penalized optimal partitioning
+
+    A 3-point running median first removes single outlier runs. The series
+    is then split into the segmentation that minimizes the within-segment
+    squared error (in units of the noise variance, estimated robustly from
+    successive differences) plus penalty * log(n) per change point. Steps
+    smaller than min_shift of the earlier level are not reported.
+    """
+    n = len(values)
+    if n < 2 * min_size:
+        return []
+    x = [values[0]] + [median(values[i - 1:i + 2]) for i in range(1, n - 1)] + [values[-1]]
+    # 1.4826 * MAD / sqrt(2) of the differences estimates sigma, ignoring the steps themselves
+    sigma = 1.4826 * median([abs(b - a) for a, b in zip(values, values[1:])]) / 2 ** 0.5
+    if sigma <= 0:
+        sigma = 1e-9 * (max(abs(v) for v in values) or 1)
+
+    sums, squares = [0.0], [0.0]
+    for v in x:
+        sums.append(sums[-1] + v)
+        squares.append(squares[-1] + v * v)
+
+    def cost(start: int, end: int) -> float:
+        total = sums[end] - sums[start]
+        return (squares[end] - squares[start] - total * total / (end - start)) / sigma ** 2
+
+    beta = penalty * max(1.0, math.log(n))
+    best = [0.0] + [float('inf')] * n
+    previous = [0] * (n + 1)
+    for end in range(min_size, n + 1):
+        for start in [0] + list(range(min_size, end - min_size + 1)):
+            if best[start] == float('inf'):
+                continue
+            candidate = best[start] + cost(start, end) + (beta if start else 0.0)
+            if candidate < best[end]:
+                best[end], previous[end] = candidate, start
+
+    bounds = []
+    end = n
+    while end > 0:
+        bounds.append(end)
+        end = previous[end]
+    bounds = [0] + sorted(bounds)
+
+    found = []
+    for a, k, b in zip(bounds, bounds[1:], bounds[2:]):
+        before, after = median(values[a:k]), median(values[k:b])
+        if abs(after - before) >= min_shift * abs(before):
+            found.append(k)
+    return found
+
+
+def build_history(samples: RunSamples, rolling: int = 5, metric: str = 'time') -> list[dict]:
+    """Per-(endpoint, model) time series with one point per run
+
+    Each point carries the run's own medians plus percentiles pooled over the
+    trailing `rolling` runs. Change points are detected on the per-run value
+    of metric and marked as regressions or improvements.
+    """
+    grouped = {}
+    for run_id, run in sorted(samples.runs.items(), key=lambda item: (item[1]['timestamp'], item[0])):
+        grouped.setdefault(run['key'], []).append(run)
+
+    field, higher_is_better = HISTORY_METRICS[metric]
+    series = []
+    for (endpoint, model), group in grouped.items():
+        points = []
+        for i, run in enumerate(group):
+            window = group[max(0, i - rolling + 1):i + 1]
+            pooled = {
+                key: sorted(v for r in window for v in r[key]) for key in ('times', 'ttfts', 'tps')
+            }
+            total = len(run['times']) + run['failures']
+            points.append({
+                'endpoint': endpoint,
+                'model': model,
+                'timestamp': run['timestamp'],
+                'samples': total,
+                'error_rate': run['failures'] / total if total else 0.0,
+                'p50_time': percentile(sorted(run['times']), 50),
+                'p50_ttft': percentile(sorted(run['ttfts']), 50),
+                'p50_tps': percentile(sorted(run['tps']), 50),
+                'rolling_p50_time': percentile(pooled['times'], 50),
+                'rolling_p95_time': percentile(pooled['times'], 95),
+                'rolling_p95_ttft': percentile(pooled['ttfts'], 95),
+                'rolling_p50_tps': percentile(pooled['tps'], 50),
+                'change': '',
+            })
+
+        key = 'error_rate' if field is None else f"p50_{metric}"
+        tracked = [(i, p[key]) for i, p in enumerate(points) if p[key] is not None]
+        values = [value for _, value in tracked]
+        splits = detect_change_points(values)
+        bounds = [0] + splits + [len(values)]
+        changes = []
+        for a, k, b in zip(bounds, bounds[1:], bounds[2:]):
+            before, after = median(values[a:k]), median(values[k:b])
+            worse = after < before if higher_is_better else after > before
+            point = points[tracked[k][0]]
+            point['change'] = 'regression' if worse else 'improvement'
+            changes.append({
+                'timestamp': point['timestamp'],
+                'kind': point['change'],
+                'before': before,
+                'after': after,
+                'relative_change': (after - before) / before if before else None,
+            })
+
+        series.append({
+            'endpoint': endpoint,
+            'model': model,
+            'metric': metric,
+            'runs': len(points),
+            'first_run': points[0]['timestamp'],
+            'last_run': points[-1]['timestamp'],
+            'change_points': changes,
+            'points': points,
+        })
+    return series
+
+
+def export_history(series: list[dict], path: Path):
+    """Write the history points as CSV (by extension) or JSON"""
+    if path.suffix.lower() == '.csv':
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=HISTORY_FIELDS)
+            writer.writeheader()
+            for s in series:
+                writer.writerows(s['points'])
+    else:
+        path.write_text(json.dumps({
+            'generated': datetime.now().isoformat(),
+            'schema_version': SCHEMA_VERSION,
+            'series': series,
+        }, indent=2))
+
+
+def generate_history_report(series: list[dict], output_format: str = "table", rolling: int = 5) -> str:
+    """Per-endpoint trend summary with detected change points"""
+    if output_format == "json":
+        return json.dumps({
+            "generated": datetime.now().isoformat(),
+            "schema_version": SCHEMA_VERSION,
+            "rolling_runs": rolling,
+            "series": series
+        }, indent=2)
+
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else "N/A"
+
+    lines = [
+        "",
+        "=" * 100,
+        "                    LLM API ENDPOINT HISTORY",
+        "=" * 100,
+    ]
+    for s in series:
+        latest = s['points'][-1]
+        model = f" ({s['model']})" if s['model'] else ""
+        lines.extend([
+            "",
+            f"{format_endpoint_name(s['endpoint'])}{model}",
+            f"  Runs: {s['runs']} ({s['first_run']} .. {s['last_run']})",
+            f"  Latest rolling ({rolling} runs): P50 {seconds(latest['rolling_p50_time'])}, "
+            f"P95 {seconds(latest['rolling_p95_time'])}, TTFT P95 {seconds(latest['rolling_p95_ttft'])}",
+        ])
+        if not s['change_points']:
+            lines.append(f"  No step changes in {s['metric']}")
+        for change in s['change_points']:
+            relative = change['relative_change']
+            relative_str = f"{relative:+.0%}" if relative is not None else "N/A"
+            marker = "⚠ regression " if change['kind'] == 'regression' else "✓ improvement"
+            lines.append(
+                f"  {marker} at {change['timestamp']}: {s['metric']} "
+                f"{change['before']:.3f} → {change['after']:.3f} ({relative_str})"
+            )
+
+    lines.extend([
+        "",
+        "-" * 100,
+        f"Total endpoints: {len(series)}",
+        "",
+        "Notes:",
+        "  - Change points are level shifts in each run's median of the tracked metric",
+        "  - Use --export FILE.csv|FILE.json for the full per-run series",
+        "",
+    ])
+    return "\n".join(lines)
+
+
+# --weights objective -> (pooled metric, True when higher values are better)
+SCORE_OBJECTIVES = {
+    'ttft': ('p95_ttft', False),
+    'time': ('p95_time', False),
+    'tps': ('p50_tps', True),
+    'errors': ('error_rate', False),
+    'cost': ('cost', False),
+}
+
+DEFAULT_WEIGHTS = "ttft=1,tps=1,errors=1,cost=1"
+
+
+def parse_weights(spec: str) -> dict[str, float]:
+    """Objective weights from 'ttft=2,tps=1,...'; unlisted objectives weigh 0"""
+    weights = {}
+    for item in spec.split(','):
+        name, _, value = item.partition('=')
+        name = name.strip()
+        if name not in SCORE_OBJECTIVES:
+            raise ValueError(f"Unknown objective '{name}' (choose from {', '.join(SCORE_OBJECTIVES)})")
+        try:
+            weights[name] = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid weight for '{name}': '{value}'") from None
+        if weights[name] < 0:
+            raise ValueError(f"Weight for '{name}' must not be negative")
+    return weights
+
+
+def load_costs(path: Path) -> dict[str, float]:
+    """Endpoint (or URL substring) -> cost per 1M output tokens"""
+    data = json.loads(path.read_text())
+    return {key: float(value) for key, value in data.get('costs', data).items()}
+
+
+def endpoint_cost(endpoint: str, costs: dict[str, float]) -> Optional[float]:
+    """Cost of an exact endpoint match, else of the longest matching substring"""
+    if endpoint in costs:
+        return costs[endpoint]
+    matches = [key for key in costs if key in endpoint]
+    return costs[max(matches, key=len)] if matches else None
+
+
+def pareto_fronts(points: list[list[float]]) -> list[int]:
+    """1-based non-domination rank of each point (all objectives minimized)"""
+    def dominates(a, b):
+        return all(x <= y for x, y in zip(a, b)) and any(x < y for x, y in zip(a, b))
+
+    ranks = [0] * len(points)
+    remaining = set(range(len(points)))
+    front = 0
+    while remaining:
+        front += 1
+        current = {
+            i for i in remaining
+            if not any(dominates(points[j], points[i]) for j in remaining if j != i)
+        }
+        for i in current:
+            ranks[i] = front
+        remaining -= current
+    return ranks
+
+
+def score_endpoints(pooled: list[dict], weights: dict[str, float],
+                    costs: Optional[dict[str, float]] = None, max_error_rate: float = 0.05) -> list[dict]:
+    """Weighted score, Pareto front and routing weight per pooled group
+
+    Each objective is min-max normalized across groups so that 1 is the best
+    value seen and 0 the worst; a group missing a metric (e.g. TTFT for Agent
+    mode runs) counts as worst on it. Objectives nobody has are dropped,
+    except that a TTFT weight nobody can use moves to P95 response time so
+    latency still counts. The score is the weighted mean of the normalized
+    objectives. Routing weights split traffic in proportion to score over
+    the groups within the error budget that no other group within it
+    dominates.
+    """
+    groups = [dict(g, cost=endpoint_cost(g['endpoint'], costs) if costs else None) for g in pooled]
+    if weights.get('ttft', 0) > 0 and all(g['p95_ttft'] is None for g in groups):
+        weights = dict(weights, time=weights.get('time', 0) + weights['ttft'], ttft=0)
+    active = {
+        name: weight for name, weight in weights.items()
+        if weight > 0 and any(g[SCORE_OBJECTIVES[name][0]] is not None for g in groups)
+    }
+
+    normalized = [{} for _ in groups]
+    for name in active:
+        metric, higher_is_better = SCORE_OBJECTIVES[name]
+        present = [g[metric] for g in groups if g[metric] is not None]
+        low, high = min(present), max(present)
+        for norm, g in zip(normalized, groups):
+            value = g[metric]
+            if value is None:
+                norm[name] = 0.0
+            elif high == low:
+                norm[name] = 1.0
+            else:
+                norm[name] = (value - low) / (high - low)
+                if not higher_is_better:
+                    norm[name] = 1.0 - norm[name]
+
+    total_weight = sum(active.values())
+    points = [[-norm[name] for name in active] for norm in normalized]
+    for g, norm, front in zip(groups, normalized, pareto_fronts(points)):
+        g['objectives'] = norm
+        g['score'] = sum(active[name] * norm[name] for name in active) / total_weight if total_weight else 0.0
+        g['front'] = front
+        g['routing_weight'] = 0.0
+
+    eligible = [i for i, g in enumerate(groups) if g['error_rate'] <= max_error_rate]
+    leaders = [
+        groups[i] for i, front in zip(eligible, pareto_fronts([points[i] for i in eligible])) if front == 1
+    ]
+    leader_score = sum(g['score'] for g in leaders)
+    for g in leaders:
+        g['routing_weight'] = g['score'] / leader_score if leader_score > 0 else 1.0 / len(leaders)
+
+    groups.sort(key=lambda g: (g['front'], -g['score']))
+    return groups
+
+
+def routing_table(scored: list[dict], since: Optional[str] = None) -> dict:
+    """Machine-readable endpoint -> traffic weight table for a client-side balancer"""
+    weights = {}
+    for g in scored:
+        if g['routing_weight'] > 0:
+            weights[g['endpoint']] = weights.get(g['endpoint'], 0.0) + g['routing_weight']
+    return {
+        'generated': datetime.now().isoformat(),
+        'window_start': since,
+        'weights': {endpoint: round(weight, 4) for endpoint, weight in weights.items()},
+    }
+
+
+def generate_score_report(scored: list[dict], output_format: str = "table",
+                          weights: Optional[dict[str, float]] = None, since: Optional[str] = None) -> str:
+    """Multi-objective ranking: Pareto front first, then weighted score"""
+    if output_format == "json":
+        return json.dumps({
+            "comparison_date": datetime.now().isoformat(),
+            "schema_version": SCHEMA_VERSION,
+            "aggregation": "pooled",
+            "window_start": since,
+            "weights": weights,
+            "endpoints_tested": len(scored),
+            "results": scored,
+            "routing_table": routing_table(scored, since)["weights"],
+        }, indent=2)
+
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else "N/A"
+
+    width = 130
+    lines = [
+        "",
+        "=" * width,
+        "                         LLM API ENDPOINT RANKING (multi-objective)",
+        "=" * width,
+        "",
+        f"{'Endpoint':<38} {'Model':<24} {'Front':>5} {'Score':>6} {'TTFT P95':>9} {'Time P95':>9} "
+        f"{'TPS P50':>8} {'Errors':>7} {'Cost':>7} {'Route':>7}",
+        "-" * width,
+    ]
+
+    for g in scored:
+        model = g['model'] or "-"
+        if len(model) > 24:
+            model = model[:21] + "..."
+        tps = f"{g['p50_tps']:.1f}" if g['p50_tps'] is not None else "N/A"
+        cost = f"{g['cost']:.2f}" if g['cost'] is not None else "N/A"
+        route = f"{g['routing_weight']:.0%}" if g['routing_weight'] else "-"
+        lines.append(
+            f"{format_endpoint_name(g['endpoint']):<38} {model:<24} {g['front']:>5} {g['score']:>6.2f} "
+            f"{seconds(g['p95_ttft']):>9} {seconds(g['p95_time']):>9} "
+            f"{tps:>8} {g['error_rate']:>6.1%} {cost:>7} {route:>7}"
+        )
+
+    active = ", ".join(f"{name}={weight:g}" for name, weight in (weights or {}).items() if weight > 0)
+    lines.extend([
+        "-" * width,
+        f"Total endpoints tested: {len(scored)}, weights: {active}"
+        + (f", runs since {since}" if since else ""),
+        "",
+        "Notes:",
+        "  - 'Front' is the Pareto rank: front 1 endpoints are not beaten on every objective by another",
+        "  - 'Score' is the weighted mean of objectives normalized to 0 (worst) .. 1 (best)",
+        "  - 'Route' splits traffic in proportion to score over the endpoints within the error",
+        "    budget that none of them dominates (see --routing-table)",
+        "  - 'Cost' is per 1M output tokens, from --costs",
+    ])
+    if (weights or {}).get('ttft', 0) > 0 and all(g['p95_ttft'] is None for g in scored):
+        lines.append("  - No endpoint has TTFT samples (e.g. Agent mode), so the ttft weight applies to P95 time")
+    lines.append("")
+    return "\n".join(lines)
+
+
 def format_endpoint_name(endpoint: str) -> str:
     """Format endpoint name for display"""
     # Remove protocol
@@ -73,14 +1151,15 @@ def generate_comparison(results: list[dict], output_format: str = "table") -> st
     # Convert back to list and sort by avg_time
     unique_results = sorted(
         endpoint_results.values(),
-        key=lambda x: x.get("avg_time", float('inf'))
+        key=lambda x: x.get("avg_time") or float('inf')
     )
 
     if output_format == "json":
         return json.dumps({
             "comparison_date": datetime.now().isoformat(),
+            "schema_version": SCHEMA_VERSION,
             "endpoints_tested": len(unique_results),
-            "results": unique_results
+            "results": [{k: v for k, v in r.items() if k != "samples"} for r in unique_results]
         }, indent=2)
 
     # Table format - include TPS if available
@@ -111,14 +1190,14 @@ def generate_comparison(results: list[dict], output_format: str = "table") -> st
         lines.append("No results to display.")
         return "\n".join(lines)
 
-    baseline_time = unique_results[0].get("avg_time", 1)
+    baseline_time = unique_results[0].get("avg_time") or 1
 
     for r in unique_results:
         endpoint = format_endpoint_name(r.get("endpoint", "unknown"))
-        avg = r.get("avg_time", 0)
-        min_t = r.get("min_time", 0)
-        max_t = r.get("max_time", 0)
-        avg_tps = r.get("avg_tps", 0)
+        avg = r.get("avg_time") or 0
+        min_t = r.get("min_time") or 0
+        max_t = r.get("max_time") or 0
+        avg_tps = r.get("avg_tps") or 0
 
         avg_str = f"{avg:.2f}s"
         min_str = f"{min_t:.2f}s"
@@ -176,8 +1255,8 @@ def main():
     )
     parser.add_argument(
         "--dir", "-d",
-        default="reports/llm-benchmark-subagent",
-        help="Results directory (default: reports/llm-benchmark-subagent)"
+        default="reports",
+        help="Results directory, searched recursively (default: reports)"
     )
     parser.add_argument(
         "--format", "-f",
@@ -189,20 +1268,164 @@ def main():
         "--output", "-o",
         help="Output file (default: print to stdout)"
     )
+    parser.add_argument(
+        "--endpoint", "-e",
+        help="Only compare endpoints whose URL contains this text"
+    )
+    parser.add_argument(
+        "--since",
+        help="Only include runs at or after this ISO timestamp (e.g. 2026-03-01)"
+    )
+    parser.add_argument(
+        "--until",
+        help="Only include runs at or before this ISO timestamp (a bare date includes that whole day)"
+    )
+    parser.add_argument(
+        "--window",
+        help="Only include runs from a trailing window, e.g. 24h or 7d"
+    )
+    parser.add_argument(
+        "--pooled",
+        action="store_true",
+        help="Pool per-request samples across all matching runs instead of using the latest run"
+    )
+    parser.add_argument(
+        "--rank-by",
+        choices=sorted(RANK_METRICS),
+        help="Pooled metric to rank endpoints by; implies --pooled (default: p95_time)"
+    )
+    parser.add_argument(
+        "--history",
+        action="store_true",
+        help="Per-endpoint time series with rolling percentiles and change-point detection"
+    )
+    parser.add_argument(
+        "--metric",
+        choices=sorted(HISTORY_METRICS),
+        default="time",
+        help="Per-run metric searched for step changes in --history (default: time)"
+    )
+    parser.add_argument(
+        "--rolling",
+        type=int,
+        default=5,
+        help="Runs pooled into each rolling percentile in --history (default: 5)"
+    )
+    parser.add_argument(
+        "--export",
+        help="With --history, also write the per-run series to FILE.csv or FILE.json"
+    )
+    parser.add_argument(
+        "--score",
+        action="store_true",
+        help="Rank pooled stats by Pareto front and weighted score over TTFT, TPS, errors and cost"
+    )
+    parser.add_argument(
+        "--weights",
+        default=DEFAULT_WEIGHTS,
+        help=f"Objective weights for --score (default: {DEFAULT_WEIGHTS})"
+    )
+    parser.add_argument(
+        "--costs",
+        help="JSON file mapping endpoints (or URL substrings) to cost per 1M output tokens"
+    )
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=0.05,
+        help="Endpoints above this error rate get no traffic in the routing table (default: 0.05)"
+    )
+    parser.add_argument(
+        "--routing-table",
+        help="Write an endpoint -> weight routing table (JSON) from the scored ranking; implies --score"
+    )
+    parser.add_argument(
+        "--watch",
+        type=float,
+        nargs="?",
+        const=5.0,
+        metavar="SECONDS",
+        help="Poll the results directory (default every 5s) and re-render whenever runs land"
+    )
+    parser.add_argument(
+        "--index",
+        help=f"SQLite index of ingested results (default: <dir>/{INDEX_FILENAME})"
+    )
+    parser.add_argument(
+        "--no-index",
+        action="store_true",
+        help="Parse every result file instead of using the index"
+    )
+    parser.add_argument(
+        "--workers", "-j",
+        type=int,
+        help="Loader processes for new or changed files (default: CPU count)"
+    )
 
     args = parser.parse_args()
 
+    try:
+        if args.since:
+            args.since = parse_timestamp(args.since)
+        if args.until:
+            args.until = parse_timestamp(args.until, end_of_day=True)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.window:
+        try:
+            parse_window(args.window)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.rank_by:
+        if args.history or args.score or args.routing_table:
+            parser.error("--rank-by ranks the pooled comparison; it does not apply to --history or --score")
+        args.pooled = True
+    else:
+        args.rank_by = "p95_time"
+    if args.rolling < 1:
+        parser.error("--rolling must be at least 1")
+    if not 0 <= args.max_error_rate <= 1:
+        parser.error("--max-error-rate must be between 0 and 1")
+    if args.routing_table:
+        args.score = True
+    try:
+        weights = parse_weights(args.weights)
+        costs = load_costs(Path(args.costs)) if args.costs else None
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
     results_dir = Path(args.dir)
-    results = load_results(results_dir)
+    if args.watch is not None:
+        if args.watch <= 0:
+            parser.error("--watch interval must be positive")
+        if args.no_index:
+            parser.error("--watch ingests through the index; drop --no-index")
+        return watch(args, results_dir, weights, costs)
 
-    if not results:
+    since = window_start(args)
+    if args.no_index or not results_dir.exists():
+        results = filter_results(load_results(results_dir, args.workers), args.endpoint, since, args.until)
+        if args.history or args.pooled or args.score:
+            results = RunSamples(run_samples(results))
+    else:
+        index = ResultIndex(Path(args.index) if args.index else results_dir / INDEX_FILENAME)
+        try:
+            index.sync(results_dir, args.workers)
+            if args.history or args.pooled or args.score:
+                results = RunSamples(index.pooled_samples(args.endpoint, since, args.until))
+            else:
+                results = index.latest_runs(args.endpoint, since, args.until)
+        finally:
+            index.close()
+
+    if not (results.runs if isinstance(results, RunSamples) else results):
         print(f"No benchmark results found in: {results_dir}", file=sys.stderr)
         print("\nRun benchmarks first:", file=sys.stderr)
         print('  cc-switch <endpoint>', file=sys.stderr)
         print('  "测试当前端点性能"', file=sys.stderr)
         return 1
 
-    report = generate_comparison(results, args.format)
+    report = render_report(args, results, weights, costs, since)
 
     if args.output:
         Path(args.output).write_text(report)
@@ -213,5 +1436,96 @@ def main():
     return 0
 
 
+def window_start(args) -> Optional[str]:
+    """Effective lower timestamp bound from --since and --window"""
+    if not args.window:
+        return args.since
+    return max(args.since or '', parse_window(args.window))
+
+
+def render_report(args, results, weights: dict[str, float], costs: Optional[dict[str, float]],
+                  since: Optional[str]) -> str:
+    """The report for the selected mode; results are RunSamples for the sample-based modes"""
+    if args.history:
+        series = build_history(results, args.rolling, args.metric)
+        if args.export:
+            export_history(series, Path(args.export))
+            print(f"History exported to: {args.export}", file=sys.stderr)
+        return generate_history_report(series, args.format, args.rolling)
+    if args.score:
+        scored = score_endpoints(results.pooled(), weights, costs, args.max_error_rate)
+        if scored and not any(g['routing_weight'] for g in scored):
+            print(f"Warning: every endpoint is above --max-error-rate {args.max_error_rate:g}; "
+                  "the routing table is empty", file=sys.stderr)
+        if args.routing_table:
+            Path(args.routing_table).write_text(json.dumps(routing_table(scored, since), indent=2))
+            print(f"Routing table saved to: {args.routing_table}", file=sys.stderr)
+        return generate_score_report(scored, args.format, weights, since)
+    if args.pooled:
+        return generate_pooled_comparison(results.pooled(), args.format, args.rank_by, since)
+    return generate_comparison(results, args.format)
+
+
+def watch(args, results_dir: Path, weights: dict[str, float], costs: Optional[dict[str, float]]) -> int:
+    """Poll results_dir, fold new runs into the aggregates and re-render on change
+
+    Each pass ingests only new or changed files through the index. The
+    sample-based modes keep their RunSamples between passes: runs from new
+    files are added, runs from replaced or deleted files and runs that slid
+    out of --window are dropped, and only the touched groups are re-pooled.
+    """
+    # The index lives in the results directory by default, so create it
+    # up front; runs may land there only after watching starts
+    results_dir.mkdir(parents=True, exist_ok=True)
+    index = ResultIndex(Path(args.index) if args.index else results_dir / INDEX_FILENAME)
+    sample_based = args.history or args.pooled or args.score
+    samples = RunSamples()
+    first = True
+    try:
+        while True:
+            since = window_start(args)
+            if results_dir.exists():
+                index.sync(results_dir, args.workers)
+            if first:
+                if sample_based:
+                    samples.add(index.pooled_samples(args.endpoint, since, args.until))
+                changed = True
+            else:
+                changed = bool(index.added_runs or index.removed_runs)
+                if sample_based:
+                    samples.discard(index.removed_runs)
+                    if index.added_runs:
+                        samples.add(index.pooled_samples(args.endpoint, since, args.until, index.added_runs))
+            if sample_based and since and samples.expire(since):
+                changed = True
+
+            if changed:
+                results = samples if sample_based else index.latest_runs(args.endpoint, since, args.until)
+                if samples.runs if sample_based else results:
+                    report = render_report(args, results, weights, costs, since)
+                else:
+                    report = f"No benchmark results found in: {results_dir} (waiting for runs)"
+                stamp = datetime.now().strftime("%H:%M:%S")
+                note = "initial load" if first else (
+                    f"{len(index.added_runs)} new, {len(index.removed_runs)} dropped run(s)"
+                )
+                if args.output:
+                    Path(args.output).write_text(report)
+                    print(f"[{stamp}] {note}, report saved to: {args.output}")
+                else:
+                    if sys.stdout.isatty() and args.format == "table":
+                        print("\033[2J\033[H", end="")
+                    print(report)
+                    print(f"[{stamp}] {note}; watching {results_dir} every {args.watch:g}s (Ctrl+C to stop)",
+                          file=sys.stderr)
+                sys.stdout.flush()
+            first = False
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        index.close()
+
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,822 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark suite for the benchmark tools' own hot paths
+
+Times token counting, the SSE read loop, request preparation, percentile
+and report generation in benchmark.py, log parsing in parse-claude-logs.py
+and result loading in compare-results.py on synthetic inputs from small to
+very large. No network access is needed; the chunked stream case talks to
+mock-server.py over loopback.
+
+Timings are also stored relative to a fixed calibration workload timed
+around each case, so a run can be checked against a committed baseline
+recorded on another machine; cases that got slower by more than the
+threshold (and by more than a small absolute noise floor) on a second
+timing are flagged as regressions (exit code 1).
+
+Usage:
+    python microbench.py                          # Default sizes, check baseline
+    python microbench.py --sizes small,medium,large,xlarge -o results.json
+    python microbench.py --case stream-loop --legacy  # Compare with replaced code
+    python microbench.py --update-baseline        # Record a new baseline
+    python microbench.py --log-throughput 2G      # Lines/s on a multi-GB debug log
+"""
+
+import argparse
+import gc
+import importlib.util
+import json
+import platform
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+import benchmark  # noqa: E402
+
+DEFAULT_BASELINE = SCRIPT_DIR / "microbench-baseline.json"
+SIZE_NAMES = ['small', 'medium', 'large', 'xlarge']
+TARGET_TIME = 0.1  # Seconds of calls per timing repeat
+# Slowdowns smaller than this are timer and scheduler noise, whatever the ratio
+NOISE_FLOOR = 5e-6
+BASELINE_RUNS = 3  # Suite runs a new baseline takes the per-case median of
+
+
+def load_script(filename: str):
+    """Import a sibling script whose file name is not a module name"""
+    spec = importlib.util.spec_from_file_location(filename[:-3].replace('-', '_'), SCRIPT_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so functions can be pickled for process pools
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+parse_logs = load_script('parse-claude-logs.py')
+compare_results = load_script('compare-results.py')
+mock_server = load_script('mock-server.py')
+
+
+@dataclass
+class Case:
+    """One benchmarked function over inputs of increasing size"""
+    name: str
+    description: str
+    sizes: dict[str, int]  # size name -> input size (tokens, samples, lines, ...)
+    setup: Callable[[int, Path], tuple]  # (size, scratch dir) -> (func, args)
+    legacy: Optional[Callable[[int, Path], tuple]] = None  # Replaced implementation
+
+
+# Synthetic inputs
+
+def build_events(tokens: int) -> list[bytes]:
+    """An OpenAI-style stream of single-word deltas ending in [DONE]"""
+    events = [
+        f"data: {json.dumps({'choices': [{'index': 0, 'delta': {'content': f'word{i} '}}]})}\n\n".encode('utf-8')
+        for i in range(tokens)
+    ]
+    events.append(b"data: [DONE]\n\n")
+    return events
+
+
+def build_anthropic_stream(tokens: int) -> bytes:
+    events = [{'type': 'message_start', 'message': {'usage': {'input_tokens': 10}}}]
+    events += [
+        {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': f'word{i} '}}
+        for i in range(tokens)
+    ]
+    events += [{'type': 'message_delta', 'usage': {'output_tokens': tokens}}, {'type': 'message_stop'}]
+    return ''.join(f"event: {e['type']}\ndata: {json.dumps(e)}\n\n" for e in events).encode()
+
+
+def build_results(count: int) -> list:
+    rng = random.Random(count)
+    results = []
+    for i in range(count):
+        response_time = rng.uniform(0.5, 5.0)
+        ttft = rng.uniform(0.1, 0.5)
+        tokens = rng.randint(50, 500)
+        results.append(benchmark.RequestResult(
+            iteration=i + 1,
+            success=rng.random() > 0.05,
+            response_time=response_time,
+            ttft=ttft,
+            tokens=tokens,
+            tps=tokens / response_time,
+            tpot=(response_time - ttft) / tokens,
+        ))
+    return results
+
+
+def build_log_lines(requests: int) -> list[str]:
+    """Request lifecycles alternating between JSON and plain-text log lines"""
+    lines = []
+    for i in range(requests):
+        ts = f"2026-03-02T{10 + i // 36000 % 10:02d}:{i // 600 % 60:02d}:{i // 10 % 60:02d}.{i % 10}00Z"
+        messages = [
+            f"API request sent request_id=req_{i}",
+            f"streaming first chunk request_id=req_{i}",
+            f"usage input_tokens=120 output_tokens=340 request_id=req_{i}",
+            f"response received request_id=req_{i}",
+        ]
+        for message in messages:
+            if i % 2:
+                lines.append(json.dumps({'timestamp': ts, 'level': 'debug', 'message': message}))
+            else:
+                lines.append(f"{ts} [DEBUG] {message}")
+    return lines
+
+
+def build_debug_log_block(requests: int, noise: int) -> str:
+    """Request lifecycles among noise lines, like a real debug log
+
+    {b} marks the block number and {hour} the date and hour, so blocks can
+    be written one hour apart.
+    """
+    noise_messages = [
+        "Loaded settings from /home/user/.claude/settings.json",
+        "Tool use: Bash(git status --short)",
+        "Hook PreToolUse completed in 3ms",
+        "Rendering 42 messages, 1830 lines",
+        "Permission check for Read(/home/user/project/src/main.py): allowed",
+        "MCP server filesystem: connected",
+        "Checking for updates",
+        "Compacting conversation context",
+    ]
+    lines = []
+    for i in range(requests):
+        ts = f"{{hour}}:{i // 60 % 60:02d}:{i % 60:02d}.{i % 10}00Z"
+        messages = [
+            f"API request sent request_id=req_{{b}}_{i}",
+            f"streaming first chunk request_id=req_{{b}}_{i}",
+            f"model=claude-sonnet-4-5 request_id=req_{{b}}_{i}",
+            f"usage input_tokens=120 output_tokens=340 request_id=req_{{b}}_{i}",
+            f"response received request_id=req_{{b}}_{i}",
+        ]
+        messages += [noise_messages[(i + j) % len(noise_messages)] for j in range(noise)]
+        for j, message in enumerate(messages):
+            if (i + j) % 2:
+                lines.append(json.dumps({'timestamp': ts, 'level': 'debug', 'message': message}))
+            else:
+                lines.append(f"{ts} [DEBUG] {message}")
+    return '\n'.join(lines) + '\n'
+
+
+def write_debug_log(path: Path, size: int) -> Path:
+    """Synthetic time-ordered debug log of at least size bytes, written block by block"""
+    block = build_debug_log_block(1000, 40)
+    start = datetime(2026, 3, 2)
+    written = b = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < size:
+            hour = (start + timedelta(hours=b)).strftime('%Y-%m-%dT%H')
+            written += f.write(block.replace('{b}', str(b)).replace('{hour}', hour))
+            b += 1
+    return path
+
+
+def write_result_files(count: int, directory: Path) -> Path:
+    """Subagent-format result files spread over a handful of endpoints"""
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(count)
+    for i in range(count):
+        times = [rng.uniform(0.5, 3.0) for _ in range(5)]
+        data = {
+            'timestamp': f"2026-03-05T10:{i // 60 % 60:02d}:{i % 60:02d}",
+            'endpoint': f"https://endpoint-{i % 7}.example.com",
+            'task': 'implementation',
+            'iterations': len(times),
+            'avg_time': sum(times) / len(times),
+            'min_time': min(times),
+            'max_time': max(times),
+            'avg_tps': rng.uniform(20, 80),
+            'total_tokens': 1200,
+            'details': [
+                {'iteration': n + 1, 'response_time': t, 'tokens': 240, 'output': 'x' * 2000}
+                for n, t in enumerate(times)
+            ],
+        }
+        (directory / f"result-{i:05d}.json").write_text(json.dumps(data), encoding='utf-8')
+    return directory
+
+
+# Implementations under test, plus the ones they replaced
+
+class EventStream(benchmark.ChunkReader):
+    """Replays an SSE body one event per read, like a streaming socket"""
+
+    def __init__(self, events: list[bytes]):
+        self.events = iter(events)
+
+    def read(self, size: int) -> bytes:
+        return next(self.events, b'')
+
+
+# Chunked mock servers by tokens per response, started on first use and
+# kept for the rest of the run so re-timings and baseline runs reuse them
+MOCK_SERVERS: dict[int, object] = {}
+
+
+def chunked_mock_config(tokens: int) -> benchmark.APIConfig:
+    """Config for a loopback mock-server.py --chunked streaming tokens per response"""
+    server = MOCK_SERVERS.get(tokens)
+    if server is None:
+        options = argparse.Namespace(provider='anthropic', ttft=0, itl=0, jitter=0, tokens=tokens,
+                                     chunked=True, verbose=False)
+        server = mock_server.ThreadingHTTPServer(('127.0.0.1', 0), mock_server.make_http1_handler(options))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        MOCK_SERVERS[tokens] = server
+    return benchmark.build_api_config('anthropic', 'test', f"http://127.0.0.1:{server.server_address[1]}")
+
+
+def chunked_read_loop(config: benchmark.APIConfig, request: benchmark.PreparedRequest) -> bytes:
+    """One request through HTTPStream's chunk decoder and StreamReader"""
+    stream = benchmark.HTTPStream(config, request)
+    try:
+        reader = benchmark.StreamReader(time.time())
+        reader.read(stream)
+    finally:
+        stream.close()
+    return reader.body
+
+
+def current_read_loop(events: list[bytes]) -> str:
+    reader = benchmark.StreamReader(time.time())
+    reader.read(EventStream(events))
+    return reader.text
+
+
+def legacy_read_loop(events: list[bytes]) -> str:
+    """read() + per-chunk decode + str concatenation, as before"""
+    response = EventStream(events)
+    response_text = ""
+    while True:
+        chunk = response.read(1024)
+        if not chunk:
+            break
+        text = chunk.decode('utf-8', errors='ignore')
+        response_text += text
+        if '[DONE]' in response_text or '</s>' in response_text:
+            break
+    return response_text
+
+
+def current_prepare(config: benchmark.APIConfig, prompt: str) -> tuple:
+    """First send of a prompt: a cache hit is a dict lookup, too fast to time"""
+    config._target = None
+    config._prepared.clear()
+    return benchmark.request_target(config), benchmark.prepare_request(config, prompt)
+
+
+def legacy_prepare(config: benchmark.APIConfig, prompt: str) -> tuple:
+    """Per-request preparation as done before requests were cached"""
+    parsed = urlparse(config.endpoint)
+    payload = benchmark.build_payload(config, prompt)
+    body = json.dumps(payload).encode('utf-8')
+    headers = dict(config.headers)
+    headers['Content-Length'] = str(len(body))
+    return parsed, body, headers
+
+
+def parse_lines(lines: list[str]):
+    for line in lines:
+        parse_logs.parse_log_line(line)
+
+
+def legacy_parse_log_line(line: str) -> Optional[dict]:
+    """json.loads on every line, then uncompiled regexes, as before"""
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        pass
+    patterns = [
+        r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z?)\s+\[(\w+)\]\s+(.*)$',
+        r'^(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})\s+\[(\w+)\]\s+(.*)$',
+    ]
+    for pattern in patterns:
+        match = re.match(pattern, line.strip())
+        if match:
+            timestamp_str, level, message = match.groups()
+            try:
+                timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+                return {'timestamp': timestamp.isoformat(), 'level': level, 'message': message}
+            except ValueError:
+                continue
+    return None
+
+
+def legacy_parse_lines(lines: list[str]):
+    for line in lines:
+        legacy_parse_log_line(line)
+
+
+def full_scan_extract(log_files: list[Path], session_start: datetime) -> dict:
+    """Every line parsed, older ones dropped, as before seeking to the session start"""
+    bounds = parse_logs.session_bounds(session_start)
+    requests = {}
+    for log_file in log_files:
+        with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
+            parse_logs.apply_events(requests, filter(None, (parse_logs.parse_event(line, bounds) for line in f)))
+    return requests
+
+
+def legacy_search(patterns: list[str], message: str) -> Optional[str]:
+    for pattern in patterns:
+        match = re.search(pattern, message, re.IGNORECASE)
+        if match:
+            return match.group(1)
+    return None
+
+
+LEGACY_ID_PATTERNS = [
+    r'request[_-]?id["\']?\s*[:=]\s*["\']?([a-zA-Z0-9_-]+)',
+    r'["\']?id["\']?\s*[:=]\s*["\']?([a-zA-Z0-9_-]+)',
+]
+
+
+def legacy_extract_requests(log_files: list[Path]) -> dict:
+    """Per-line parse, repeated lower() and uncompiled regexes, as before"""
+    requests = {}
+    for log_file in log_files:
+        with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                entry = legacy_parse_log_line(line)
+                if not entry or not entry.get('timestamp'):
+                    continue
+                try:
+                    timestamp = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
+                except ValueError:
+                    continue
+                message = entry.get('message', '')
+                if 'API request' in message or 'sending request' in message.lower():
+                    req_id = legacy_search(LEGACY_ID_PATTERNS, message) or f"req_{timestamp.isoformat()}"
+                    if req_id not in requests:
+                        requests[req_id] = parse_logs.RequestMetrics(request_id=req_id, start_time=timestamp)
+                elif 'streaming' in message.lower() or 'first chunk' in message.lower():
+                    req_id = legacy_search(LEGACY_ID_PATTERNS, message)
+                    if req_id and req_id in requests:
+                        requests[req_id].first_token_time = timestamp
+                elif 'response received' in message.lower() or 'request complete' in message.lower():
+                    req_id = legacy_search(LEGACY_ID_PATTERNS, message)
+                    if req_id and req_id in requests:
+                        requests[req_id].end_time = timestamp
+                elif 'usage' in message.lower() or 'tokens' in message.lower():
+                    req_id = legacy_search(LEGACY_ID_PATTERNS, message)
+                    if req_id and req_id in requests:
+                        tokens = {}
+                        found = legacy_search([r'input[_-]?tokens?[\s"\']*[:=]\s*(\d+)'], message)
+                        if found:
+                            tokens['input'] = int(found)
+                        found = legacy_search([r'output[_-]?tokens?[\s"\']*[:=]\s*(\d+)'], message)
+                        if found:
+                            tokens['output'] = int(found)
+                        if tokens:
+                            requests[req_id].input_tokens = tokens.get('input', 0)
+                            requests[req_id].output_tokens = tokens.get('output', 0)
+                elif 'model' in message.lower():
+                    req_id = legacy_search(LEGACY_ID_PATTERNS, message)
+                    if req_id and req_id in requests:
+                        model = legacy_search([r'model["\']?\s*[:=]\s*["\']?([a-zA-Z0-9_.-]+)'], message)
+                        if model:
+                            requests[req_id].model = model
+    return requests
+
+
+# Case setups: each returns the function to time and its arguments
+
+def setup_count_tokens(size: int, scratch: Path) -> tuple:
+    return benchmark.count_tokens, (build_anthropic_stream(size), 'Anthropic')
+
+
+def setup_stream_loop(size: int, scratch: Path) -> tuple:
+    return current_read_loop, (build_events(size),)
+
+
+def setup_legacy_stream_loop(size: int, scratch: Path) -> tuple:
+    return legacy_read_loop, (build_events(size),)
+
+
+def setup_stream_chunked(size: int, scratch: Path) -> tuple:
+    config = chunked_mock_config(size)
+    request = benchmark.prepare_request(config, 'prompt')
+    if chunked_read_loop(config, request) != b''.join(mock_server.build_events('anthropic', size)):
+        raise RuntimeError("chunk decoder garbled the mock server's chunked stream")
+    return chunked_read_loop, (config, request)
+
+
+def setup_request_prep(size: int, scratch: Path) -> tuple:
+    config = benchmark.build_api_config('anthropic', 'test', 'https://relay.example.com')
+    return current_prepare, (config, benchmark.synthesize_prompt(size))
+
+
+def setup_legacy_request_prep(size: int, scratch: Path) -> tuple:
+    config = benchmark.build_api_config('anthropic', 'test', 'https://relay.example.com')
+    return legacy_prepare, (config, benchmark.synthesize_prompt(size))
+
+
+def setup_percentile(size: int, scratch: Path) -> tuple:
+    rng = random.Random(size)
+    return benchmark.calculate_percentile, ([rng.uniform(0.1, 5.0) for _ in range(size)], 95)
+
+
+def setup_generate_report(size: int, scratch: Path) -> tuple:
+    config = benchmark.build_api_config('anthropic', 'test')
+    return benchmark.generate_report, (config, build_results(size), 'prompt', size)
+
+
+def setup_parse_log_line(size: int, scratch: Path) -> tuple:
+    return parse_lines, (build_log_lines(size // 4 + 1)[:size],)
+
+
+def setup_legacy_parse_log_line(size: int, scratch: Path) -> tuple:
+    return legacy_parse_lines, (build_log_lines(size // 4 + 1)[:size],)
+
+
+def setup_extract_requests(size: int, scratch: Path) -> tuple:
+    path = scratch / f"claude-{size}.log"
+    if not path.exists():
+        path.write_text('\n'.join(build_log_lines(size)) + '\n', encoding='utf-8')
+    return parse_logs.extract_requests, ([path],)
+
+
+def setup_legacy_extract_requests(size: int, scratch: Path) -> tuple:
+    _, args = setup_extract_requests(size, scratch)
+    return legacy_extract_requests, args
+
+
+def recent_start(path: Path, minutes: float) -> datetime:
+    """Timestamp minutes before the last line of a log"""
+    with open(path, 'rb') as f:
+        f.seek(max(0, path.stat().st_size - 4096))
+        last = f.read().splitlines()[-1]
+    return parse_logs.line_timestamp(last) - timedelta(minutes=minutes)
+
+
+def setup_extract_recent(size: int, scratch: Path) -> tuple:
+    _, (paths,) = setup_extract_requests(size, scratch)
+    # The last 1% of requests, at 10 per second
+    return parse_logs.extract_requests, (paths, recent_start(paths[0], size / 10 / 100 / 60))
+
+
+def setup_legacy_extract_recent(size: int, scratch: Path) -> tuple:
+    func, args = setup_extract_recent(size, scratch)
+    return full_scan_extract, args
+
+
+def store_rotation(lines: list[str], scratch: Path) -> dict:
+    """Store sync across a claude.log -> claude.log.1 rotation, checked against a full parse
+
+    A third of the lines is ingested, a third appended before the rename
+    and the rest written to a new claude.log; cuts fall inside requests.
+    """
+    directory = Path(tempfile.mkdtemp(dir=scratch))
+    try:
+        log = directory / "claude.log"
+        first, second = len(lines) // 3 | 1, 2 * len(lines) // 3 | 1
+        log.write_text('\n'.join(lines[:first]) + '\n', encoding='utf-8')
+        store = parse_logs.RequestStore(directory / "store.sqlite")
+        try:
+            store.sync(parse_logs.find_log_files(str(directory)))
+            with open(log, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines[first:second]) + '\n')
+            log.rename(directory / "claude.log.1")
+            log.write_text('\n'.join(lines[second:]) + '\n', encoding='utf-8')
+            store.sync(parse_logs.find_log_files(str(directory)))
+            stored = store.requests()
+        finally:
+            store.close()
+        expected = parse_logs.extract_requests([directory / "claude.log.1", log])
+        if {k: vars(r) for k, r in stored.items()} != {k: vars(r) for k, r in expected.items()}:
+            raise RuntimeError("store lost log lines across a log rotation")
+        return stored
+    finally:
+        shutil.rmtree(directory)
+
+
+def setup_store_rotation(size: int, scratch: Path) -> tuple:
+    return store_rotation, (build_log_lines(size), scratch)
+
+
+def setup_load_results(size: int, scratch: Path) -> tuple:
+    directory = scratch / f"results-{size}"
+    if not directory.exists():
+        write_result_files(size, directory)
+    return compare_results.load_results, (directory,)
+
+
+CASES = [
+    Case('count-tokens', "count_tokens on an Anthropic SSE body (tokens)",
+         {'small': 50, 'medium': 1000, 'large': 20000, 'xlarge': 200000}, setup_count_tokens),
+    Case('stream-loop', "StreamReader, one event per read (tokens)",
+         {'small': 50, 'medium': 1000, 'large': 20000, 'xlarge': 200000}, setup_stream_loop,
+         legacy=setup_legacy_stream_loop),
+    Case('stream-chunked', "HTTPStream + StreamReader on mock-server.py --chunked over loopback (tokens)",
+         {'small': 50, 'medium': 1000, 'large': 5000, 'xlarge': 20000}, setup_stream_chunked),
+    Case('request-prep', "Request target and serialized body, uncached (prompt tokens)",
+         {'small': 50, 'medium': 1000, 'large': 20000, 'xlarge': 200000}, setup_request_prep,
+         legacy=setup_legacy_request_prep),
+    Case('percentile', "calculate_percentile (samples)",
+         {'small': 100, 'medium': 10000, 'large': 1000000, 'xlarge': 5000000}, setup_percentile),
+    Case('generate-report', "generate_report (results)",
+         {'small': 10, 'medium': 1000, 'large': 100000, 'xlarge': 1000000}, setup_generate_report),
+    Case('parse-log-line', "parse_log_line over mixed JSON/text lines (lines)",
+         {'small': 100, 'medium': 10000, 'large': 100000, 'xlarge': 1000000}, setup_parse_log_line,
+         legacy=setup_legacy_parse_log_line),
+    Case('extract-requests', "extract_requests on one log file (requests)",
+         {'small': 25, 'medium': 2500, 'large': 25000, 'xlarge': 250000}, setup_extract_requests,
+         legacy=setup_legacy_extract_requests),
+    Case('extract-recent', "extract_requests for the last 1% of one log file (requests)",
+         {'small': 25, 'medium': 2500, 'large': 25000, 'xlarge': 250000}, setup_extract_recent,
+         legacy=setup_legacy_extract_recent),
+    Case('store-rotation', "--store sync across a log rotation, checked against a full parse (requests)",
+         {'small': 25, 'medium': 2500, 'large': 25000, 'xlarge': 250000}, setup_store_rotation),
+    Case('load-results', "load_results on a results directory (files)",
+         {'small': 5, 'medium': 100, 'large': 1000, 'xlarge': 10000}, setup_load_results),
+]
+
+
+# Timing and baselines
+
+def time_call(func, args: tuple, repeat: int) -> float:
+    """Best-of-repeat mean seconds per call, batching fast calls
+
+    The garbage collector is off while timing, as in timeit, so a
+    collection triggered by earlier allocations is not charged to the call.
+    """
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        func(*args)
+        first = time.perf_counter() - start
+        number = max(1, int(TARGET_TIME / first)) if first > 0 else 1000
+
+        best = first
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func(*args)
+            best = min(best, (time.perf_counter() - start) / number)
+        return best
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def calibration_workload():
+    """Fixed pure-Python work used to normalize timings across machines"""
+    data = [{'id': i, 'name': f"item-{i}", 'value': i * 0.5} for i in range(2000)]
+    decoded = json.loads(json.dumps(data))
+    sorted(decoded, key=lambda d: d['name'])
+    ' '.join(d['name'] for d in decoded).split()
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.2f}s"
+
+
+def run_suite(cases: list[Case], sizes: list[str], repeat: int, legacy: bool) -> dict:
+    # Calibrate between cases and normalize each case by the better of the
+    # calibrations on either side of it, so machine speed drifting during
+    # the run (CPU frequency, other load) is not charged to later cases
+    def calibrate() -> float:
+        return time_call(calibration_workload, (), 3)
+
+    calibration = calibrate()
+    results = {}
+
+    with tempfile.TemporaryDirectory(prefix="microbench-") as scratch:
+        for case in cases:
+            for size_name in sizes:
+                size = case.sizes[size_name]
+                func, args = case.setup(size, Path(scratch))
+                seconds = time_call(func, args, repeat)
+                entry = {'size': size, 'seconds': seconds}
+                line = f"  {case.name + '/' + size_name:26} {format_seconds(seconds):>10}"
+
+                if legacy and case.legacy:
+                    legacy_func, legacy_args = case.legacy(size, Path(scratch))
+                    entry['legacy_seconds'] = time_call(legacy_func, legacy_args, repeat)
+                    line += (f"   legacy {format_seconds(entry['legacy_seconds']):>10}"
+                             f" ({entry['legacy_seconds'] / seconds:.1f}x)")
+
+                after = calibrate()
+                entry['calibration'] = min(calibration, after)
+                entry['normalized'] = seconds / entry['calibration']
+                calibration = after
+
+                results[f"{case.name}/{size_name}"] = entry
+                print(line)
+
+    return {
+        'version': 1,
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'calibration': min(entry['calibration'] for entry in results.values()) if results else calibration,
+        'results': results,
+    }
+
+
+def parse_size(text: str) -> int:
+    """Byte count from e.g. '512M' or '2G'"""
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    text = text.strip().upper().rstrip('B')
+    if text[-1:] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def log_throughput(target: str, legacy: bool, workers: int = 1) -> dict:
+    """Lines/s and MB/s of extract_requests on one large debug log
+
+    target is an existing log file, or a size ('2G') for a synthetic log
+    written to a scratch directory first. With workers > 1 the serial pass
+    is timed too, for the speedup.
+    """
+    with tempfile.TemporaryDirectory(prefix="microbench-") as scratch:
+        path = Path(target)
+        if not path.is_file():
+            path = Path(scratch) / "claude-debug.log"
+            print(f"Writing {target} synthetic debug log...")
+            write_debug_log(path, parse_size(target))
+        size = path.stat().st_size
+        with open(path, 'rb') as f:
+            lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+        print(f"  {path.name}: {size / (1 << 20):.0f} MB, {lines} lines")
+
+        implementations = [('current', parse_logs.extract_requests)]
+        if workers != 1:
+            implementations.append((f"-j {workers}", lambda paths: parse_logs.extract_requests(paths, None, workers)))
+        if legacy:
+            implementations.append(('legacy', legacy_extract_requests))
+        results = {'file': str(target), 'bytes': size, 'lines': lines}
+        for name, extract in implementations:
+            start = time.perf_counter()
+            requests = extract([path])
+            seconds = time.perf_counter() - start
+            results[name] = {'seconds': seconds, 'requests': len(requests),
+                             'lines_per_second': lines / seconds,
+                             'mb_per_second': size / (1 << 20) / seconds}
+            print(f"  {name:8} {format_seconds(seconds):>10}  {lines / seconds:>12,.0f} lines/s"
+                  f"  {size / (1 << 20) / seconds:>7.1f} MB/s  ({len(requests)} requests)")
+
+        # A recent window, as --last-minutes asks for: seeks instead of parsing everything
+        session_start = recent_start(path, 5)
+        windows = [('last 5m', parse_logs.extract_requests)]
+        if legacy:
+            windows.append(('full scan', full_scan_extract))
+        for name, extract in windows:
+            start = time.perf_counter()
+            requests = extract([path], session_start)
+            seconds = time.perf_counter() - start
+            results[name] = {'seconds': seconds, 'requests': len(requests)}
+            print(f"  {name:8} {format_seconds(seconds):>10}  ({len(requests)} requests since {session_start})")
+        return results
+
+
+def median_run(runs: list[dict]) -> dict:
+    """The last run, with each case's timing replaced by its median run"""
+    merged = dict(runs[-1], results={})
+    for key in runs[-1]['results']:
+        entries = sorted((r['results'][key] for r in runs), key=lambda e: e['normalized'])
+        merged['results'][key] = entries[len(entries) // 2]
+    merged['calibration'] = min(e['calibration'] for e in merged['results'].values())
+    merged['baseline_runs'] = len(runs)
+    return merged
+
+
+def retime(run: dict, keys: list[str], repeat: int):
+    """Time the given cases again and keep each one's faster measurement"""
+    for key in keys:
+        name, size_name = key.split('/')
+        case = next(c for c in CASES if c.name == name)
+        entry = run_suite([case], [size_name], repeat, legacy=False)['results'][key]
+        if entry['normalized'] < run['results'][key]['normalized']:
+            run['results'][key].update(entry)
+
+
+def compare_to_baseline(run: dict, baseline: dict, threshold: float) -> list[dict]:
+    """Cases whose normalized time grew by more than threshold
+
+    The baseline time is scaled to this machine by the case's calibration;
+    a case is only flagged if it also got slower by more than NOISE_FLOOR
+    seconds.
+    """
+    regressions = []
+    for key, entry in run['results'].items():
+        before = baseline.get('results', {}).get(key)
+        if not before or before['normalized'] <= 0:
+            continue
+        ratio = entry['normalized'] / before['normalized']
+        entry['baseline_ratio'] = ratio
+        slowdown = entry['seconds'] - before['normalized'] * entry['calibration']
+        if ratio > 1 + threshold and slowdown > NOISE_FLOOR:
+            regressions.append({'case': key, 'ratio': ratio})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Microbenchmark suite for the benchmark tools' own hot paths",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python microbench.py                          # Check default sizes against the baseline
+  python microbench.py --sizes small,medium,large,xlarge -o results.json  # Very large inputs too
+  python microbench.py --case stream-loop --case request-prep --legacy  # Compare with replaced code
+  python microbench.py --update-baseline        # Record a new baseline after an intended change
+  python microbench.py --log-throughput 2G --legacy  # Lines/s on a 2 GB synthetic debug log
+  python microbench.py --log-throughput 2G -j 8  # Serial vs. 8 parse processes
+        """
+    )
+    parser.add_argument('--case', choices=[c.name for c in CASES], action='append',
+                        help='Case to run (repeatable; default: all)')
+    parser.add_argument('--sizes', default='small,medium,large',
+                        help=f"Comma-separated sizes from {','.join(SIZE_NAMES)} (default: small,medium,large)")
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repeats, best is kept (default: 5)')
+    parser.add_argument('--legacy', action='store_true', help='Also time the replaced implementation where kept')
+    parser.add_argument('--output', '-o', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE),
+                        help='Baseline JSON to check against (default: microbench-baseline.json)')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='Flag cases more than this fraction slower than baseline (default: 0.5; '
+                             'shared or throttled machines need a wide margin)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help=f'Write the per-case median of {BASELINE_RUNS} runs as the new baseline')
+    parser.add_argument('--log-throughput', metavar='SIZE|FILE',
+                        help='Only measure log parsing throughput on a synthetic log of SIZE (e.g. 2G) '
+                             'or an existing debug log')
+    parser.add_argument('--workers', '-j', type=int, default=1,
+                        help='Also time --log-throughput with this many parse processes (0 = CPU count)')
+
+    args = parser.parse_args()
+
+    sizes = [s.strip() for s in args.sizes.split(',') if s.strip()]
+    unknown = [s for s in sizes if s not in SIZE_NAMES]
+    if unknown:
+        print(f"Error: Unknown size(s): {', '.join(unknown)}", file=sys.stderr)
+        return 1
+    if args.log_throughput:
+        print("Log parsing throughput:")
+        run = log_throughput(args.log_throughput, args.legacy, args.workers)
+        if args.output:
+            Path(args.output).write_text(json.dumps(run, indent=2), encoding='utf-8')
+            print(f"Results saved to: {args.output}")
+        return 0
+
+    cases = [c for c in CASES if not args.case or c.name in args.case]
+
+    print(f"Running {len(cases)} case(s) at sizes {', '.join(sizes)}...")
+    run = run_suite(cases, sizes, args.repeat, args.legacy)
+
+    baseline_path = Path(args.baseline)
+    regressions = []
+    if args.update_baseline:
+        # One run can catch a burst of other load; a median of several cannot
+        runs = [run]
+        for i in range(2, BASELINE_RUNS + 1):
+            print(f"\nBaseline run {i} of {BASELINE_RUNS}...")
+            runs.append(run_suite(cases, sizes, args.repeat, args.legacy))
+        run = median_run(runs)
+        baseline_path.write_text(json.dumps(run, indent=2) + '\n', encoding='utf-8')
+        print(f"\nBaseline saved to: {baseline_path}")
+    elif baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+        regressions = compare_to_baseline(run, baseline, args.threshold)
+        if regressions:
+            # Confirm with a second timing, so a passing burst is not reported
+            print("\nRe-timing slow cases...")
+            retime(run, [r['case'] for r in regressions], args.repeat)
+            regressions = compare_to_baseline(run, baseline, args.threshold)
+        run['regressions'] = regressions
+        if regressions:
+            print(f"\nRegressions (> {args.threshold * 100:.0f}% slower than {baseline_path.name}, normalized):")
+            for r in regressions:
+                print(f"  {r['case']:26} {r['ratio']:.2f}x")
+        else:
+            print(f"\nNo regressions against {baseline_path.name}.")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(run, indent=2), encoding='utf-8')
+        print(f"Results saved to: {args.output}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
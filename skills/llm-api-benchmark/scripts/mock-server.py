@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Mock LLM streaming server for testing the benchmark tools locally
+
+Serves Anthropic- or OpenAI-style SSE streams with configurable time to
+first token and inter-token latency, over HTTP/1.1 or HTTP/2 cleartext
+(h2c, prior knowledge; requires the 'h2' package). Requests that define
+tools get a streamed call to the first tool instead of text. With
+--chunked, HTTP/1.1 bodies use chunked transfer coding with odd chunk
+sizes, chunk extensions and trailers, to exercise a client's decoder.
+
+Usage:
+    python mock-server.py                          # Anthropic SSE on :8080
+    python mock-server.py --provider openai --ttft 300 --itl 20
+    python mock-server.py --h2c --port 8443        # HTTP/2 cleartext
+    python mock-server.py --chunked                # Chunked transfer coding
+
+Then point benchmark.py at it:
+    ANTHROPIC_API_KEY=test ANTHROPIC_BASE_URL=http://127.0.0.1:8080 python benchmark.py
+    ANTHROPIC_API_KEY=test ANTHROPIC_BASE_URL=http://127.0.0.1:8443 python benchmark.py --http-version 2
+"""
+
+import argparse
+import itertools
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from typing import Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def request_tool(body: bytes) -> Optional[str]:
+    """Name of the first tool defined in a request body, if any"""
+    try:
+        tools = json.loads(body).get('tools') or []
+    except (ValueError, AttributeError):
+        return None
+    if not tools:
+        return None
+    return tools[0].get('name') or tools[0].get('function', {}).get('name')
+
+
+def build_tool_events(provider: str, tokens: int, tool: str) -> list[bytes]:
+    """Encode a response that streams one call to tool"""
+    arguments = json.dumps({'path': 'output.txt', 'content': ' '.join(f"token{i}" for i in range(tokens))})
+    # Roughly one argument token per fragment, like real streams
+    fragments = [arguments[i:i + 8] for i in range(0, len(arguments), 8)]
+
+    if provider == 'openai':
+        events = [{'choices': [{'index': 0, 'delta': {
+            'role': 'assistant', 'content': None,
+            'tool_calls': [{'index': 0, 'id': 'call_0', 'type': 'function',
+                            'function': {'name': tool, 'arguments': ''}}],
+        }, 'finish_reason': None}]}]
+        events += [
+            {'choices': [{'index': 0, 'delta': {'tool_calls': [{'index': 0, 'function': {'arguments': f}}]},
+                          'finish_reason': None}]}
+            for f in fragments
+        ]
+        events.append({'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'tool_calls'}]})
+        encoded = [f"data: {json.dumps(e)}\n\n".encode('utf-8') for e in events]
+        encoded.append(b"data: [DONE]\n\n")
+        return encoded
+
+    events = [
+        ('message_start', {
+            'type': 'message_start',
+            'message': {'role': 'assistant', 'usage': {'input_tokens': 10, 'output_tokens': 1}},
+        }),
+        ('content_block_start', {
+            'type': 'content_block_start', 'index': 0,
+            'content_block': {'type': 'tool_use', 'id': 'toolu_0', 'name': tool, 'input': {}},
+        }),
+        ('content_block_delta', {
+            'type': 'content_block_delta', 'index': 0,
+            'delta': {'type': 'input_json_delta', 'partial_json': ''},
+        }),
+    ]
+    events += [
+        ('content_block_delta', {
+            'type': 'content_block_delta', 'index': 0,
+            'delta': {'type': 'input_json_delta', 'partial_json': f},
+        })
+        for f in fragments
+    ]
+    events += [
+        ('content_block_stop', {'type': 'content_block_stop', 'index': 0}),
+        ('message_delta', {
+            'type': 'message_delta',
+            'delta': {'stop_reason': 'tool_use'},
+            'usage': {'output_tokens': len(fragments)},
+        }),
+        ('message_stop', {'type': 'message_stop'}),
+    ]
+    return [f"event: {name}\ndata: {json.dumps(data)}\n\n".encode('utf-8') for name, data in events]
+
+
+def build_events(provider: str, tokens: int) -> list[bytes]:
+    """Encode one complete response as a list of SSE events"""
+    words = [f"token{i} " for i in range(tokens)]
+
+    if provider == 'openai':
+        events = [
+            {'choices': [{'index': 0, 'delta': {'content': word}, 'finish_reason': None}]}
+            for word in words
+        ]
+        events.append({'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})
+        encoded = [f"data: {json.dumps(e)}\n\n".encode('utf-8') for e in events]
+        encoded.append(b"data: [DONE]\n\n")
+        return encoded
+
+    events = [('message_start', {
+        'type': 'message_start',
+        'message': {'role': 'assistant', 'usage': {'input_tokens': 10, 'output_tokens': 1}},
+    })]
+    events += [
+        ('content_block_delta', {
+            'type': 'content_block_delta', 'index': 0,
+            'delta': {'type': 'text_delta', 'text': word},
+        })
+        for word in words
+    ]
+    events += [
+        ('message_delta', {
+            'type': 'message_delta',
+            'delta': {'stop_reason': 'end_turn'},
+            'usage': {'output_tokens': tokens},
+        }),
+        ('message_stop', {'type': 'message_stop'}),
+    ]
+    return [f"event: {name}\ndata: {json.dumps(data)}\n\n".encode('utf-8') for name, data in events]
+
+
+# Chunk sizes cycled through by --chunked; odd sizes split events, and
+# often the CRLFs between them, at arbitrary points across chunks
+CHUNK_SIZES = (1, 7, 61, 3, 509, 13, 1021)
+
+# Last chunk, with an extension, then trailer fields and the blank line
+LAST_CHUNK = b'0;mock-ext="last"\r\nX-Mock-Trailer: done\r\nX-Mock-Server: mock-server.py\r\n\r\n'
+
+
+def chunk_frames(data: bytes, sizes: itertools.cycle) -> bytes:
+    """data in chunked transfer coding, some chunks with extensions or upper-case hex"""
+    frames = []
+    while data:
+        size = next(sizes)
+        chunk, data = data[:size], data[size:]
+        extension = b';mock-ext=%d' % size if len(frames) % 2 else b''
+        digits = (b'%X' if size % 4 == 1 else b'%x') % len(chunk)
+        frames.append(digits + extension + b'\r\n' + chunk + b'\r\n')
+    return b''.join(frames)
+
+
+def response_schedule(args, body: bytes = b'') -> list[tuple[float, bytes]]:
+    """(delay before sending, event bytes) pairs for one response"""
+    tool = request_tool(body)
+    if tool:
+        events = build_tool_events(args.provider, args.tokens, tool)
+    else:
+        events = build_events(args.provider, args.tokens)
+    ttft = args.ttft / 1000 * random.uniform(1 - args.jitter, 1 + args.jitter)
+    itl = args.itl / 1000
+    return [(ttft if i == 0 else itl, event) for i, event in enumerate(events)]
+
+
+def make_http1_handler(args):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *log_args):
+            if args.verbose:
+                super().log_message(format, *log_args)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length)
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            if args.chunked:
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.send_header('Trailer', 'X-Mock-Trailer, X-Mock-Server')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.flush()
+
+            sizes = itertools.cycle(CHUNK_SIZES)
+            try:
+                for delay, event in response_schedule(args, body):
+                    time.sleep(delay)
+                    self.wfile.write(chunk_frames(event, sizes) if args.chunked else event)
+                    self.wfile.flush()
+                if args.chunked:
+                    self.wfile.write(LAST_CHUNK)
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client cancelled the stream
+
+    return Handler
+
+
+def serve_h2c_connection(sock: socket.socket, args):
+    """Serve one prior-knowledge HTTP/2 cleartext connection"""
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.exceptions
+
+    conn = h2.connection.H2Connection(
+        config=h2.config.H2Configuration(client_side=False, header_encoding='utf-8')
+    )
+    lock = threading.Lock()
+    window_open = threading.Condition(lock)
+    cancelled: set[int] = set()
+    bodies: dict[int, bytearray] = {}
+
+    def flush():
+        sock.sendall(conn.data_to_send())
+
+    def respond(stream_id: int):
+        try:
+            with lock:
+                conn.send_headers(stream_id, [(':status', '200'), ('content-type', 'text/event-stream')])
+                flush()
+            for delay, event in response_schedule(args, bytes(bodies.pop(stream_id, b''))):
+                time.sleep(delay)
+                with lock:
+                    if stream_id in cancelled:
+                        return
+                    while conn.local_flow_control_window(stream_id) < len(event):
+                        window_open.wait(1.0)
+                    conn.send_data(stream_id, event)
+                    flush()
+            with lock:
+                conn.end_stream(stream_id)
+                flush()
+        except (h2.exceptions.StreamClosedError, OSError):
+            pass
+
+    with lock:
+        conn.initiate_connection()
+        flush()
+
+    try:
+        while data := sock.recv(65536):
+            with lock:
+                for event in conn.receive_data(data):
+                    if isinstance(event, h2.events.DataReceived):
+                        bodies.setdefault(event.stream_id, bytearray()).extend(event.data)
+                        conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded):
+                        threading.Thread(target=respond, args=(event.stream_id,), daemon=True).start()
+                    elif isinstance(event, h2.events.StreamReset):
+                        cancelled.add(event.stream_id)
+                    elif isinstance(event, h2.events.WindowUpdated):
+                        window_open.notify_all()
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        return
+                flush()
+    except OSError:
+        pass
+    finally:
+        sock.close()
+
+
+def serve_h2c(args):
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print("Error: --h2c requires the 'h2' package (pip install h2)", file=sys.stderr)
+        return 1
+
+    server = socket.create_server((args.host, args.port), reuse_port=False)
+    print(f"Mock {args.provider} server (h2c) on http://{args.host}:{args.port}")
+    while True:
+        client, _ = server.accept()
+        threading.Thread(target=serve_h2c_connection, args=(client, args), daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mock LLM streaming server for local benchmark testing"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", "-p", type=int, default=8080, help="Port (default: 8080)")
+    parser.add_argument(
+        "--provider",
+        choices=["anthropic", "openai"],
+        default="anthropic",
+        help="Stream format to emit (default: anthropic)"
+    )
+    parser.add_argument("--ttft", type=float, default=200, help="Time to first token in ms (default: 200)")
+    parser.add_argument("--itl", type=float, default=10, help="Inter-token latency in ms (default: 10)")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Relative TTFT jitter (default: 0.5)")
+    parser.add_argument("--tokens", type=int, default=50, help="Tokens per response (default: 50)")
+    parser.add_argument("--h2c", action="store_true", help="Serve HTTP/2 cleartext instead of HTTP/1.1")
+    parser.add_argument(
+        "--chunked",
+        action="store_true",
+        help="HTTP/1.1 only: chunked bodies with odd chunk sizes, extensions and trailers"
+    )
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log every request")
+
+    args = parser.parse_args()
+    if args.chunked and args.h2c:
+        parser.error("--chunked applies to HTTP/1.1; HTTP/2 has no transfer coding")
+
+    try:
+        if args.h2c:
+            return serve_h2c(args)
+
+        server = ThreadingHTTPServer((args.host, args.port), make_http1_handler(args))
+        print(f"Mock {args.provider} server on http://{args.host}:{args.port}")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
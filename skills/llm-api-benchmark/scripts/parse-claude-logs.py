@@ -12,13 +12,22 @@ Usage:
     python parse-claude-logs.py --session-start 2026-03-02T10:00:00
     python parse-claude-logs.py --last-minutes 5
     python parse-claude-logs.py --file ~/.claude/logs/claude-2026-03-02.log
+    python parse-claude-logs.py --log-dir /shared/logs --workers 8
+    python parse-claude-logs.py --store --ingest-only   # From cron: parse only new lines
+    python parse-claude-logs.py --store --last-minutes 60
 """
 
 import argparse
+import hashlib
+import io
 import json
 import glob
+import mmap
+import os
 import re
+import sqlite3
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
@@ -72,9 +81,10 @@ def find_log_files(log_dir: str = "~/.claude/logs", since: Optional[datetime] =
         "*.log"
     ]
 
-    files = []
+    # A set: claude-*.log files match both patterns
+    files = set()
     for pattern in patterns:
-        files.extend(log_path.glob(pattern))
+        files.update(log_path.glob(pattern))
 
     # Filter by time if specified
     if since:
@@ -86,106 +96,420 @@ def find_log_files(log_dir: str = "~/.claude/logs", since: Optional[datetime] =
     return sorted(files, key=lambda f: f.stat().st_mtime, reverse=True)
 
 
+# Plain-text log lines, e.g. "2026-03-02T10:30:00.123Z [DEBUG] Message"
+# or "2026-03-02 10:30:00 [DEBUG] Message"
+TEXT_LINE_PATTERN = re.compile(
+    r'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z?|\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})'
+    r'\s+\[(\w+)\]\s+(.*)'
+)
+
+# Tried in order; the first that matches wins
+REQUEST_ID_PATTERNS = (
+    re.compile(r'request[_-]?id["\']?\s*[:=]\s*["\']?([a-zA-Z0-9_-]+)', re.IGNORECASE),
+    re.compile(r'["\']?id["\']?\s*[:=]\s*["\']?([a-zA-Z0-9_-]+)', re.IGNORECASE),
+)
+INPUT_TOKENS_PATTERN = re.compile(r'input[_-]?tokens?[\s"\']*[:=]\s*(\d+)', re.IGNORECASE)
+OUTPUT_TOKENS_PATTERN = re.compile(r'output[_-]?tokens?[\s"\']*[:=]\s*(\d+)', re.IGNORECASE)
+MODEL_PATTERN = re.compile(r'model["\']?\s*[:=]\s*["\']?([a-zA-Z0-9_.-]+)', re.IGNORECASE)
+
+# Request lifecycle events, in keyword dispatch order
+REQUEST_START = 'start'
+FIRST_TOKEN = 'first_token'
+REQUEST_END = 'end'
+TOKEN_USAGE = 'usage'
+MODEL_INFO = 'model'
+
+EVENT_KEYWORDS = (
+    (FIRST_TOKEN, ('streaming', 'first chunk')),
+    (REQUEST_END, ('response received', 'request complete')),
+    (TOKEN_USAGE, ('usage', 'tokens')),
+    (MODEL_INFO, ('model',)),
+)
+
+
 def parse_log_line(line: str) -> Optional[dict]:
     """Parse a single log line"""
+    line = line.strip()
+    # Only lines starting with '{' can be JSON entries; everything else is text
+    if line[:1] == '{':
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+        return entry if isinstance(entry, dict) else None
+
+    match = TEXT_LINE_PATTERN.match(line)
+    if not match:
+        return None
+    timestamp_str, level, message = match.groups()
     try:
-        # Try JSON format first
-        return json.loads(line)
-    except json.JSONDecodeError:
-        pass
+        timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return {
+        'timestamp': timestamp.isoformat(),
+        'level': level,
+        'message': message
+    }
 
-    # Try to parse common log formats
-    # Example: 2026-03-02T10:30:00.123Z [DEBUG] Message
-    patterns = [
-        r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z?)\s+\[(\w+)\]\s+(.*)$',
-        r'^(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})\s+\[(\w+)\]\s+(.*)$',
-    ]
 
-    for pattern in patterns:
-        match = re.match(pattern, line.strip())
-        if match:
-            timestamp_str, level, message = match.groups()
-            try:
-                # Parse timestamp
-                timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                return {
-                    'timestamp': timestamp.isoformat(),
-                    'level': level,
-                    'message': message
-                }
-            except ValueError:
+def split_log_line(line: str) -> Optional[tuple]:
+    """(timestamp string, message) of a JSON or text log line, without building an entry"""
+    line = line.strip()
+    if line[:1] == '{':
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+        return (entry.get('timestamp'), entry.get('message', '')) if isinstance(entry, dict) else None
+
+    match = TEXT_LINE_PATTERN.match(line)
+    return (match.group(1), match.group(3)) if match else None
+
+
+def may_be_event(line: str) -> bool:
+    """Cheap pre-check: False only if no event keyword occurs anywhere in the line"""
+    lower = line.lower()
+    return (
+        'request' in lower or 'streaming' in lower or 'first chunk' in lower
+        or 'response received' in lower or 'usage' in lower or 'tokens' in lower or 'model' in lower
+    )
+
+
+def classify_message(message: str) -> Optional[str]:
+    """Event kind of a log message, by the first matching keyword group"""
+    if 'API request' in message:
+        return REQUEST_START
+    lower = message.lower()
+    if 'sending request' in lower:
+        return REQUEST_START
+    for kind, keywords in EVENT_KEYWORDS:
+        for keyword in keywords:
+            if keyword in lower:
+                return kind
+    return None
+
+
+def session_bounds(session_start: Optional[datetime]) -> tuple[Optional[datetime], Optional[datetime]]:
+    """session_start as (naive local, timezone-aware), to compare either kind of log timestamp"""
+    if session_start is None:
+        return None, None
+    if session_start.tzinfo is None:
+        return session_start, session_start.astimezone()
+    return session_start.astimezone().replace(tzinfo=None), session_start
+
+
+def parse_event(line: str, bounds: tuple = (None, None)) -> Optional[tuple]:
+    """(kind, timestamp, request ID, value) for a line that is a request event, else None
+
+    One pass per line: a keyword pre-check on the raw line, a first-byte
+    JSON/text decision, then keyword dispatch on the message. Lines before
+    the session start (bounds from session_bounds) are dropped.
+    """
+    if not may_be_event(line):
+        return None
+    split = split_log_line(line)
+    if not split:
+        return None
+    timestamp_str, message = split
+    if not isinstance(timestamp_str, str) or not isinstance(message, str):
+        return None
+    kind = classify_message(message)
+    if kind is None:
+        return None
+
+    try:
+        timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    start = bounds[0] if timestamp.tzinfo is None else bounds[1]
+    if start and timestamp < start:
+        return None
+
+    req_id = extract_request_id(message)
+    if kind == REQUEST_START:
+        return kind, timestamp, req_id or f"req_{timestamp.isoformat()}", None
+    if not req_id:
+        return None
+    if kind == TOKEN_USAGE:
+        tokens = extract_tokens(message)
+        return (kind, timestamp, req_id, tokens) if tokens else None
+    if kind == MODEL_INFO:
+        model = extract_model(message)
+        return (kind, timestamp, req_id, model) if model else None
+    return kind, timestamp, req_id, None
+
+
+def apply_events(requests: dict[str, RequestMetrics], events) -> dict[str, RequestMetrics]:
+    """Fold request events, in log order, into requests"""
+    for kind, timestamp, req_id, value in events:
+        if kind == REQUEST_START:
+            if req_id not in requests:
+                requests[req_id] = RequestMetrics(request_id=req_id, start_time=timestamp)
+            continue
+        request = requests.get(req_id)
+        if request is None:
+            continue
+        if kind == FIRST_TOKEN:
+            request.first_token_time = timestamp
+        elif kind == REQUEST_END:
+            request.end_time = timestamp
+        elif kind == TOKEN_USAGE:
+            request.input_tokens = value.get('input', 0)
+            request.output_tokens = value.get('output', 0)
+        elif kind == MODEL_INFO:
+            request.model = value
+    return requests
+
+
+def fold_events(events) -> dict[str, list]:
+    """Per-request partial state of a run of events, for merge_partials
+
+    Maps request ID to [first start time or None, fields set before that
+    start, fields set after it]; later values overwrite earlier ones. Entries
+    are ordered by first start, so requests are created in log order.
+    """
+    partials: dict[str, list] = {}
+    for kind, timestamp, req_id, value in events:
+        partial = partials.get(req_id)
+        if partial is None:
+            partial = partials[req_id] = [None, {}, {}]
+        if kind == REQUEST_START:
+            if partial[0] is None:
+                partial[0] = timestamp
+                partials[req_id] = partials.pop(req_id)
+            continue
+        fields = partial[1] if partial[0] is None else partial[2]
+        if kind == FIRST_TOKEN:
+            fields['first_token_time'] = timestamp
+        elif kind == REQUEST_END:
+            fields['end_time'] = timestamp
+        elif kind == TOKEN_USAGE:
+            fields['input_tokens'] = value.get('input', 0)
+            fields['output_tokens'] = value.get('output', 0)
+        elif kind == MODEL_INFO:
+            fields['model'] = value
+    return partials
+
+
+def merge_partials(requests: dict[str, RequestMetrics], partials: dict[str, list]) -> dict[str, RequestMetrics]:
+    """Merge fold_events output for the next part of the log into requests, as apply_events would"""
+    for req_id, (start, before, after) in partials.items():
+        request = requests.get(req_id)
+        if request is None:
+            # Events before the first start refer to a request not seen yet
+            if start is None:
                 continue
+            request = requests[req_id] = RequestMetrics(request_id=req_id, start_time=start)
+        else:
+            for name, value in before.items():
+                setattr(request, name, value)
+        for name, value in after.items():
+            setattr(request, name, value)
+    return requests
+
+
+# Byte range per worker task: large enough to amortize the round trip,
+# small enough that every worker gets several
+RANGE_MIN_BYTES = 1 << 20
+RANGE_MAX_BYTES = 64 << 20
+# Below this much log data a process pool costs more than it saves
+POOL_MIN_BYTES = 8 << 20
+
+
+def range_size(total: int, workers: int) -> int:
+    """Bytes per range for total bytes of log split across workers"""
+    return min(RANGE_MAX_BYTES, max(RANGE_MIN_BYTES, total // (workers * 4) + 1))
+
+
+def split_range(mm: mmap.mmap, start: int, end: int, range_bytes: int) -> list[tuple[int, int]]:
+    """Newline-aligned (start, end) byte ranges covering start..end of a mapped file"""
+    ranges = []
+    while start < end:
+        newline = mm.find(b'\n', start + range_bytes, end) if start + range_bytes < end else -1
+        stop = newline + 1 if newline >= 0 else end
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
 
+# Seeking to --session-start: probes spread over a file must be in time order
+# (give or take SEEK_SLACK, for concurrent writers and clock steps) before it
+# is bisected, and the seek lands SEEK_SLACK before the session start
+SEEK_PROBES = 16
+SEEK_SLACK = timedelta(minutes=5)
+SEEK_MAX_SCAN = 64 << 10  # Bytes searched from a probe for a timestamped line
+SEEK_MIN_BYTES = 1 << 20  # Smaller files parse about as fast as they are probed
+
+
+def line_timestamp(line: bytes) -> Optional[datetime]:
+    """Timestamp of a raw JSON or text log line, timezone-aware (naive ones as local time)"""
+    split = split_log_line(line.decode('utf-8', errors='ignore'))
+    if not split or not isinstance(split[0], str):
+        return None
+    try:
+        timestamp = datetime.fromisoformat(split[0].replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return timestamp if timestamp.tzinfo else timestamp.astimezone()
+
+
+def next_timestamp(mm: mmap.mmap, pos: int, end: int) -> Optional[tuple[datetime, int]]:
+    """(timestamp, end offset) of the first timestamped line starting in pos..end, if found nearby"""
+    if pos:
+        newline = mm.find(b'\n', pos - 1, end)
+        if newline < 0:
+            return None
+        pos = newline + 1
+    limit = min(end, pos + SEEK_MAX_SCAN)
+    while pos < limit:
+        newline = mm.find(b'\n', pos)
+        stop = newline + 1 if newline >= 0 else len(mm)
+        timestamp = line_timestamp(mm[pos:stop])
+        if timestamp is not None:
+            return timestamp, stop
+        pos = stop
     return None
 
 
-def extract_requests(log_files: list[Path], session_start: Optional[datetime] = None) -> dict[str, RequestMetrics]:
-    """Extract request metrics from log files"""
-    requests: dict[str, RequestMetrics] = {}
+def seek_offset(mm: mmap.mmap, session_start: datetime) -> int:
+    """Offset of a line at or before the first one at session_start (timezone-aware)
+
+    Bisects the file on line timestamps. If the timestamps probed, evenly
+    spread ones and those on the bisection path, go back in time by more
+    than SEEK_SLACK anywhere, the file is not in order and the offset is 0.
+    Lines without a timestamp nearby never move the search forward.
+    """
+    size = len(mm)
+    probes = []
+    for i in range(SEEK_PROBES):
+        found = next_timestamp(mm, size * i // SEEK_PROBES, size)
+        if found:
+            probes.append((found[1], found[0]))
+
+    target = session_start - SEEK_SLACK
+    low, high = 0, size
+    while low < high:
+        mid = (low + high) // 2
+        found = next_timestamp(mm, mid, high)
+        if found:
+            probes.append((found[1], found[0]))
+        if found is None or found[0] >= target:
+            high = mid
+        else:
+            low = found[1]
+
+    latest = None
+    for _, timestamp in sorted(probes, key=lambda probe: probe[0]):
+        if latest and timestamp < latest - SEEK_SLACK:
+            return 0
+        latest = max(latest, timestamp) if latest else timestamp
+    return low
 
+
+def session_offset(f, session_start: Optional[datetime]) -> int:
+    """seek_offset for an open log file, 0 without a session start or for a small file"""
+    if session_start is None or os.fstat(f.fileno()).st_size < SEEK_MIN_BYTES:
+        return 0
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return seek_offset(mm, session_start)
+
+
+def log_ranges(log_files: list[Path], workers: int,
+               session_start: Optional[datetime] = None) -> list[tuple[str, int, int]]:
+    """Newline-aligned (path, start, end) byte ranges covering the log files, in file order
+
+    With a (timezone-aware) session_start, each file is covered from its seek_offset.
+    """
+    sizes = []
     for log_file in log_files:
         try:
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    entry = parse_log_line(line)
-                    if not entry:
-                        continue
+            sizes.append((str(log_file), os.path.getsize(log_file)))
+        except OSError as e:
+            print(f"Warning: Error reading {log_file}: {e}", file=sys.stderr)
+    range_bytes = range_size(sum(size for _, size in sizes), workers)
 
-                    timestamp_str = entry.get('timestamp')
-                    if not timestamp_str:
-                        continue
+    ranges = []
+    for path, size in sizes:
+        if not size:
+            continue
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = seek_offset(mm, session_start) if session_start and size >= SEEK_MIN_BYTES else 0
+            ranges.extend((path, start, end) for start, end in split_range(mm, start, size, range_bytes))
+    return ranges
 
-                    try:
-                        timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                    except ValueError:
-                        continue
 
-                    # Filter by session start
-                    if session_start and timestamp < session_start:
-                        continue
+def parse_range(path: str, start: int, end: int, bounds: tuple) -> tuple[str, dict, Optional[str]]:
+    """(path, fold_events of the range, error) for one byte range of a log file"""
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Same newline and decoding rules as reading the file in text mode
+            lines = io.TextIOWrapper(io.BytesIO(mm[start:end]), encoding='utf-8', errors='ignore')
+            return path, fold_events(filter(None, (parse_event(line, bounds) for line in lines))), None
+    except Exception as e:
+        return path, {}, str(e)
+
+
+def parse_ranges(ranges: list[tuple[str, int, int]], bounds: tuple, workers: int):
+    """Yield parse_range for each range in order, in a process pool if workers > 1"""
+    if workers <= 1:
+        for path, start, end in ranges:
+            yield parse_range(path, start, end, bounds)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(
+            parse_range,
+            [r[0] for r in ranges], [r[1] for r in ranges], [r[2] for r in ranges],
+            [bounds] * len(ranges)
+        )
+
+
+def extract_requests_parallel(log_files: list[Path], bounds: tuple, workers: int) -> dict[str, RequestMetrics]:
+    """extract_requests over byte ranges parsed in a process pool
+
+    Each worker folds its range into partial per-request records; ranges
+    come back in file order and are merged by request ID, so the result
+    matches a serial pass.
+    """
+    requests: dict[str, RequestMetrics] = {}
+    failed = set()
+    for path, partials, error in parse_ranges(log_ranges(log_files, workers, bounds[1]), bounds, workers):
+        if error:
+            if path not in failed:
+                print(f"Warning: Error reading {path}: {error}", file=sys.stderr)
+                failed.add(path)
+            continue
+        merge_partials(requests, partials)
+    return requests
+
+
+def extract_requests(log_files: list[Path], session_start: Optional[datetime] = None,
+                     workers: int = 1) -> dict[str, RequestMetrics]:
+    """Extract request metrics from log files, in workers processes if more than one
+
+    With a session_start, each time-ordered file is parsed from the line
+    found by seek_offset instead of from the top.
+    """
+    requests: dict[str, RequestMetrics] = {}
+    bounds = session_bounds(session_start)
 
-                    message = entry.get('message', '')
-                    level = entry.get('level', '').upper()
-
-                    # Look for request start
-                    if 'API request' in message or 'sending request' in message.lower():
-                        # Extract request ID if available
-                        req_id = extract_request_id(message) or f"req_{timestamp.isoformat()}"
-                        if req_id not in requests:
-                            requests[req_id] = RequestMetrics(
-                                request_id=req_id,
-                                start_time=timestamp
-                            )
-
-                    # Look for first token / streaming start
-                    elif 'streaming' in message.lower() or 'first chunk' in message.lower():
-                        req_id = extract_request_id(message)
-                        if req_id and req_id in requests:
-                            requests[req_id].first_token_time = timestamp
-
-                    # Look for request completion
-                    elif 'response received' in message.lower() or 'request complete' in message.lower():
-                        req_id = extract_request_id(message)
-                        if req_id and req_id in requests:
-                            requests[req_id].end_time = timestamp
-
-                    # Look for token usage
-                    elif 'usage' in message.lower() or 'tokens' in message.lower():
-                        req_id = extract_request_id(message)
-                        if req_id and req_id in requests:
-                            tokens = extract_tokens(message)
-                            if tokens:
-                                requests[req_id].input_tokens = tokens.get('input', 0)
-                                requests[req_id].output_tokens = tokens.get('output', 0)
-
-                    # Look for model info
-                    elif 'model' in message.lower():
-                        req_id = extract_request_id(message)
-                        if req_id and req_id in requests:
-                            model = extract_model(message)
-                            if model:
-                                requests[req_id].model = model
+    workers = workers or os.cpu_count() or 1
+    if workers > 1:
+        total = 0
+        for log_file in log_files:
+            try:
+                total += os.path.getsize(log_file)
+            except OSError:
+                pass
+        if total >= POOL_MIN_BYTES:
+            return extract_requests_parallel(log_files, bounds, workers)
 
+    for log_file in log_files:
+        try:
+            with open(log_file, 'rb') as f:
+                f.seek(session_offset(f, bounds[1]))
+                lines = io.TextIOWrapper(f, encoding='utf-8', errors='ignore')
+                apply_events(requests, filter(None, (parse_event(line, bounds) for line in lines)))
         except Exception as e:
             print(f"Warning: Error reading {log_file}: {e}", file=sys.stderr)
             continue
@@ -193,15 +517,239 @@ def extract_requests(log_files: list[Path], session_start: Optional[datetime] =
     return requests
 
 
+STORE_FILENAME = ".requests.sqlite"
+STORE_VERSION = 1
+# Leading bytes hashed into a checkpoint, to tell a replaced or truncated
+# file that reuses the inode from the one that was read
+HEAD_BYTES = 4096
+
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    head TEXT NOT NULL,
+    PRIMARY KEY (device, inode)
+);
+CREATE TABLE IF NOT EXISTS requests (
+    request_id TEXT PRIMARY KEY,
+    start_time TEXT NOT NULL,
+    start_epoch REAL NOT NULL,
+    first_token_time TEXT,
+    end_time TEXT,
+    model TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS requests_start ON requests(start_epoch);
+"""
+REQUEST_COLUMNS = ('request_id', 'start_time', 'first_token_time', 'end_time',
+                   'model', 'input_tokens', 'output_tokens')
+
+
+def head_hash(mm: Optional[mmap.mmap], length: int) -> str:
+    return hashlib.sha1(mm[:length] if mm is not None else b'').hexdigest()
+
+
+class RequestStore:
+    """Persistent SQLite store of parsed requests, with per-file checkpoints
+
+    Each log file is checkpointed by (device, inode), so a rotated (renamed)
+    file keeps its offset, with the size and mtime seen and the byte offset
+    of the last complete line read. A run parses only the bytes appended
+    since; a file that shrank or whose first bytes changed is re-read from
+    the start. A checkpointed file that no longer matches the log patterns
+    (claude.log renamed to claude.log.1) is looked up by inode in its
+    directory and read to its end before its checkpoint is dropped. Requests still missing lines stay in the store and are
+    completed by later runs, even when they continue in another file.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode = WAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != STORE_VERSION:
+            with self.db:
+                for table in ('requests', 'files'):
+                    self.db.execute(f"DROP TABLE IF EXISTS {table}")
+            self.db.execute(f"PRAGMA user_version = {STORE_VERSION}")
+        self.db.executescript(STORE_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def sync(self, log_files: list[Path], workers: int = 1) -> dict:
+        """Parse what was appended to log_files since the last sync; returns counts"""
+        workers = workers or os.cpu_count() or 1
+        counts = {'parsed': 0, 'unchanged': 0, 'reset': 0, 'failed': 0, 'bytes': 0}
+        known = {(row['device'], row['inode']): row for row in self.db.execute("SELECT * FROM files")}
+        log_files = self._rotated_files(known, log_files) + list(log_files)
+        seen = set()
+        ranges = []
+        checkpoints = {}
+
+        for log_file in log_files:
+            path = str(log_file)
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                print(f"Warning: Error reading {path}: {e}", file=sys.stderr)
+                counts['failed'] += 1
+                continue
+            key = (st.st_dev, st.st_ino)
+            if key in seen:
+                continue
+            seen.add(key)
+            row = known.get(key)
+            if row and row['size'] == st.st_size and row['mtime_ns'] == st.st_mtime_ns:
+                counts['unchanged'] += 1
+                continue
+
+            try:
+                with open(path, 'rb') as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else None
+                    try:
+                        offset = row['offset'] if row else 0
+                        if offset and (st.st_size < offset or head_hash(mm, min(HEAD_BYTES, offset)) != row['head']):
+                            offset = 0
+                            counts['reset'] += 1
+                        # Stop after the last complete line; a line still being written waits for the next run
+                        end = max(mm.rfind(b'\n', offset) + 1, offset) if mm is not None else 0
+                        if end > offset:
+                            ranges.extend((path, start, stop) for start, stop
+                                          in split_range(mm, offset, end, range_size(end - offset, workers)))
+                        checkpoints[path] = (st.st_dev, st.st_ino, path, st.st_size, st.st_mtime_ns,
+                                             end, head_hash(mm, min(HEAD_BYTES, end)))
+                        counts['bytes'] += end - offset
+                    finally:
+                        if mm is not None:
+                            mm.close()
+            except (OSError, ValueError) as e:
+                print(f"Warning: Error reading {path}: {e}", file=sys.stderr)
+                counts['failed'] += 1
+                continue
+            counts['parsed'] += 1
+
+        parse_workers = workers if counts['bytes'] >= POOL_MIN_BYTES else 1
+        with self.db:
+            for path, partials, error in parse_ranges(ranges, (None, None), parse_workers):
+                if error:
+                    # Not checkpointed, so the file is read again next time
+                    if checkpoints.pop(path, None):
+                        print(f"Warning: Error reading {path}: {error}", file=sys.stderr)
+                        counts['failed'] += 1
+                        counts['parsed'] -= 1
+                    continue
+                self._merge(partials)
+            self.db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", checkpoints.values())
+            # Forget files that are gone from where they were last seen
+            for key, row in known.items():
+                if key in seen:
+                    continue
+                try:
+                    st = os.stat(row['path'])
+                    if (st.st_dev, st.st_ino) == key:
+                        continue
+                except OSError:
+                    pass
+                self.db.execute("DELETE FROM files WHERE device = ? AND inode = ?", key)
+        return counts
+
+    @staticmethod
+    def _rotated_files(known: dict, log_files: list[Path]) -> list[Path]:
+        """Checkpointed files renamed out of log_files, found by inode, oldest first
+
+        Their tails were written before anything in the current files, so
+        they are read first.
+        """
+        listed = set()
+        for log_file in log_files:
+            try:
+                st = os.stat(log_file)
+            except OSError:
+                continue
+            listed.add((st.st_dev, st.st_ino))
+        missing = {key: row for key, row in known.items() if key not in listed}
+        if not missing:
+            return []
+
+        found = []
+        for directory in {os.path.dirname(row['path']) for row in missing.values()}:
+            try:
+                entries = list(os.scandir(directory or '.'))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if (st.st_dev, st.st_ino) in missing:
+                    found.append((st.st_mtime_ns, Path(entry.path)))
+        return [path for _, path in sorted(found)]
+
+    def _merge(self, partials: dict[str, list]):
+        """Merge fold_events output into the stored requests it refers to"""
+        requests: dict[str, RequestMetrics] = {}
+        ids = list(partials)
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            rows = self.db.execute(
+                f"SELECT * FROM requests WHERE request_id IN ({', '.join('?' * len(batch))}) ORDER BY rowid", batch
+            )
+            for row in rows:
+                requests[row['request_id']] = row_to_request(row)
+        merge_partials(requests, partials)
+        self.db.executemany(
+            f"INSERT INTO requests ({', '.join(REQUEST_COLUMNS)}, start_epoch)"
+            f" VALUES ({', '.join('?' * (len(REQUEST_COLUMNS) + 1))})"
+            " ON CONFLICT(request_id) DO UPDATE SET first_token_time = excluded.first_token_time,"
+            " end_time = excluded.end_time, model = excluded.model,"
+            " input_tokens = excluded.input_tokens, output_tokens = excluded.output_tokens",
+            [
+                (r.request_id, r.start_time.isoformat(),
+                 r.first_token_time.isoformat() if r.first_token_time else None,
+                 r.end_time.isoformat() if r.end_time else None,
+                 r.model, r.input_tokens, r.output_tokens, r.start_time.timestamp())
+                for r in requests.values()
+            ]
+        )
+
+    def requests(self, session_start: Optional[datetime] = None) -> dict[str, RequestMetrics]:
+        """Stored requests that started at or after session_start, in log order"""
+        if session_start is None:
+            rows = self.db.execute("SELECT * FROM requests ORDER BY rowid")
+        else:
+            rows = self.db.execute("SELECT * FROM requests WHERE start_epoch >= ? ORDER BY rowid",
+                                   (session_start.timestamp(),))
+        return {row['request_id']: row_to_request(row) for row in rows}
+
+
+def row_to_request(row: sqlite3.Row) -> RequestMetrics:
+    def timestamp(value):
+        return datetime.fromisoformat(value) if value else None
+
+    return RequestMetrics(
+        request_id=row['request_id'],
+        start_time=datetime.fromisoformat(row['start_time']),
+        first_token_time=timestamp(row['first_token_time']),
+        end_time=timestamp(row['end_time']),
+        model=row['model'],
+        input_tokens=row['input_tokens'],
+        output_tokens=row['output_tokens'],
+    )
+
+
 def extract_request_id(message: str) -> Optional[str]:
     """Extract request ID from log message"""
-    patterns = [
-        r'request[_-]?id["\']?\s*[:=]\s*["\']?([a-zA-Z0-9_-]+)',
-        r'["\']?id["\']?\s*[:=]\s*["\']?([a-zA-Z0-9_-]+)',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, message, re.IGNORECASE)
+    for pattern in REQUEST_ID_PATTERNS:
+        match = pattern.search(message)
         if match:
             return match.group(1)
 
@@ -213,12 +761,12 @@ def extract_tokens(message: str) -> Optional[dict]:
     tokens = {}
 
     # Look for input tokens
-    input_match = re.search(r'input[_-]?tokens?[\s"\']*[:=]\s*(\d+)', message, re.IGNORECASE)
+    input_match = INPUT_TOKENS_PATTERN.search(message)
     if input_match:
         tokens['input'] = int(input_match.group(1))
 
     # Look for output tokens
-    output_match = re.search(r'output[_-]?tokens?[\s"\']*[:=]\s*(\d+)', message, re.IGNORECASE)
+    output_match = OUTPUT_TOKENS_PATTERN.search(message)
     if output_match:
         tokens['output'] = int(output_match.group(1))
 
@@ -227,16 +775,8 @@ def extract_tokens(message: str) -> Optional[dict]:
 
 def extract_model(message: str) -> Optional[str]:
     """Extract model name from log message"""
-    patterns = [
-        r'model["\']?\s*[:=]\s*["\']?([a-zA-Z0-9_.-]+)',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, message, re.IGNORECASE)
-        if match:
-            return match.group(1)
-
-    return None
+    match = MODEL_PATTERN.search(message)
+    return match.group(1) if match else None
 
 
 def format_report(requests: dict[str, RequestMetrics]) -> str:
@@ -313,8 +853,31 @@ def main():
         action="store_true",
         help="Output as JSON"
     )
+    parser.add_argument(
+        "--workers", "-j",
+        type=int,
+        default=1,
+        help="Parse processes over newline-aligned byte ranges (default: 1; 0 = CPU count)"
+    )
+    parser.add_argument(
+        "--store",
+        nargs="?",
+        const="",
+        metavar="FILE",
+        help=f"Keep requests in an incremental store and parse only log lines added since the last run "
+             f"(default FILE: {STORE_FILENAME} in the log directory)"
+    )
+    parser.add_argument(
+        "--ingest-only",
+        action="store_true",
+        help="With --store: update the store and exit without a report (e.g. from cron)"
+    )
 
     args = parser.parse_args()
+    if args.workers < 0:
+        parser.error("--workers must be 0 (CPU count) or more")
+    if args.ingest_only and args.store is None:
+        parser.error("--ingest-only needs --store")
 
     # Determine time filter
     session_start = None
@@ -323,11 +886,11 @@ def main():
     elif args.last_minutes:
         session_start = datetime.now() - timedelta(minutes=args.last_minutes)
 
-    # Find log files
+    # Find log files; with a store every file is checked, since unchanged ones cost a stat
     if args.file:
         log_files = [Path(args.file)]
     else:
-        log_files = find_log_files(args.log_dir, session_start)
+        log_files = find_log_files(args.log_dir, None if args.store is not None else session_start)
 
     if not log_files:
         print("No log files found.", file=sys.stderr)
@@ -335,7 +898,25 @@ def main():
         return 1
 
     # Extract requests
-    requests = extract_requests(log_files, session_start)
+    if args.store is not None:
+        if args.store:
+            store_path = Path(args.store).expanduser()
+        else:
+            store_path = (Path(args.file).parent if args.file else Path(args.log_dir).expanduser()) / STORE_FILENAME
+        store = RequestStore(store_path)
+        try:
+            counts = store.sync(log_files, args.workers)
+            # Silent from cron unless something failed (already warned about)
+            if args.ingest_only:
+                return 1 if counts['failed'] else 0
+            print(f"Store {store_path}: {counts['parsed']} file(s) parsed ({counts['bytes']} new bytes), "
+                  f"{counts['unchanged']} unchanged, {counts['reset']} re-read, {counts['failed']} failed",
+                  file=sys.stderr)
+            requests = store.requests(session_start)
+        finally:
+            store.close()
+    else:
+        requests = extract_requests(log_files, session_start, args.workers)
 
     if not requests:
         print("No requests found in logs.")